@@ -1,13 +1,23 @@
 import os
 import sys
+import time
 import logging
-from flask import Flask, request, jsonify
+import json
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 
-# 引入你之前写好的分析逻辑
-from utils.pcap_reader import pcap_generator
-from processors import get_processor
+# 引入你之前写好的分析逻辑 (核心函数位于 utils/analyzer.py，便于多进程 worker 导入)
+from utils.analyzer import analyze_industrial_pcap, analyze_page, stream_analysis, analyze_columnar
+from utils.pcap_reader import resolve_backend
+from utils.pcap_index import get_or_build_index
+from processors import check_backend_support
 from utils.converter import PcapConverter
+from utils.jobs import get_job_manager, JobQueueFull
+from utils.live_capture import get_live_manager, list_interfaces, LiveSessionLimit
+from utils.tail_follow import follow_analysis
+from utils.result_cache import get_result_cache, build_cache_key
+from utils import metrics
+from utils.profiling import check_admin_token, maybe_profile
 from config.settings import config
 
 # --- 配置日志 ---
@@ -33,45 +43,155 @@ CORS(app)  # Enable CORS for all routes
 app.config['JSON_AS_ASCII'] = config.JSON_AS_ASCII
 
 
-# --- 核心分析函数 (复用你之前的逻辑) ---
-def analyze_industrial_pcap(file_path):
+def resolve_path(path):
     """
-    分析 PCAP 文件的核心逻辑
+    路径解析函数: 将虚拟路径 /keti1/data/... 转换为 DATA_ROOT 下的物理路径
     """
-    results = []
-    packet_count = 0
+    if not path:
+        return None
+    # 如果是虚拟路径 /keti1/data/...
+    if path.replace('\\', '/').startswith('/keti1/data'):
+        # 去除前缀 /keti1/data
+        rel_path = path.replace('\\', '/')[len('/keti1/data'):].lstrip('/')
+        return os.path.join(config.DATA_ROOT, rel_path)
+    # 否则假设是绝对路径（或者其他处理方式，视需求而定）
+    return path
+
+
+def parse_frame_range(req_data):
+    """
+    解析帧范围 / 时间窗口参数 (start_frame, end_frame, start_time, end_time)
+    未提供任何参数时返回 None
+    """
+    frame_range = {}
+    for key, target, cast in (('start_frame', 'first_frame', int), ('end_frame', 'last_frame', int),
+                              ('start_time', 'start_time', float), ('end_time', 'end_time', float)):
+        if req_data.get(key) is not None:
+            frame_range[target] = cast(req_data[key])
+    return frame_range or None
 
-    # 如果用户没指定协议，默认开启所有常见工控协议
 
-    logger.info(f"开始分析文件: {file_path}")
+def profiling_requested(req_data):
+    """
+    解析 profile 参数 (需要管理员令牌)
 
-    try:
-        # 使用生成器迭代读取
-        for pkt in pcap_generator(file_path):
-            packet_count += 1
-
-            # 1. 动态获取处理器 (Modbus/Omron/S7)
-            print("正在处理包:", pkt.number)
-            processor = get_processor(pkt)
-
-            # 2. 解析数据
-            if processor:
-                # print("正在处理数据:", pkt.number)
-                parsed_data = processor.parse(pkt)
-                if parsed_data:
-                    results.append(parsed_data)
-
-        return {
-            "success": True,
-            "total_scanned": packet_count,
-            "packets_found": len(results),
-            "data": results
+    Returns:
+        tuple: (是否剖析, 拒绝时的错误响应或 None)
+    """
+    if not req_data.get('profile'):
+        return False, None
+    if not check_admin_token(request.headers.get('X-Admin-Token')):
+        return False, (jsonify({"code": 403, "msg": "性能剖析需要有效的管理员令牌 (X-Admin-Token)"}), 403)
+    return True, None
+
+
+def ndjson_response(records):
+    """
+    将记录生成器包装为 NDJSON 分块传输响应 (每行一个 JSON 对象)
+    分析中途出错时追加一条 {"error": ...} 记录，而不是截断输出
+    """
+    def generate():
+        serialize_seconds = 0.0
+        try:
+            for record in records:
+                started = time.perf_counter()
+                line = json.dumps(record, ensure_ascii=config.JSON_AS_ASCII, default=str) + '\n'
+                serialize_seconds += time.perf_counter() - started
+                yield line
+        except Exception as e:
+            logger.error(f"流式输出异常: {e}")
+            yield json.dumps({"error": f"分析失败: {str(e)}"}, ensure_ascii=config.JSON_AS_ASCII) + '\n'
+        finally:
+            metrics.record('openlist_stage_seconds_total', serialize_seconds, stage='serialize')
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={
+            # 禁止反向代理 (nginx) 缓冲，保证逐条下发
+            "X-Accel-Buffering": "no",
+            "Cache-Control": "no-cache",
         }
+    )
 
-    except Exception as e:
-        logger.error(f"底层分析中断: {str(e)}")
-        # 抛出异常以便外层捕获
-        raise RuntimeError(f"分析失败: {str(e)}")
+
+def cached_analysis_response(file_path, meta, data_bytes):
+    """
+    直接用缓存中的原始 JSON 字节拼出 /api/analyze 响应 (不反序列化 / 再序列化结果列表)
+    """
+    started = time.perf_counter()
+    head = {
+        "filename": os.path.basename(file_path),
+        "total_scanned": meta['total_scanned'],
+        "valid_packets": meta['packets_found'],
+        "cached": True,
+    }
+    for key in ('correlation', 'flows'):
+        if key in meta:
+            head[key] = meta[key]
+    head_json = json.dumps(head, ensure_ascii=config.JSON_AS_ASCII)
+    body = b''.join([
+        b'{"code":200,"msg":"success","data":',
+        head_json[:-1].encode('utf-8'),
+        b',"protocols":',
+        data_bytes,
+        b'}}',
+    ])
+    metrics.record('openlist_stage_seconds_total', time.perf_counter() - started, stage='serialize')
+    return Response(body, mimetype='application/json')
+
+
+def live_start_cursor(session, after):
+    """
+    实时会话消费者的起始序号：after 为客户端已收到的最后一条记录序号 (EventSource 重连时的 Last-Event-ID)
+    未提供时只接收之后的新记录；after=-1 表示从缓冲中最旧的记录开始
+    """
+    if after is None or str(after).strip() == '':
+        return session.ring.next_seq
+    return max(int(after) + 1, 0)
+
+
+def sse_response(session, cursor):
+    """
+    将实时会话的记录包装为 Server-Sent Events 流
+        - 每条记录一个 message 事件，id 为记录序号 (断线重连后可从 Last-Event-ID 继续)
+        - 消费者落后被覆盖时发送 dropped 事件 {"count", "next_seq"}
+        - 空闲时每 LIVE_SSE_HEARTBEAT 秒发送注释行保活；会话结束且记录读完后发送 end 事件
+    """
+    def generate():
+        position = cursor
+        session.subscribe()
+        try:
+            while True:
+                records, position, dropped = session.read(
+                    position, config.LIVE_SSE_BATCH, timeout=config.LIVE_SSE_HEARTBEAT)
+                if dropped:
+                    payload = json.dumps({"count": dropped, "next_seq": position})
+                    yield f"event: dropped\ndata: {payload}\n\n"
+                if records:
+                    started = time.perf_counter()
+                    chunk = ''.join(
+                        f"id: {seq}\ndata: {json.dumps(record, ensure_ascii=config.JSON_AS_ASCII, default=str)}\n\n"
+                        for seq, record in records
+                    )
+                    metrics.record('openlist_stage_seconds_total', time.perf_counter() - started, stage='serialize')
+                    yield chunk
+                elif session.exhausted(position):
+                    yield f"event: end\ndata: {json.dumps({'status': session.status, 'error': session.error})}\n\n"
+                    return
+                elif not dropped:
+                    yield ": keep-alive\n\n"
+        finally:
+            session.unsubscribe()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            "X-Accel-Buffering": "no",
+            "Cache-Control": "no-cache",
+        }
+    )
 
 
 # --- API 路由定义 ---
@@ -83,7 +203,20 @@ def api_analyze():
     Input (JSON):
     {
         "path": "D:/data/1.pcapng",
-        "type": "auto"  (可选: 'modbus', 'omron', 's7', 'auto')
+        "type": "auto"  (可选: 'modbus', 'omron', 's7', 'yaskawa', 'cip', 'hart', 'bacnet', 'auto'，可逗号分隔多个)
+        "backend": "pyshark"  (可选: 'pyshark', 'native', 'fields')
+        "workers": 1  (可选: 并行进程数，大文件按帧范围分块并行解析)
+        "start_frame": 1, "end_frame": 1000  (可选: 只分析指定帧范围，借助帧索引直接定位)
+        "start_time": 1733548704.0, "end_time": ...  (可选: 只分析指定时间窗口，epoch 秒)
+        "limit": 500, "cursor": "..."  (可选: 分页，cursor 取上一页返回的 next_cursor)
+        "offset": 0  (可选: 无游标时跳过的有效数据包数)
+        "stream": false  (可选: true 时以 NDJSON 逐条流式返回，最后一行为 {"summary": {...}})
+        "cache": true  (可选: false 时跳过磁盘结果缓存，强制重新分析)
+        "profile": false  (可选: true 时在 cProfile 下运行并返回热点报告，需要请求头 X-Admin-Token)
+        "follow": false  (可选: true 时为增量模式，只返回上次请求之后新追加的数据包，适用于仍在写入的文件)
+        "follow_reset": false  (可选: 增量模式下丢弃已有进度，从头开始)
+        "flows": false  (可选: true 时在同一次遍历中生成按连接汇总的会话表，响应中附带 "flows")
+        "packets": true  (可选: false 时不返回逐包结果，只返回会话表汇总)
     }
     """
     try:
@@ -94,26 +227,126 @@ def api_analyze():
 
         file_path = req_data['path']
         protocol_type = req_data.get('type', 'auto').lower()
+        try:
+            backend = resolve_backend(req_data.get('backend'))
+            check_backend_support(protocol_type, backend)
+            workers = int(req_data.get('workers') or config.ANALYZE_WORKERS)
+            frame_range = parse_frame_range(req_data)
+        except ValueError as e:
+            return jsonify({"code": 400, "msg": str(e)}), 400
 
         # 2. 检查文件是否存在
         # 注意: 这里检查的是服务器(运行Flask的电脑)上的路径
         if not os.path.exists(file_path):
             return jsonify({"code": 404, "msg": f"文件不存在: {file_path}"}), 404
 
-        # 4. 执行分析
-        result = analyze_industrial_pcap(file_path)
+        profile, denied = profiling_requested(req_data)
+        if denied:
+            return denied
+
+        # 会话表：只支持完整分析 (含帧范围与并行)
+        keep_packets = bool(req_data.get('packets', True))
+        flows = bool(req_data.get('flows')) or not keep_packets
+        if flows and (req_data.get('stream') or req_data.get('follow')
+                      or any(req_data.get(key) is not None for key in ('limit', 'cursor', 'offset'))):
+            return jsonify({"code": 400, "msg": "会话表 (flows / packets: false) 不支持流式、增量与分页模式"}), 400
+
+        # 3. 流式模式：边解码边输出 NDJSON
+        if req_data.get('stream'):
+            if profile:
+                return jsonify({"code": 400, "msg": "流式模式不支持性能剖析"}), 400
+            return ndjson_response(stream_analysis(
+                file_path,
+                backend=backend,
+                protocol_type=protocol_type,
+                frame_range=frame_range,
+            ))
+
+        # 4. 执行分析 (传入 limit / cursor / offset 时按页返回，完整分析优先读取结果缓存)
+        paged = any(req_data.get(key) is not None for key in ('limit', 'cursor', 'offset'))
+        follow = bool(req_data.get('follow'))
+        if follow:
+            # 增量模式：文件仍在增长，不使用结果缓存
+            if paged or frame_range:
+                return jsonify({"code": 400, "msg": "增量模式不支持分页与帧范围参数"}), 400
+            try:
+                result, profile_report = maybe_profile(
+                    profile, 'analyze_follow', follow_analysis,
+                    file_path,
+                    backend=backend,
+                    protocol_type=protocol_type,
+                    reset=bool(req_data.get('follow_reset')),
+                )
+            except ValueError as e:
+                return jsonify({"code": 400, "msg": str(e)}), 400
+        elif paged:
+            try:
+                result, profile_report = maybe_profile(
+                    profile, 'analyze_page', analyze_page,
+                    file_path,
+                    backend=backend,
+                    protocol_type=protocol_type,
+                    limit=req_data.get('limit'),
+                    cursor=req_data.get('cursor'),
+                    offset=req_data.get('offset') or 0,
+                )
+            except ValueError as e:
+                return jsonify({"code": 400, "msg": str(e)}), 400
+        else:
+            # 剖析时跳过缓存并强制串行 (cProfile 只能看到当前进程)
+            cache = get_result_cache() if req_data.get('cache', True) and not profile else None
+            cache_key = None
+            if cache is not None:
+                # 默认选项不写入缓存键，与后台任务共用同一份缓存
+                flow_query = {"flows": flows, "packets": keep_packets} if flows else {}
+                cache_key = build_cache_key(file_path, backend=backend, protocol_type=protocol_type,
+                                            frame_range=frame_range, **flow_query)
+                cached = cache.get_raw(cache_key)
+                metrics.record('openlist_result_cache_total', result='hit' if cached is not None else 'miss')
+                if cached is not None:
+                    logger.info(f"命中结果缓存: {file_path}")
+                    return cached_analysis_response(file_path, *cached)
+
+            result, profile_report = maybe_profile(
+                profile, 'analyze', analyze_industrial_pcap,
+                file_path,
+                backend=backend,
+                protocol_type=protocol_type,
+                workers=1 if profile else workers,
+                frame_range=frame_range,
+                flows=flows,
+                keep_packets=keep_packets,
+            )
+            if cache is not None:
+                cache.put(cache_key, result)
 
         # 5. 返回结果
-        return jsonify({
+        response_data = {
+            "filename": os.path.basename(file_path),
+            "total_scanned": result['total_scanned'],
+            "valid_packets": result['packets_found'],
+            "protocols": result['data'],
+            "cached": False
+        }
+        if 'correlation' in result:
+            response_data['correlation'] = result['correlation']
+        if 'flows' in result:
+            response_data['flows'] = result['flows']
+        if paged:
+            response_data['pagination'] = result['pagination']
+        if follow:
+            response_data['follow'] = result['follow']
+        if profile_report is not None:
+            response_data['profile'] = profile_report
+
+        started = time.perf_counter()
+        response = jsonify({
             "code": 200,
             "msg": "success",
-            "data": {
-                "filename": os.path.basename(file_path),
-                "total_scanned": result['total_scanned'],
-                "valid_packets": result['packets_found'],
-                "protocols": result['data']
-            }
+            "data": response_data
         })
+        metrics.record('openlist_stage_seconds_total', time.perf_counter() - started, stage='serialize')
+        return response
 
     except Exception as e:
         logger.error(f"API 异常: {e}")
@@ -121,6 +354,350 @@ def api_analyze():
 
 
 
+@app.route('/api/analyze/aggregate', methods=['POST'])
+def api_analyze_aggregate():
+    """
+    分析结果以列式存储汇总：按地址 / 协议 / IP 分组统计数值，可选导出 CSV
+    Input (JSON):
+    {
+        "path": "D:/data/1.pcapng",
+        "type" / "backend" / "start_frame" ...  (可选: 同 /api/analyze)
+        "group_by": "address"  (可选: 'address', 'protocol', 'src_ip', 'dst_ip', 'type')
+        "filter": {"protocol": "Modbus TCP", "address": "...", "src_ip": "...", "dst_ip": "..."}  (可选)
+        "export_csv": "D:/data/1.csv"  (可选: 将过滤后的数据项导出为 CSV)
+        "cache": true  (可选: 默认与 /api/analyze 共用结果缓存，列式表以同一缓存键保存)
+    }
+    """
+    try:
+        req_data = request.get_json()
+        if not req_data or 'path' not in req_data:
+            return jsonify({"code": 400, "msg": "缺少必要参数 'path'"}), 400
+
+        file_path = req_data['path']
+        protocol_type = req_data.get('type', 'auto').lower()
+        group_by = req_data.get('group_by', 'address')
+        filters = req_data.get('filter') or {}
+        try:
+            backend = resolve_backend(req_data.get('backend'))
+            check_backend_support(protocol_type, backend)
+            frame_range = parse_frame_range(req_data)
+            unknown = set(filters) - {'protocol', 'address', 'src_ip', 'dst_ip'}
+            if unknown:
+                raise ValueError(f"不支持的过滤条件: {', '.join(sorted(unknown))}")
+        except ValueError as e:
+            return jsonify({"code": 400, "msg": str(e)}), 400
+
+        if not os.path.exists(file_path):
+            return jsonify({"code": 404, "msg": f"文件不存在: {file_path}"}), 404
+
+        cache = get_result_cache() if req_data.get('cache', True) else None
+        packet_count, table = analyze_columnar(file_path, backend=backend, protocol_type=protocol_type,
+                                               frame_range=frame_range, cache=cache)
+        if filters:
+            table = table.filter(**filters)
+        try:
+            groups = table.aggregate(by=group_by)
+        except ValueError as e:
+            return jsonify({"code": 400, "msg": str(e)}), 400
+
+        response_data = {
+            "filename": os.path.basename(file_path),
+            "total_scanned": packet_count,
+            "items": len(table),
+            "memory_bytes": table.memory_bytes(),
+            "group_by": group_by,
+            "groups": groups,
+        }
+        if req_data.get('export_csv'):
+            export_path = resolve_path(req_data['export_csv'])
+            table.to_csv(export_path)
+            response_data['export_csv'] = export_path
+
+        return jsonify({
+            "code": 200,
+            "msg": "success",
+            "data": response_data
+        })
+
+    except Exception as e:
+        logger.error(f"汇总 API 异常: {e}")
+        return jsonify({"code": 500, "msg": f"服务器内部错误: {str(e)}"}), 500
+
+
+@app.route('/api/jobs', methods=['POST'])
+def api_job_submit():
+    """
+    提交后台任务，立即返回任务 ID (请求线程不等待分析完成)
+    Input (JSON):
+    {
+        "kind": "analyze",  (可选: 'analyze' / 'convert'，默认 'analyze')
+        ... 其余参数与 /api/analyze (path, type, backend, start_frame ...)
+            或 /api/convert (input_path, output_path, overwrite) 相同
+    }
+    """
+    try:
+        req_data = request.get_json()
+        if not req_data:
+            return jsonify({"code": 400, "msg": "缺少请求参数"}), 400
+
+        kind = req_data.get('kind', 'analyze')
+        if kind == 'analyze':
+            if 'path' not in req_data:
+                return jsonify({"code": 400, "msg": "缺少必要参数 'path'"}), 400
+            protocol_type = req_data.get('type', 'auto').lower()
+            try:
+                params = {
+                    "path": req_data['path'],
+                    "type": protocol_type,
+                    "backend": resolve_backend(req_data.get('backend')),
+                    "frame_range": parse_frame_range(req_data),
+                }
+                check_backend_support(protocol_type, params['backend'])
+            except ValueError as e:
+                return jsonify({"code": 400, "msg": str(e)}), 400
+            if not os.path.exists(params['path']):
+                return jsonify({"code": 404, "msg": f"文件不存在: {params['path']}"}), 404
+
+        elif kind == 'convert':
+            if 'input_path' not in req_data:
+                return jsonify({"code": 400, "msg": "缺少必要参数 'input_path'"}), 400
+            params = {
+                "input_path": resolve_path(req_data['input_path']),
+                "output_path": resolve_path(req_data.get('output_path')),
+                "overwrite": bool(req_data.get('overwrite', False)),
+            }
+            if not os.path.exists(params['input_path']):
+                return jsonify({"code": 404, "msg": f"输入文件不存在: {params['input_path']}"}), 404
+
+        else:
+            return jsonify({"code": 400, "msg": f"不支持的任务类型: {kind}"}), 400
+
+        try:
+            job = get_job_manager().submit(kind, params)
+        except JobQueueFull as e:
+            return jsonify({"code": 429, "msg": str(e)}), 429
+
+        return jsonify({
+            "code": 202,
+            "msg": "accepted",
+            "data": job.to_dict(include_result=False)
+        }), 202
+
+    except Exception as e:
+        logger.error(f"任务提交 API 异常: {e}")
+        return jsonify({"code": 500, "msg": f"服务器内部错误: {str(e)}"}), 500
+
+
+@app.route('/api/jobs', methods=['GET'])
+def api_job_list():
+    """
+    任务列表 (不含结果数据)
+    """
+    jobs = get_job_manager().list()
+    return jsonify({
+        "code": 200,
+        "msg": "success",
+        "data": [job.to_dict(include_result=False) for job in jobs]
+    })
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job_status(job_id):
+    """
+    查询任务状态与进度，任务成功后 data.result 为分析 / 转换结果
+    Input (Query):
+    ?result=false  (可选: 不返回结果数据，仅查看进度)
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"code": 404, "msg": f"任务不存在: {job_id}"}), 404
+
+    include_result = request.args.get('result', 'true').lower() != 'false'
+    return jsonify({
+        "code": 200,
+        "msg": "success",
+        "data": job.to_dict(include_result=include_result)
+    })
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def api_job_cancel(job_id):
+    """
+    取消任务 (同时终止任务启动的 tshark / editcap 子进程)
+    """
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        return jsonify({"code": 404, "msg": f"任务不存在: {job_id}"}), 404
+
+    return jsonify({
+        "code": 200,
+        "msg": "success",
+        "data": job.to_dict(include_result=False)
+    })
+
+
+@app.route('/api/live/interfaces', methods=['GET'])
+def api_live_interfaces():
+    """
+    可用于实时抓包的网卡列表 (tshark -D)
+    """
+    try:
+        return jsonify({"code": 200, "msg": "success", "data": list_interfaces()})
+    except Exception as e:
+        logger.error(f"网卡列表 API 异常: {e}")
+        return jsonify({"code": 500, "msg": f"服务器内部错误: {str(e)}"}), 500
+
+
+@app.route('/api/live', methods=['POST'])
+def api_live_start():
+    """
+    启动实时抓包会话
+    Input (JSON):
+    {
+        "interface": "eth0",  (必填: 网卡名或 tshark -D 中的序号；本地测试可用回环网卡 'lo')
+        "filter": "tcp port 502",  (可选: BPF 抓包过滤器，默认按所选协议的端口生成)
+        "type": "auto",  (可选: 协议类型，同 /api/analyze)
+        "buffer_size": 10000  (可选: 环形缓冲容量，默认 LIVE_RING_SIZE)
+    }
+    """
+    try:
+        req_data = request.get_json()
+        if not req_data or not req_data.get('interface'):
+            return jsonify({"code": 400, "msg": "缺少必要参数 'interface'"}), 400
+
+        try:
+            buffer_size = int(req_data['buffer_size']) if req_data.get('buffer_size') else None
+            session = get_live_manager().start(
+                req_data['interface'],
+                capture_filter=req_data.get('filter'),
+                protocol_type=req_data.get('type', 'auto').lower(),
+                ring_size=buffer_size,
+            )
+        except ValueError as e:
+            return jsonify({"code": 400, "msg": str(e)}), 400
+        except LiveSessionLimit as e:
+            return jsonify({"code": 429, "msg": str(e)}), 429
+
+        return jsonify({"code": 202, "msg": "accepted", "data": session.to_dict()}), 202
+
+    except Exception as e:
+        logger.error(f"实时抓包 API 异常: {e}")
+        return jsonify({"code": 500, "msg": f"服务器内部错误: {str(e)}"}), 500
+
+
+@app.route('/api/live', methods=['GET'])
+def api_live_list():
+    """
+    实时抓包会话列表
+    """
+    sessions = get_live_manager().list()
+    return jsonify({"code": 200, "msg": "success", "data": [session.to_dict() for session in sessions]})
+
+
+@app.route('/api/live/<session_id>', methods=['GET'])
+def api_live_status(session_id):
+    """
+    会话状态与统计 (已抓取包数、解码记录数、丢弃记录数、缓冲序号范围)
+    """
+    session = get_live_manager().get(session_id)
+    if session is None:
+        return jsonify({"code": 404, "msg": f"会话不存在: {session_id}"}), 404
+    return jsonify({"code": 200, "msg": "success", "data": session.to_dict()})
+
+
+@app.route('/api/live/<session_id>', methods=['DELETE'])
+def api_live_stop(session_id):
+    """
+    停止会话 (终止 tshark；缓冲中的记录在保留期内仍可读取)
+    """
+    session = get_live_manager().stop(session_id)
+    if session is None:
+        return jsonify({"code": 404, "msg": f"会话不存在: {session_id}"}), 404
+    return jsonify({"code": 200, "msg": "success", "data": session.to_dict()})
+
+
+@app.route('/api/live/<session_id>/events', methods=['GET'])
+def api_live_events(session_id):
+    """
+    以 SSE (text/event-stream) 推送解码记录
+    Input (Query):
+    ?after=<序号>  (可选: 已收到的最后一条记录序号；-1 表示从缓冲中最旧的记录开始，默认只推送新记录)
+    浏览器 EventSource 断线重连时自动携带 Last-Event-ID，从断点继续
+    """
+    session = get_live_manager().get(session_id)
+    if session is None:
+        return jsonify({"code": 404, "msg": f"会话不存在: {session_id}"}), 404
+    try:
+        cursor = live_start_cursor(session, request.headers.get('Last-Event-ID', request.args.get('after')))
+    except ValueError:
+        return jsonify({"code": 400, "msg": "after 必须是整数"}), 400
+    return sse_response(session, cursor)
+
+
+@app.route('/api/live/<session_id>/records', methods=['GET'])
+def api_live_records(session_id):
+    """
+    轮询方式读取解码记录 (不支持 SSE 的客户端)
+    Input (Query):
+    ?after=<序号>&limit=500&wait=0  (wait: 没有新记录时最多等待的秒数)
+    """
+    session = get_live_manager().get(session_id)
+    if session is None:
+        return jsonify({"code": 404, "msg": f"会话不存在: {session_id}"}), 404
+    try:
+        cursor = live_start_cursor(session, request.args.get('after', -1))
+        limit = min(max(int(request.args.get('limit', config.LIVE_SSE_BATCH)), 1), session.ring.capacity)
+        wait = min(max(float(request.args.get('wait', 0)), 0.0), config.LIVE_SSE_HEARTBEAT)
+    except ValueError:
+        return jsonify({"code": 400, "msg": "after / limit / wait 参数格式错误"}), 400
+
+    records, next_cursor, dropped = session.read(cursor, limit, timeout=wait)
+    return jsonify({
+        "code": 200,
+        "msg": "success",
+        "data": {
+            "records": [dict(record, seq=seq) for seq, record in records],
+            "last_seq": next_cursor - 1,
+            "dropped": dropped,
+            "status": session.status,
+        }
+    })
+
+
+@app.route('/api/index', methods=['POST'])
+def api_index():
+    """
+    构建 (或读取已有的) 帧索引，返回索引概要
+    Input (JSON):
+    {
+        "path": "D:/data/1.pcapng",
+        "rebuild": false  (可选: 强制重建)
+    }
+    """
+    try:
+        req_data = request.get_json()
+        if not req_data or 'path' not in req_data:
+            return jsonify({"code": 400, "msg": "缺少必要参数 'path'"}), 400
+
+        file_path = req_data['path']
+        if not os.path.exists(file_path):
+            return jsonify({"code": 404, "msg": f"文件不存在: {file_path}"}), 404
+
+        index = get_or_build_index(file_path, rebuild=bool(req_data.get('rebuild', False)))
+        if index is None:
+            return jsonify({"code": 400, "msg": "仅支持为 pcap / pcapng 文件建立索引"}), 400
+
+        return jsonify({
+            "code": 200,
+            "msg": "success",
+            "data": dict(index.summary(), filename=os.path.basename(file_path))
+        })
+
+    except Exception as e:
+        logger.error(f"索引 API 异常: {e}")
+        return jsonify({"code": 500, "msg": f"服务器内部错误: {str(e)}"}), 500
+
+
 @app.route('/api/convert', methods=['POST'])
 def api_convert():
     """
@@ -130,6 +707,7 @@ def api_convert():
         "input_path": "D:/data/1.pcapng",
         "output_path": "D:/data/1.pcap",  (可选)
         "overwrite": false  (可选)
+        "profile": false  (可选: true 时返回剖析报告，需要请求头 X-Admin-Token)
     }
     """
     try:
@@ -142,18 +720,6 @@ def api_convert():
         output_path = req_data.get('output_path', None)
         overwrite = req_data.get('overwrite', False)
 
-        # 路径解析函数: 将虚拟路径转换为物理路径
-        def resolve_path(path):
-            if not path:
-                return None
-            # 如果是虚拟路径 /keti1/data/...
-            if path.replace('\\', '/').startswith('/keti1/data'):
-                # 去除前缀 /keti1/data
-                rel_path = path.replace('\\', '/')[len('/keti1/data'):].lstrip('/')
-                return os.path.join(config.DATA_ROOT, rel_path)
-            # 否则假设是绝对路径（或者其他处理方式，视需求而定）
-            return path
-
         input_path = resolve_path(input_path)
         if output_path:
             output_path = resolve_path(output_path)
@@ -162,9 +728,16 @@ def api_convert():
         if not os.path.exists(input_path):
             return jsonify({"code": 404, "msg": f"输入文件不存在: {input_path}"}), 404
 
+        profile, denied = profiling_requested(req_data)
+        if denied:
+            return denied
+
         # 3. 执行转换
         converter = PcapConverter()
-        result = converter.convert_to_pcap(input_path, output_path, overwrite)
+        result, profile_report = maybe_profile(profile, 'convert', converter.convert_to_pcap,
+                                               input_path, output_path, overwrite)
+        if profile_report is not None:
+            result['profile'] = profile_report
 
         # 4. 返回结果
         if result['success']:
@@ -206,15 +779,6 @@ def api_batch_convert():
         output_dir = req_data.get('output_dir', None)
         recursive = req_data.get('recursive', False)
 
-        # 路径解析函数 (复用)
-        def resolve_path(path):
-            if not path:
-                return None
-            if path.replace('\\', '/').startswith('/keti1/data'):
-                rel_path = path.replace('\\', '/')[len('/keti1/data'):].lstrip('/')
-                return os.path.join(config.DATA_ROOT, rel_path)
-            return path
-
         input_dir = resolve_path(input_dir)
         if output_dir:
             output_dir = resolve_path(output_dir)
@@ -313,6 +877,14 @@ def api_fs_list():
         return jsonify({"code": 500, "msg": f"服务器内部错误: {str(e)}"}), 500
 
 
+@app.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """
+    运行指标 (Prometheus 文本格式)：各阶段耗时、各处理器扫描 / 匹配 / 失败计数、结果缓存命中
+    """
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/', methods=['GET'])
 def index():
     return jsonify({
@@ -320,9 +892,18 @@ def index():
         "service": "Industrial Protocol Analyzer API",
         "endpoints": [
             "POST /api/analyze",
+            "POST /api/analyze/aggregate",
+            "POST /api/jobs",
+            "GET /api/jobs/<id>",
+            "DELETE /api/jobs/<id>",
+            "POST /api/live",
+            "GET /api/live/<id>/events",
+            "DELETE /api/live/<id>",
+            "POST /api/index",
             "POST /api/convert",
             "POST /api/convert/batch",
-            "GET /api/formats"
+            "GET /api/formats",
+            "GET /api/metrics"
         ]
     })
 
@@ -0,0 +1,231 @@
+# benchmarks/bench_processors.py
+"""
+处理器微基准
+
+对每个处理器的 parse() 以及 BaseProtocolProcessor.create_standard_result 单独计时，
+输入为预先构建好的夹具数据包 (benchmarks/processor_fixtures.py)，不需要 tshark，数秒内完成。
+带原生解码器的处理器另外对 parse_native() 计时 (基准名 parse_native.<处理器>)。
+结果以 ns/packet 表示，并与仓库中的基线文件 (benchmarks/baselines/processors.json) 对比，
+超过阈值的项判定为性能回退 (退出码 1)，便于接入 CI。
+
+计时方法与 timeit 相同：关闭 GC，对同一批数据包重复多轮，取最快一轮。
+基线与机器相关，更换 CI 机器后请用 --update-baseline 重新生成。
+
+用法:
+    python benchmarks/bench_processors.py
+    python benchmarks/bench_processors.py --threshold 0.10 --packets 5000 --repeat 7
+    python benchmarks/bench_processors.py --update-baseline
+"""
+import os
+import gc
+import sys
+import copy
+import json
+import time
+import platform
+import argparse
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_HERE)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+DEFAULT_BASELINE = os.path.join(_HERE, 'baselines', 'processors.json')
+
+# 环境变量可覆盖默认回退阈值 (相对基线的比例，0.25 表示慢 25% 以上判定为回退)
+DEFAULT_THRESHOLD = float(os.getenv('BENCH_REGRESSION_THRESHOLD', '0.25'))
+
+NORMALIZE_BENCH = 'create_standard_result'
+
+
+def _best_of(func, repeat):
+    """关闭 GC 重复执行 func，返回最快一轮的纳秒数"""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        best = None
+        for _ in range(repeat):
+            elapsed = func()
+            if best is None or elapsed < best:
+                best = elapsed
+        return best
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def bench_parse(processor, packets, repeat, native=False):
+    """
+    处理器 parse() (native=True 时为 parse_native()) 的 ns/packet
+
+    每一轮开始前清空关联状态，保证各轮处理的请求 / 响应配对完全一致
+    """
+    parse = processor.parse_native if native else processor.parse
+
+    def run():
+        processor.reset_state()
+        started = time.perf_counter_ns()
+        for pkt in packets:
+            parse(pkt)
+        return time.perf_counter_ns() - started
+
+    # 预热一轮，顺便确认夹具确实能被解析
+    processor.reset_state()
+    parsed = sum(1 for pkt in packets if parse(pkt))
+    if not parsed:
+        raise RuntimeError(f"{processor.protocol_id} 没有解析出任何夹具数据包")
+    return _best_of(run, repeat) / len(packets), parsed
+
+
+def bench_normalize(packets, repeat, items_per_packet=4):
+    """
+    create_standard_result 的 ns/packet (每包 items_per_packet 个数据项)
+
+    create_standard_result 会修改传入的数据项，因此每轮计时前预先深拷贝好全部输入
+    """
+    from processors.base import BaseProtocolProcessor
+
+    base = BaseProtocolProcessor()
+    template = [
+        {"register_id": str(100 + i), "value": i * 7, "type": "Holding Register",
+         "description": "bench", "raw_hex": f"0x{i:04x}", "protocol_specific": {"base_addr": 100}}
+        for i in range(items_per_packet)
+    ]
+    create = base.create_standard_result
+
+    def run():
+        inputs = [(copy.deepcopy(template), {"func_code": "3", "info": "bench"}) for _ in packets]
+        started = time.perf_counter_ns()
+        for pkt, (items, extra) in zip(packets, inputs):
+            create(pkt, "Bench", items, extra)
+        return time.perf_counter_ns() - started
+
+    return _best_of(run, repeat) / len(packets)
+
+
+def run_benchmarks(packets=2000, repeat=5, only=None, seed=1):
+    """
+    执行全部微基准
+
+    Returns:
+        dict: {基准名: ns/packet}
+    """
+    from processors import AVAILABLE_PROCESSORS
+    from benchmarks.processor_fixtures import FIXTURE_BUILDERS, build_fixtures, build_native_fixtures
+
+    results = {}
+    for processor in AVAILABLE_PROCESSORS:
+        name = processor.protocol_id.lower()
+        if name not in FIXTURE_BUILDERS or (only and name not in only):
+            continue
+        fixtures = build_fixtures(name, packets, seed=seed)
+        ns_per_packet, _parsed = bench_parse(processor, fixtures, repeat)
+        processor.reset_state()
+        results[f"parse.{name}"] = round(ns_per_packet, 1)
+
+        if processor.NATIVE_DECODER:
+            fixtures = build_native_fixtures(name, packets, seed=seed)
+            ns_per_packet, _parsed = bench_parse(processor, fixtures, repeat, native=True)
+            processor.reset_state()
+            results[f"parse_native.{name}"] = round(ns_per_packet, 1)
+
+    if not only or NORMALIZE_BENCH in only:
+        fixtures = build_fixtures('modbus', packets, seed=seed)
+        results[NORMALIZE_BENCH] = round(bench_normalize(fixtures, repeat), 1)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    与基线对比
+
+    Returns:
+        list: [{"name", "ns_per_packet", "baseline", "change", "status"}]，
+              status 为 ok / regressed / improved / new
+    """
+    rows = []
+    for name, value in results.items():
+        base = baseline.get(name)
+        if not base:
+            rows.append({"name": name, "ns_per_packet": value, "baseline": None, "change": None, "status": "new"})
+            continue
+        change = (value - base) / base
+        if change > threshold:
+            status = 'regressed'
+        elif change < -threshold:
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append({"name": name, "ns_per_packet": value, "baseline": base,
+                     "change": round(change, 4), "status": status})
+    return rows
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('results', {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, results, args):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    document = {
+        "unit": "ns/packet",
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "packets": args.packets,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+def print_table(rows, threshold):
+    header = f"{'基准':<28}{'ns/packet':>12}{'基线':>12}{'变化':>10}  状态"
+    print(header)
+    print('-' * (len(header) + 6))
+    for row in sorted(rows, key=lambda r: r['ns_per_packet'], reverse=True):
+        base = '-' if row['baseline'] is None else row['baseline']
+        change = '-' if row['change'] is None else f"{row['change'] * 100:+.1f}%"
+        print(f"{row['name']:<28}{row['ns_per_packet']:>12}{base:>12}{change:>10}  {row['status']}")
+    print(f"(回退阈值: {threshold * 100:.0f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="处理器 parse / create_standard_result 微基准")
+    parser.add_argument('--packets', type=int, default=2000, help="每个处理器的夹具包数 (默认 2000)")
+    parser.add_argument('--repeat', type=int, default=5, help="重复轮数，取最快一轮 (默认 5)")
+    parser.add_argument('--only', default='', help="只运行指定项 (逗号分隔，如 modbus,s7comm,create_standard_result)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="回退阈值 (相对基线的比例，默认 0.25 或 BENCH_REGRESSION_THRESHOLD)")
+    parser.add_argument('--update-baseline', action='store_true', help="将本次结果写入基线文件")
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    only = {name.strip().lower() for name in args.only.split(',') if name.strip()} or None
+    results = run_benchmarks(packets=args.packets, repeat=args.repeat, only=only)
+
+    if args.update_baseline:
+        save_baseline(args.baseline, results, args)
+        print(f"基线已更新: {args.baseline}")
+
+    rows = compare(results, load_baseline(args.baseline), args.threshold)
+    regressed = [row['name'] for row in rows if row['status'] == 'regressed']
+
+    if args.json:
+        print(json.dumps({"threshold": args.threshold, "results": rows, "regressed": regressed},
+                         ensure_ascii=False, indent=2))
+    else:
+        print_table(rows, args.threshold)
+        if regressed:
+            print(f"性能回退: {', '.join(regressed)}")
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
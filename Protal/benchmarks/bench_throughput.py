@@ -0,0 +1,221 @@
+# benchmarks/bench_throughput.py
+"""
+端到端吞吐量基准
+
+对同一份合成抓包文件，分别测量：
+    - analyze_industrial_pcap 在各读取后端 (native / fields / pyshark) 下的吞吐
+    - PcapConverter (pcapng -> pcap) 的吞吐
+输出每项的包数、耗时、packets/s、MB/s 与峰值常驻内存 (RSS)。
+
+每一项都在独立的子进程中运行，峰值 RSS 互不影响 (Linux / macOS 取自 getrusage，
+Windows 上需要安装 psutil，否则不报告内存)。
+需要 tshark 的后端 (fields / pyshark) 与转换器在未安装 Wireshark 时自动跳过。
+
+用法:
+    python benchmarks/bench_throughput.py --packets 200000
+    python benchmarks/bench_throughput.py --input capture.pcap --backends native,fields --json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_HERE)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+BACKENDS = ('native', 'fields', 'pyshark')
+
+
+def peak_rss_bytes():
+    """当前进程的峰值 RSS (字节)，无法获取时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# ==========================================
+# 子进程：执行单项测量
+# ==========================================
+def _run_analyze(file_path, backend, protocol_type):
+    from utils.analyzer import analyze_industrial_pcap
+
+    start = time.perf_counter()
+    result = analyze_industrial_pcap(file_path, backend=backend, protocol_type=protocol_type, workers=1)
+    elapsed = time.perf_counter() - start
+    return {
+        "packets": result['total_scanned'],
+        "packets_found": result['packets_found'],
+        "seconds": elapsed,
+    }
+
+
+def _run_convert(file_path):
+    from utils.converter import PcapConverter
+
+    output = os.path.join(tempfile.mkdtemp(prefix='bench_convert_'), 'out.pcap')
+    try:
+        converter = PcapConverter()
+        start = time.perf_counter()
+        result = converter.convert_to_pcap(file_path, output, overwrite=True)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(os.path.dirname(output), ignore_errors=True)
+    if not result.get('success'):
+        raise RuntimeError(result.get('message'))
+    return {"packets": None, "seconds": elapsed}
+
+
+def _child_main(task, file_path, protocol_type):
+    if task == 'convert':
+        measured = _run_convert(file_path)
+    else:
+        measured = _run_analyze(file_path, task.split(':', 1)[1], protocol_type)
+    measured['peak_rss_bytes'] = peak_rss_bytes()
+    print(json.dumps(measured))
+    return 0
+
+
+# ==========================================
+# 父进程：调度与汇总
+# ==========================================
+def run_task(task, file_path, protocol_type='auto', timeout=None):
+    """
+    在新的 Python 子进程中执行一项测量
+
+    Returns:
+        dict: {"packets", "seconds", "peak_rss_bytes", ...}
+    """
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', task,
+           '--input', file_path, '--protocol', protocol_type]
+    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, cwd=_PROJECT_ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"退出码 {proc.returncode}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def tshark_available():
+    from config.settings import config
+    return bool(config.get_tshark_path())
+
+
+def summarize(name, measured, file_size, total_packets):
+    packets = measured.get('packets') or total_packets
+    seconds = measured['seconds']
+    rss = measured.get('peak_rss_bytes')
+    return {
+        "name": name,
+        "packets": packets,
+        "packets_found": measured.get('packets_found'),
+        "seconds": round(seconds, 4),
+        "packets_per_second": round(packets / seconds, 1) if seconds else None,
+        "mb_per_second": round(file_size / 1024 / 1024 / seconds, 2) if seconds else None,
+        "peak_rss_mb": round(rss / 1024 / 1024, 1) if rss else None,
+    }
+
+
+def print_table(rows):
+    header = f"{'项目':<18}{'包数':>10}{'耗时(s)':>10}{'packets/s':>12}{'MB/s':>9}{'峰值RSS(MB)':>13}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        if row.get('skipped'):
+            print(f"{row['name']:<18}  跳过: {row['skipped']}")
+            continue
+        rss = '-' if row['peak_rss_mb'] is None else row['peak_rss_mb']
+        print(f"{row['name']:<18}{row['packets']:>10}{row['seconds']:>10}{row['packets_per_second']:>12}"
+              f"{row['mb_per_second']:>9}{rss:>13}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="端到端吞吐量基准 (分析各读取后端 + 格式转换)")
+    parser.add_argument('--input', help="使用已有抓包文件 (默认生成合成文件)")
+    parser.add_argument('--packets', type=int, default=100000, help="合成文件的总帧数 (默认 100000)")
+    parser.add_argument('--mix', default='', help="合成文件的协议配比，如 modbus=3,s7=1")
+    parser.add_argument('--seed', type=int, default=1, help="合成文件的随机种子")
+    parser.add_argument('--backends', default=','.join(BACKENDS), help="要测量的读取后端 (逗号分隔)")
+    parser.add_argument('--protocol', default='auto', help="protocol_type 参数 (默认 auto)")
+    parser.add_argument('--no-convert', action='store_true', help="不测量格式转换")
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出结果")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return _child_main(args.child, args.input, args.protocol)
+
+    from benchmarks.synth_pcap import generate
+
+    workdir = tempfile.mkdtemp(prefix='bench_throughput_')
+    try:
+        if args.input:
+            pcap_path = args.input
+            total_packets = None
+        else:
+            pcap_path = os.path.join(workdir, 'synthetic.pcap')
+            total_packets = generate(pcap_path, args.packets, mix=args.mix, seed=args.seed)
+        file_size = os.path.getsize(pcap_path)
+        has_tshark = tshark_available()
+
+        rows = []
+        for backend in [b.strip() for b in args.backends.split(',') if b.strip()]:
+            name = f"analyze[{backend}]"
+            if backend not in BACKENDS:
+                rows.append({"name": name, "skipped": "未知后端"})
+                continue
+            if backend != 'native' and not has_tshark:
+                rows.append({"name": name, "skipped": "未找到 tshark"})
+                continue
+            try:
+                rows.append(summarize(name, run_task(f"analyze:{backend}", pcap_path, args.protocol),
+                                      file_size, total_packets))
+            except Exception as e:
+                rows.append({"name": name, "skipped": str(e)})
+
+        if not args.no_convert:
+            if not has_tshark:
+                rows.append({"name": "convert", "skipped": "未找到 tshark / editcap"})
+            else:
+                # 转换器以 pcapng 为输入：合成文件直接生成同样内容的 pcapng
+                if args.input:
+                    pcapng_path = pcap_path
+                else:
+                    pcapng_path = os.path.join(workdir, 'synthetic.pcapng')
+                    generate(pcapng_path, args.packets, mix=args.mix, seed=args.seed)
+                try:
+                    rows.append(summarize("convert", run_task("convert", pcapng_path),
+                                          os.path.getsize(pcapng_path), total_packets))
+                except Exception as e:
+                    rows.append({"name": "convert", "skipped": str(e)})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "input": args.input or f"synthetic({args.packets} packets, seed={args.seed})",
+        "file_bytes": file_size,
+        "results": rows,
+    }
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"输入: {report['input']}, {file_size / 1024 / 1024:.2f} MB")
+        print_table(rows)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# benchmarks/processor_fixtures.py
+"""
+处理器微基准使用的数据包夹具
+
+不依赖 tshark：每个夹具是一份与 tshark -T ek 输出一致的扁平字段字典，
+经 utils.tshark_fields.build_packet 组装为 FieldsPacket (与 fields 后端送入处理器的对象相同)。
+每种协议给出若干 "请求 / 响应" 变体，覆盖 parse 的主要分支 (含请求-响应关联)。
+
+原生解码器 (parse_native) 的夹具直接取 synth_pcap 生成的以太网帧，经原生后端的 L2-L4 解析得到 NativePacket。
+"""
+import struct
+import random
+
+from utils.tshark_fields import build_packet
+from utils.native_reader import NativePacket, decode_packet, LINKTYPE_ETHERNET
+from benchmarks.synth_pcap import build_yaskawa, iter_frames
+
+CLIENT_IP = '10.0.0.10'
+SERVER_IP = '10.0.0.1'
+CLIENT_PORT = 50000
+
+
+def _hex(data):
+    """字节 -> tshark 的冒号分隔十六进制字符串"""
+    return ':'.join(f'{b:02x}' for b in data)
+
+
+def _record(number, request, fields, transport, port):
+    record = {
+        'frame.number': [str(number)],
+        'frame.time_epoch': [f'{1700000000 + number * 0.001:.6f}'],
+        'ip.src': [CLIENT_IP if request else SERVER_IP],
+        'ip.dst': [SERVER_IP if request else CLIENT_IP],
+        f'{transport}.srcport': [str(CLIENT_PORT if request else port)],
+        f'{transport}.dstport': [str(port if request else CLIENT_PORT)],
+    }
+    for name, value in fields.items():
+        record[name] = value if isinstance(value, list) else [str(value)]
+    return record
+
+
+# ==========================================
+# 各协议的字段记录 (request, response) 对
+# ==========================================
+def modbus_records(rng, seq):
+    count = rng.randint(1, 10)
+    start = rng.randrange(0, 1000)
+    trans_id = str(seq & 0xFFFF)
+    request = {'mbtcp.trans_id': trans_id, 'modbus.func_code': '3', 'modbus.reference_num': start}
+    response = {
+        'mbtcp.trans_id': trans_id,
+        'modbus.func_code': '3',
+        'modbus.reference_num': start,
+        'modbus.regval_uint16': [str(rng.randrange(0, 65536)) for _ in range(count)],
+    }
+    return request, response
+
+
+def omron_records(rng, seq):
+    sid = f'0x{seq & 0xFF:02x}'
+    address = f'0x{rng.randrange(0, 2000):04x}'
+    if seq % 4 == 0:
+        # 写请求：command_data 为待写入的字数据
+        words = struct.pack('>4H', *(rng.randrange(0, 65536) for _ in range(4)))
+        request = {'omron.sid': sid, 'omron.command': '0x0102', 'omron.memory_address': address,
+                   'omron.memory_area_read': '0x82', 'omron.command_data': _hex(words)}
+        response = {'omron.sid': sid, 'omron.command': '0x0102', 'omron.response_code': '0x0000'}
+    else:
+        request = {'omron.sid': sid, 'omron.command': '0x0101', 'omron.memory_address': address,
+                   'omron.memory_area_read': '0x82', 'omron.memory_numitems': str(rng.randint(1, 8))}
+        response = {'omron.sid': sid, 'omron.command': '0x0101', 'omron.response_code': '0x0000'}
+    return request, response
+
+
+def s7_records(rng, seq):
+    pduref = str(seq & 0xFFFF)
+    length = rng.choice((1, 2, 4))
+    data = bytes(rng.randrange(0, 256) for _ in range(length))
+    item = {
+        's7comm.param.item.transp_size': '2',
+        's7comm.param.item.length': str(length),
+        's7comm.param.item.db': str(rng.randint(1, 20)),
+        's7comm.param.item.area': '0x84',
+        's7comm.param.item.address.byte': str(rng.randrange(0, 200)),
+        's7comm.param.item.address.bit': '0',
+    }
+    if seq % 4 == 0:
+        # 写变量请求 (地址由 param.item 子字段重建)
+        request = dict({'s7comm.header.rosctr': '1', 's7comm.header.pduref': pduref,
+                        's7comm.param.func': '0x05', 's7comm.param.item': '',
+                        's7comm.resp.data': _hex(data)}, **item)
+        response = {'s7comm.header.rosctr': '3', 's7comm.header.pduref': pduref, 's7comm.param.func': '0x05'}
+    else:
+        request = dict({'s7comm.header.rosctr': '1', 's7comm.header.pduref': pduref,
+                        's7comm.param.func': '0x04', 's7comm.param.item': ''}, **item)
+        response = {'s7comm.header.rosctr': '3', 's7comm.header.pduref': pduref,
+                    's7comm.param.func': '0x04', 's7comm.resp.data': _hex(data)}
+    return request, response
+
+
+def yaskawa_records(rng, seq):
+    _transport, _port, request, response = build_yaskawa(rng, seq)
+    return {'data.data': _hex(request)}, {'data.data': _hex(response)}
+
+
+_CIP_TAGS = ('MotorSpeed', 'TankLevel', 'Valve1', 'Counter', 'TempPV', 'AlarmWord')
+
+
+def cip_records(rng, seq):
+    tag = rng.choice(_CIP_TAGS)
+    if seq % 2:
+        # 请求路径只有 ANSI 符号段的十六进制，需要解码出 Tag 名
+        encoded = tag.encode('ascii')
+        path = bytes([0x91, len(encoded)]) + encoded + (b'\x00' if len(encoded) % 2 else b'')
+        request = {'cip.service': '0x4c', 'cip.request_path': _hex(path)}
+    else:
+        request = {'cip.service': '0x4c', 'cip.symbol': tag}
+    response = {'cip.service': '0xcc', 'cip.data': _hex(struct.pack('<Hi', 0xC4, rng.randrange(-10 ** 6, 10 ** 6)))}
+    return request, response
+
+
+def hart_records(rng, seq):
+    address = _hex(bytes([0x26, 0x4E, 0, rng.randrange(0, 256), rng.randrange(0, 256)]))
+    common = {'hart_ip.message_id': '3', 'hart_ip.status': '0', 'hart_ip.transaction_id': str(seq & 0xFFFF),
+              'hart.command': '1', 'hart.address_long': address}
+    request = dict(common, **{'hart_ip.message_type': '0'})
+    response = dict(common, **{'hart_ip.message_type': '1', 'hart.response_code': '0',
+                               'hart.device_status': '0x00'})
+    return request, response
+
+
+def bacnet_records(rng, seq):
+    common = {'bacapp.invoke_id': str(seq & 0xFF), 'bacapp.objecttype': '0',
+              'bacapp.instance_number': str(rng.randint(1, 50)), 'bacapp.property_identifier': '85'}
+    request = dict(common, **{'bacapp.type': '0', 'bacapp.confirmed_service': 'readProperty'})
+    response = dict(common, **{'bacapp.type': '3', 'bacapp.confirmed_service': 'readProperty',
+                               'bacapp.real': f'{rng.uniform(-50.0, 500.0):.3f}'})
+    return request, response
+
+
+# 处理器 protocol_id (小写) -> (记录生成函数, 传输层, 服务端端口)
+FIXTURE_BUILDERS = {
+    'modbus': (modbus_records, 'tcp', 502),
+    'omron': (omron_records, 'udp', 9600),
+    's7comm': (s7_records, 'tcp', 102),
+    'yaskawa': (yaskawa_records, 'udp', 10040),
+    'cip': (cip_records, 'tcp', 44818),
+    'hart_ip': (hart_records, 'tcp', 5094),
+    'bacnet': (bacnet_records, 'udp', 47808),
+}
+
+
+def build_fixtures(name, count, seed=1):
+    """
+    生成某个处理器的夹具数据包列表 (请求 / 响应交替)
+
+    Args:
+        name: 处理器 protocol_id 的小写形式 (见 FIXTURE_BUILDERS)
+        count: 数据包数量
+        seed: 随机种子
+
+    Returns:
+        list: FieldsPacket 列表
+    """
+    rng = random.Random(seed)
+    builder, transport, port = FIXTURE_BUILDERS[name]
+    packets = []
+    seq = 0
+    while len(packets) < count:
+        seq += 1
+        request, response = builder(rng, seq)
+        packets.append(build_packet(_record(len(packets) + 1, True, request, transport, port)))
+        if len(packets) < count:
+            packets.append(build_packet(_record(len(packets) + 1, False, response, transport, port)))
+    return packets
+
+
+# 处理器 protocol_id (小写) -> synth_pcap 中的协议名
+NATIVE_FIXTURES = {
+    'modbus': 'modbus',
+    'omron': 'fins',
+    's7comm': 's7',
+    'yaskawa': 'yaskawa',
+    'cip': 'cip',
+    'hart_ip': 'hart',
+    'bacnet': 'bacnet',
+}
+
+
+def build_native_fixtures(name, count, seed=1):
+    """
+    生成某个处理器的原生后端夹具 (请求 / 响应交替的 NativePacket 列表)
+
+    Args:
+        name: 处理器 protocol_id 的小写形式 (见 NATIVE_FIXTURES)
+        count: 数据包数量
+        seed: 随机种子
+    """
+    packets = []
+    for number, (ts, frame) in enumerate(iter_frames(count, {NATIVE_FIXTURES[name]: 1.0}, seed=seed), 1):
+        pkt = NativePacket(number, ts, 0, 0, LINKTYPE_ETHERNET, len(frame), len(frame))
+        packets.append(decode_packet(pkt, memoryview(frame)))
+    return packets
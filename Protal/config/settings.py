@@ -20,6 +20,90 @@ class Config:
     DATA_ROOT = os.getenv('DATA_ROOT', r'C:\Code\OL\pcap\data' if sys.platform == 'win32' else '/app/data')
 
 
+    # --- 读取后端配置 ---
+    # pyshark: 完整 tshark 解析树 (默认，兼容性最好)
+    # native:  纯 Python mmap 读取 pcap/pcapng，仅解析 L2-L4 头部，速度快
+    # fields:  单个 tshark 进程 (-T ek) 只导出处理器需要的字段，输出量与解析开销远小于 pyshark
+    READER_BACKEND = os.getenv('PCAP_READER_BACKEND', 'pyshark').lower()
+    READER_BACKENDS = ('pyshark', 'native', 'fields')
+
+    # --- 帧索引配置 ---
+    # 索引文件 (.olidx) 存放目录；为空时与抓包文件放在同一目录 (目录只读时自动退回系统临时目录)
+    INDEX_DIR = os.getenv('PCAP_INDEX_DIR', '')
+
+    # --- 分页配置 ---
+    PAGE_SIZE = int(os.getenv('PAGE_SIZE', 500))
+    PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 10000))
+
+    # --- 并行分析配置 ---
+    # 默认并行进程数 (1 表示串行)，请求中的 workers 参数不会超过 CPU 核数
+    ANALYZE_WORKERS = int(os.getenv('ANALYZE_WORKERS', 1))
+    # 数据包数少于该值时不拆分，直接串行分析
+    PARALLEL_MIN_PACKETS = int(os.getenv('PARALLEL_MIN_PACKETS', 20000))
+    # 每个进程分到的块数 (块越多负载越均衡)
+    PARALLEL_CHUNKS_PER_WORKER = int(os.getenv('PARALLEL_CHUNKS_PER_WORKER', 4))
+    # 每块向前多读的帧数，仅用于预热请求/响应关联表 (结果丢弃)
+    PARALLEL_OVERLAP_PACKETS = int(os.getenv('PARALLEL_OVERLAP_PACKETS', 2000))
+
+    # --- 分析结果缓存配置 ---
+    # 同一抓包文件重复打开时直接读取磁盘缓存；目录为空时使用系统临时目录下的 openlist_result_cache
+    RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'True').lower() == 'true'
+    RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', '')
+    # 缓存目录总大小上限 (字节)，超出后按最近使用时间淘汰
+    RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+    # 计算内容指纹时读取的首尾块大小
+    RESULT_CACHE_HASH_BLOCK = int(os.getenv('RESULT_CACHE_HASH_BLOCK', 64 * 1024))
+
+    # --- 运行指标配置 ---
+    # /api/metrics 暴露的阶段耗时与处理器计数 (关闭后热路径不做任何计时)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    # 每扫描多少个包把本地累加值合并到全局指标一次
+    METRICS_FLUSH_PACKETS = int(os.getenv('METRICS_FLUSH_PACKETS', 10000))
+
+    # --- 性能剖析配置 ---
+    # profile=true 需要请求头 X-Admin-Token 与该值一致；为空时禁用剖析
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    # 剖析报告中返回的热点函数数量
+    PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', 30))
+    # 完整 pstats 数据的保存目录 (为空时不保存)
+    PROFILE_DIR = os.getenv('PROFILE_DIR', '')
+
+    # --- 后台任务配置 ---
+    # 同时执行的任务数 (tshark 子进程各占一个核，默认与 CPU 核数一致)
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', os.cpu_count() or 1))
+    # 排队中的任务上限，超出后新提交返回 429
+    JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', 32))
+    # 已结束任务 (含结果) 在内存中保留的秒数
+    JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', 3600))
+
+    # --- 增量分析 (tail-follow) 配置 ---
+    # 同时记住进度的文件数 (超出后淘汰最久未刷新的)，以及进度在无访问时保留的秒数
+    FOLLOW_MAX_FILES = int(os.getenv('FOLLOW_MAX_FILES', 64))
+    FOLLOW_STATE_TTL = int(os.getenv('FOLLOW_STATE_TTL', 3600))
+
+    # --- 请求/响应关联配置 ---
+    # 未收到响应的请求按抓包时间保留的秒数，以及每个处理器关联表的条数上限 (超出后淘汰最旧的请求)
+    CORRELATION_TTL = float(os.getenv('CORRELATION_TTL', 30))
+    CORRELATION_MAX_PENDING = int(os.getenv('CORRELATION_MAX_PENDING', 10000))
+
+    # --- 会话表 (flow table) 配置 ---
+    # 单次分析最多跟踪的会话数 (超出后新会话只计入 untracked_packets)，以及每个会话保留的功能码种类数
+    FLOW_MAX_FLOWS = int(os.getenv('FLOW_MAX_FLOWS', 100000))
+    FLOW_MAX_CODES = int(os.getenv('FLOW_MAX_CODES', 32))
+
+    # --- 实时抓包配置 ---
+    # 每个会话的解码记录环形缓冲容量 (条)，消费者落后超过该值时最旧的记录被覆盖并计入 dropped
+    LIVE_RING_SIZE = int(os.getenv('LIVE_RING_SIZE', 10000))
+    # 同时运行的抓包会话上限 (每个会话占用一个 tshark 进程)
+    LIVE_MAX_SESSIONS = int(os.getenv('LIVE_MAX_SESSIONS', 4))
+    # tshark 每抓取多少个包重置一次解析状态 (-M)，0 表示不重置
+    LIVE_SESSION_RESET = int(os.getenv('LIVE_SESSION_RESET', 100000))
+    # SSE 心跳间隔 (秒) 与单次下发的最大记录数
+    LIVE_SSE_HEARTBEAT = float(os.getenv('LIVE_SSE_HEARTBEAT', 15))
+    LIVE_SSE_BATCH = int(os.getenv('LIVE_SSE_BATCH', 500))
+    # 已停止会话 (含缓冲中的记录) 在内存中保留的秒数
+    LIVE_RETENTION_SECONDS = int(os.getenv('LIVE_RETENTION_SECONDS', 600))
+
     # --- Tshark 配置 ---
     # Windows 下可能的 Tshark 安装路径 (优先级按列表顺序)
     TSHARK_WINDOWS_PATHS = [
@@ -1,4 +1,6 @@
 # processors/__init__.py
+import logging
+
 from .modbus import ModbusProcessor
 from .omron import OmronFinsProcessor
 from .s7comm import S7CommProcessor
@@ -9,6 +11,7 @@ from .bacnet import BacnetProcessor
 
 
 # 在这里注册所有可用的处理器实例
+# (注册表只用于查询类属性；每次分析由 select_processors 创建独立实例，关联状态不在并发分析之间共享)
 AVAILABLE_PROCESSORS = [
     ModbusProcessor(),
     OmronFinsProcessor(),
@@ -19,40 +22,221 @@ AVAILABLE_PROCESSORS = [
     BacnetProcessor(),
 ]
 
-def get_processor(pkt):
+logger = logging.getLogger(__name__)
+
+def select_processors(protocol_type='auto'):
+    """
+    根据 /api/analyze 的 type 参数选择处理器
+
+    Args:
+        protocol_type: 'auto' / 'all' 表示全部；也可以用逗号分隔多个协议名 (如 'modbus,s7')
+
+    Returns:
+        list: 新创建的处理器实例列表 (保持注册顺序)；请求/响应关联状态属于本次分析，
+              并发的分析 / 后台任务 / 实时会话之间互不干扰，每次运行都从空状态开始
+    """
+    if not protocol_type or str(protocol_type).lower() in ('auto', 'all'):
+        return [type(p)() for p in AVAILABLE_PROCESSORS]
+
+    wanted = {name.strip().lower() for name in str(protocol_type).split(',') if name.strip()}
+    selected = [type(p)() for p in AVAILABLE_PROCESSORS if wanted & set(p.PROTOCOL_ALIASES)]
+
+    unknown = wanted - {alias for p in AVAILABLE_PROCESSORS for alias in p.PROTOCOL_ALIASES}
+    if unknown:
+        raise ValueError(f"不支持的协议类型: {', '.join(sorted(unknown))}")
+    return selected
+
+
+def check_backend_support(protocol_type, backend):
+    """
+    原生后端只能解析声明了 NATIVE_DECODER 的处理器 (没有 dissector 层，其余处理器的 parse 取不到字段)
+
+    显式指定的协议全部不支持原生解码时抛出 ValueError (接口返回 400)，部分不支持时记录警告；
+    'auto' / 'all' 只是 "所有可用协议"，不支持的处理器静默跳过 (预过滤同样不放行它们的端口)
+
+    Raises:
+        ValueError: 协议类型不支持，或所选协议均没有原生解码器
+    """
+    processors = select_processors(protocol_type)
+    if backend != 'native' or not protocol_type or str(protocol_type).lower() in ('auto', 'all'):
+        return processors
+
+    unsupported = [p.protocol_id for p in processors if not p.NATIVE_DECODER]
+    if len(unsupported) == len(processors):
+        raise ValueError(f"原生后端不支持所选协议 ({', '.join(unsupported)})，请改用 pyshark 或 fields 后端")
+    if unsupported:
+        logger.warning(f"原生后端不支持 {', '.join(unsupported)}，这些协议的数据包将被跳过")
+    return processors
+
+
+def processor_versions(processors=None):
+    """
+    处理器版本集合 {protocol_id: VERSION}，作为结果缓存键的一部分
+    """
+    return {p.protocol_id: p.VERSION for p in (processors or AVAILABLE_PROCESSORS)}
+
+
+def build_display_filter(processors=None):
+    """
+    将处理器声明的 DISPLAY_FILTER 合并为一条 tshark 显示过滤器
+    非工控流量 (ARP/DNS/HTTP/TLS 等) 在 tshark 内部即被丢弃，不再进入 Python
+    """
+    parts = [f"({p.DISPLAY_FILTER})" for p in (processors or AVAILABLE_PROCESSORS) if p.DISPLAY_FILTER]
+    return ' || '.join(parts) if parts else None
+
+
+def build_capture_filter(processors=None):
+    """
+    实时抓包使用的 BPF 过滤器：按处理器声明的 DEFAULT_PORTS 在内核中预过滤
+    (负载魔数无法用 BPF 表达，仅依赖端口)
+    """
+    ports = sorted({port for p in (processors or AVAILABLE_PROCESSORS) for port in p.DEFAULT_PORTS})
+    return ' or '.join(f"port {port}" for port in ports) if ports else None
+
+
+def build_packet_filter(processors=None):
+    """
+    原生后端的等价预过滤：按处理器声明的端口 / 负载魔数判断，返回 predicate(pkt) -> bool
+
+    只放行声明了 NATIVE_DECODER 的处理器 (与 ProcessorDispatcher 对原生数据包的分发一致)，
+    否则其余协议的数据包会计入 total_scanned 却没有任何处理器解析
+    """
+    processors = [p for p in (processors or AVAILABLE_PROCESSORS) if p.NATIVE_DECODER]
+    ports = frozenset(port for p in processors for port in p.DEFAULT_PORTS)
+    magics = tuple(p.PAYLOAD_MAGIC for p in processors if p.PAYLOAD_MAGIC)
+
+    def packet_filter(pkt):
+        transport = pkt.transport
+        if transport is None:
+            return False
+        if transport.srcport in ports or transport.dstport in ports:
+            return True
+        payload = pkt.payload
+        for magic in magics:
+            if payload[:len(magic)] == magic:
+                return True
+        return False
+
+    return packet_filter
+
+
+def collect_tshark_fields(processors=None):
+    """
+    汇总处理器在 tshark 字段提取模式下需要导出的字段 (保持顺序并去重)
+    """
+    fields = []
+    for processor in (processors or AVAILABLE_PROCESSORS):
+        for name in processor.TSHARK_FIELDS:
+            if name not in fields:
+                fields.append(name)
+    return fields
+
+
+class ProcessorDispatcher:
+    """
+    处理器分发表：一组候选处理器对应一个实例 (预先计算，逐包复用)
+
+        1. 协议层名 -> 处理器 的字典 (层名取自处理器的 LAYER_NAMES，默认 protocol_id 小写)，
+           每包只需遍历自身的几个层名做字典查询，而不是对每个处理器执行 'xxx' in pkt
+        2. 未命中时按处理器声明的 PAYLOAD_MAGIC 检查 TCP/UDP 负载开头 (如 YERC)
+        3. 原生后端的数据包没有层名：先按端口查声明了 NATIVE_DECODER 的处理器 (两次 int 字典查询，不产生任何对象)，
+           端口未命中时再检查负载魔数 (同样只限原生解码器)
+    多个处理器同时命中时按注册顺序优先
+    """
+
+    def __init__(self, processors):
+        self.processors = list(processors)
+        self.layer_map = {}
+        self.port_map = {}
+        self.signatures = []
+        self.native_signatures = []
+        for priority, processor in enumerate(self.processors):
+            for name in processor.LAYER_NAMES or (processor.protocol_id,):
+                self.layer_map.setdefault(name.lower(), (priority, processor))
+            if processor.NATIVE_DECODER:
+                for port in processor.DEFAULT_PORTS:
+                    self.port_map.setdefault(port, processor)
+            if processor.PAYLOAD_MAGIC:
+                magic = processor.PAYLOAD_MAGIC
+                self.signatures.append((magic, magic.hex(), processor))
+                if processor.NATIVE_DECODER:
+                    self.native_signatures.append((magic, processor))
+        # pyshark / tshark 负载为冒号分隔的 Hex，只取开头与魔数等长的部分比较
+        self.signature_prefix = max((len(magic) * 3 for magic, _hex, _p in self.signatures), default=0)
+
+    def dispatch(self, pkt):
+        pkt_type = type(pkt)
+
+        # 原生后端没有 dissector 层，检查端口与负载特征
+        if getattr(pkt_type, 'native', False):
+            port_map = self.port_map
+            if port_map:
+                transport = pkt.transport
+                if transport is not None:
+                    processor = port_map.get(transport.dstport) or port_map.get(transport.srcport)
+                    if processor is not None:
+                        return processor
+            payload = pkt.payload
+            for magic, processor in self.native_signatures:
+                if payload[:len(magic)] == magic:
+                    return processor
+            return None
+
+        # 1. 层名字典查询
+        if hasattr(pkt_type, 'layer_names'):
+            layer_names = pkt.layer_names
+        else:
+            layer_names = [layer.layer_name for layer in pkt.layers]
+
+        best = None
+        layer_map = self.layer_map
+        for name in layer_names:
+            entry = layer_map.get(name.lower())
+            if entry is not None and (best is None or entry[0] < best[0]):
+                best = entry
+        if best is not None:
+            return best[1]
+
+        # 2. 负载特征判断
+        if self.signatures:
+            raw_payload = _payload_hex(pkt)
+            if raw_payload:
+                # 只转换开头部分 (去除冒号，转小写)，不对整个负载做字符串处理
+                hex_check = raw_payload[:self.signature_prefix].replace(':', '').lower()
+                for _magic, magic_hex, processor in self.signatures:
+                    if hex_check.startswith(magic_hex):
+                        return processor
+        return None
+
+
+def _payload_hex(pkt):
+    """取 UDP / TCP 负载 (pyshark 的冒号 Hex 格式)，不存在时返回 None"""
+    for layer_name, field in (('udp', 'payload'), ('tcp', 'payload'), ('data', 'data')):
+        try:
+            return getattr(getattr(pkt, layer_name), field)
+        except AttributeError:
+            continue
+    return None
+
+
+# 已注册处理器 (固定不变) 的分发表，首次使用时创建
+_default_dispatcher = None
+
+
+def get_processor(pkt, processors=None):
     """
     工厂模式：根据数据包内容，自动返回匹配的处理器
+
+    每次分析的处理器实例都是新建的，逐包分发应在遍历开始前创建一个 ProcessorDispatcher 复用
+    (见 utils.analyzer.iter_results)；这里传入 processors 时每次调用都会新建分发表，只适合零散调用
+
+    Args:
+        pkt: 数据包对象
+        processors: 可选，候选处理器列表 (默认全部已注册处理器)
     """
-    layer_names = [layer.layer_name for layer in pkt.layers]
-    print(f"当前包 No.{pkt.number} 包含的层: {layer_names}")
-
-    # pyshark 可以识别
-    for processor in AVAILABLE_PROCESSORS:
-        # 检查 pkt 对象中是否包含对应的协议层（如 pkt.modbus, pkt.fins）
-        if processor.protocol_id in pkt:
-            print(f"找到匹配的处理器: {processor.protocol_id}")
-            return processor
-
-    # 特征判断
-    print("尝试特征判断...")
-    try:
-        raw_payload = None
-        if hasattr(pkt, 'udp') and hasattr(pkt.udp, 'payload'):
-            raw_payload = pkt.udp.payload
-        elif hasattr(pkt, 'tcp') and hasattr(pkt.tcp, 'payload'):
-            raw_payload = pkt.tcp.payload
-        elif hasattr(pkt, 'data') and hasattr(pkt.data, 'data'):
-            raw_payload = pkt.data.data
-
-        if raw_payload:
-            # 去除冒号，转小写
-            hex_check = raw_payload.replace(':', '').lower()
-            # 检查魔数 "YERC"
-            if hex_check.startswith('59455243'):
-                print(f"检测到 Yaskawa HSE 协议特征 (UDP/TCP Payload)")
-                # 返回一个新的 YaskawaProcessor 实例，或者复用单例
-                return AVAILABLE_PROCESSORS[3]  # 假设它是第4个
-    except Exception:
-        pass
-
-    return None
\ No newline at end of file
+    global _default_dispatcher
+    if processors is not None:
+        return ProcessorDispatcher(processors).dispatch(pkt)
+    if _default_dispatcher is None:
+        _default_dispatcher = ProcessorDispatcher(AVAILABLE_PROCESSORS)
+    return _default_dispatcher.dispatch(pkt)
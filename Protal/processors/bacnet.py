@@ -1,12 +1,180 @@
 from .base import BaseProtocolProcessor
+import struct
 import logging
 
 logger = logging.getLogger(__name__)
 
+_REAL = struct.Struct('>f')
+_DOUBLE = struct.Struct('>d')
+
+# 标签记号的种类 (见 _tokenize)
+_OPEN, _CLOSE, _CONTEXT, _APP = range(4)
+
+# 应用标签号 -> 数据类型名
+APP_TAG_NAMES = ('NULL', 'BOOLEAN', 'UNSIGNED', 'SIGNED', 'REAL', 'DOUBLE', 'OCTET STRING',
+                 'CHARACTER STRING', 'BIT STRING', 'ENUMERATED', 'DATE', 'TIME', 'OBJECT IDENTIFIER')
+
+# 字符串编码 (Character String 的首字节)
+_CHARSETS = {0: 'utf-8', 3: 'utf-32-be', 4: 'utf-16-be', 5: 'latin-1'}
+
+# BVLC 中携带 NPDU 的功能: Forwarded-NPDU (多 6 字节源地址) / Distribute-Broadcast / Original-Unicast / Original-Broadcast
+_BVLC_NPDU_OFFSETS = {0x04: 10, 0x09: 4, 0x0A: 4, 0x0B: 4}
+
+
+def _unsigned(data):
+    return int.from_bytes(data, 'big')
+
+
+def _date(data):
+    # 第 4 字节为星期，不输出
+    year, month, day = data[:3]
+    parts = ('*' if year == 255 else str(1900 + year), '*' if month == 255 else f"{month:02d}",
+             '*' if day == 255 else f"{day:02d}")
+    return '-'.join(parts)
+
+
+def _time(data):
+    text = ':'.join('*' if v == 255 else f"{v:02d}" for v in data[:3])
+    if data[3] != 255:
+        text += f".{data[3]:02d}"
+    return text
+
+
+def _decode_app(number, data):
+    """应用标签内容 -> Python 值"""
+    if number == 4:
+        # float32 取 7 位有效数字，避免 21.299999237060547 这样的显示
+        return float(f"{_REAL.unpack_from(data)[0]:.7g}")
+    if number in (2, 9):
+        return _unsigned(data)
+    if number == 7:
+        return bytes(data[1:]).decode(_CHARSETS.get(data[0], 'latin-1'), 'replace') if data else ''
+    if number == 12:
+        return BacnetProcessor.object_id(data)
+    if number == 3:
+        return int.from_bytes(data, 'big', signed=True)
+    if number == 8:
+        if not data:
+            return ''
+        bits = ''.join(f"{byte:08b}" for byte in data[1:])
+        return bits[:len(bits) - data[0]]
+    if number == 5:
+        return _DOUBLE.unpack_from(data)[0]
+    if number == 6:
+        return f"0x{data.hex()}"
+    if number == 10:
+        return _date(data)
+    if number == 11:
+        return _time(data)
+    return None
+
+
+def _tokenize(buf):
+    """
+    服务数据 -> 标签记号列表 [(种类, 标签号, 内容)]，单次遍历
+
+    上下文标签的内容保留原始字节 (含义取决于服务)，应用标签直接解码为值；
+    数据被截断 (分段传输的首段等) 时返回已解析的部分
+    """
+    tokens = []
+    pos, end = 0, len(buf)
+    try:
+        while pos < end:
+            byte = buf[pos]
+            pos += 1
+            number = byte >> 4
+            if number == 15:
+                number = buf[pos]
+                pos += 1
+            lvt = byte & 0x07
+            context = byte & 0x08
+            if context and lvt == 6:
+                tokens.append((_OPEN, number, None))
+                continue
+            if context and lvt == 7:
+                tokens.append((_CLOSE, number, None))
+                continue
+            if not context and number == 1:
+                # 布尔值直接编码在 LVT 中
+                tokens.append((_APP, 1, bool(lvt)))
+                continue
+            if lvt == 5:
+                lvt = buf[pos]
+                pos += 1
+                if lvt == 254:
+                    lvt = (buf[pos] << 8) | buf[pos + 1]
+                    pos += 2
+                elif lvt == 255:
+                    lvt = _unsigned(buf[pos:pos + 4])
+                    pos += 4
+            if pos + lvt > end:
+                break
+            data = buf[pos:pos + lvt]
+            pos += lvt
+            tokens.append((_CONTEXT, number, data) if context else (_APP, number, _decode_app(number, data)))
+    except (IndexError, struct.error):
+        pass
+    return tokens
+
+
+def _constructed(tokens, i):
+    """
+    tokens[i] 为开始标签：收集到匹配的结束标签为止的应用标签值
+
+    Returns:
+        tuple: ([(应用标签号, 值), ...], 结束标签之后的下标)
+    """
+    values = []
+    depth = 0
+    for j in range(i, len(tokens)):
+        kind, number, data = tokens[j]
+        if kind == _OPEN:
+            depth += 1
+        elif kind == _CLOSE:
+            depth -= 1
+            if depth == 0:
+                return values, j + 1
+        elif kind == _APP:
+            values.append((number, data))
+    return values, len(tokens)
+
 
 class BacnetProcessor(BaseProtocolProcessor):
     protocol_id = 'BACNET'
 
+    DISPLAY_FILTER = 'bacapp'
+    DEFAULT_PORTS = (47808,)
+    PROTOCOL_ALIASES = ('bacnet', 'bacapp')
+    VERSION = 3
+    FLOW_CODE_FIELD = 'service'
+
+    TSHARK_FIELDS = (
+        'bacapp.type',
+        'bacapp.confirmed_service',
+        'bacapp.unconfirmed_service',
+        'bacapp.service',
+        'bacapp.invoke_id',
+        'bacapp.objectidentifier',
+        'bacapp.objecttype',
+        'bacapp.instance_number',
+        'bacapp.object_identifier',
+        'bacapp.property_identifier',
+        'bacapp.property_value',
+        'bacapp.real',
+        'bacapp.boolean',
+        'bacapp.unsigned_integer',
+        'bacapp.signed_integer',
+        'bacapp.character_string',
+        'bacapp.bit_string',
+        'bacapp.enumerated',
+    )
+
+    # 确认请求 (Confirmed-REQ) 的关联表 (按连接 + invoke id)
+    CORRELATION_STATE = ('pending_invokes',)
+
+    # 对确认请求的应答类型：Simple-ACK / Complex-ACK / Error / Reject / Abort
+    RESPONSE_TYPES = (2, 3, 5, 6, 7)
+
     APDU_TYPES = {
         0: 'Confirmed-REQ',  # 确认请求
         1: 'Unconfirmed-REQ',  # 非确认请求
@@ -18,6 +186,46 @@ class BacnetProcessor(BaseProtocolProcessor):
         7: 'Abort'
     }
 
+    # 原生后端：直接解析 BVLC / NPDU / APDU 与服务数据中的标签
+    NATIVE_DECODER = True
+
+    # 服务选择 -> 名称 (与 Wireshark 的显示一致)
+    CONFIRMED_SERVICES = {
+        0: 'acknowledgeAlarm', 1: 'confirmedCOVNotification', 2: 'confirmedEventNotification',
+        5: 'subscribeCOV', 6: 'atomicReadFile', 7: 'atomicWriteFile', 8: 'addListElement',
+        9: 'removeListElement', 10: 'createObject', 11: 'deleteObject', 12: 'readProperty',
+        14: 'readPropertyMultiple', 15: 'writeProperty', 16: 'writePropertyMultiple',
+        17: 'deviceCommunicationControl', 20: 'reinitializeDevice', 26: 'readRange',
+        28: 'subscribeCOVProperty', 29: 'getEventInformation',
+    }
+    UNCONFIRMED_SERVICES = {
+        0: 'i-Am', 1: 'i-Have', 2: 'unconfirmedCOVNotification', 3: 'unconfirmedEventNotification',
+        5: 'unconfirmedTextMessage', 6: 'timeSynchronization', 7: 'who-Has', 8: 'who-Is',
+        9: 'utcTimeSynchronization',
+    }
+
+    OBJECT_TYPES = {
+        0: 'analog-input', 1: 'analog-output', 2: 'analog-value', 3: 'binary-input', 4: 'binary-output',
+        5: 'binary-value', 6: 'calendar', 7: 'command', 8: 'device', 9: 'event-enrollment', 10: 'file',
+        11: 'group', 12: 'loop', 13: 'multi-state-input', 14: 'multi-state-output', 15: 'notification-class',
+        16: 'program', 17: 'schedule', 19: 'multi-state-value', 20: 'trend-log',
+    }
+
+    PROPERTY_IDS = {
+        8: 'all', 28: 'description', 36: 'event-state', 75: 'object-identifier', 76: 'object-list',
+        77: 'object-name', 79: 'object-type', 80: 'optional', 81: 'out-of-service', 85: 'present-value',
+        87: 'priority-array', 103: 'reliability', 104: 'relinquish-default', 105: 'required',
+        111: 'status-flags', 117: 'units',
+    }
+
+    # 属性列表类服务的标签布局:
+    # (对象标签, 列表开始标签, 属性标签, 数组下标标签, 值标签, 优先级标签, 错误标签)，None 表示没有该项
+    _PROPERTY_ACCESS = (0, None, 1, 2, 3, 4, None)   # ReadProperty / ReadProperty-ACK / WriteProperty
+    _RPM_REQUEST = (0, 1, 0, 1, None, None, None)
+    _RPM_ACK = (0, 1, 2, 3, 4, None, 5)
+    _WPM_REQUEST = (0, 1, 0, 1, 2, 3, None)
+    _COV_NOTIFICATION = (2, 4, 0, 1, 2, 3, None)
+
     def parse(self, pkt):
         try:
             if hasattr(pkt, 'bacapp'):
@@ -64,6 +272,14 @@ class BacnetProcessor(BaseProtocolProcessor):
                 "invoke_id": invoke_id
             }
 
+            # 5. 请求/响应关联
+            if invoke_id is not None:
+                if type_int == 0:
+                    self.pending_invokes.request(pkt, invoke_id, {'frame': str(pkt.number), 'service': service_str})
+                elif type_int in self.RESPONSE_TYPES:
+                    context, latency_ms = self.pending_invokes.response(pkt, invoke_id)
+                    extra_info.update(self.pairing_info(context, latency_ms))
+
             return self.create_standard_result(
                 pkt,
                 protocol_name="BACnet/IP",
@@ -72,8 +288,207 @@ class BacnetProcessor(BaseProtocolProcessor):
             )
 
         except Exception as e:
-            logger.debug(f"BACnet parse error: {e}")
-            return None
+            return self.parse_failed(pkt, e)
+
+    def is_error(self, result):
+        return result['other'].get('apdu_type') in ('Error', 'Reject', 'Abort')
+
+    @classmethod
+    def object_id(cls, data):
+        """4 字节对象标识 (10 位类型 + 22 位实例号) -> "analog-input:5" """
+        value = _unsigned(data)
+        object_type = value >> 22
+        return f"{cls.OBJECT_TYPES.get(object_type, object_type)}:{value & 0x3FFFFF}"
+
+    # ==========================================
+    # 原生解码 (BVLC / NPDU / APDU 字节)
+    # ==========================================
+    def parse_native(self, pkt):
+        """
+        直接解析 BACnet/IP：BVLC -> NPDU (跳过 DNET / SNET 路由信息) -> APDU，
+        服务数据按标签单次遍历 (_tokenize) 后按服务布局取出对象标识、属性与值
+
+        支持 ReadProperty / ReadPropertyMultiple / WriteProperty / WritePropertyMultiple 的请求与应答、
+        (非) 确认 COV 通知、Error / Reject / Abort。分段应答只解析首段中完整的部分。
+        """
+        try:
+            payload = pkt.payload
+            if len(payload) < 6 or payload[0] != 0x81:
+                return None
+            offset = _BVLC_NPDU_OFFSETS.get(payload[1])
+            if offset is None:
+                return None
+
+            # NPDU: 版本、控制字节 (bit7 = 网络层报文，无 APDU)
+            control = payload[offset + 1]
+            if control & 0x80:
+                return None
+            offset += 2
+            if control & 0x20:
+                offset += 3 + payload[offset + 2]    # DNET + DLEN + DADR
+            if control & 0x08:
+                offset += 3 + payload[offset + 2]    # SNET + SLEN + SADR
+            if control & 0x20:
+                offset += 1                          # hop count
+            apdu = payload[offset:]
+
+            apdu_type = apdu[0] >> 4
+            type_desc = self.APDU_TYPES.get(apdu_type, f"Unknown({apdu_type})")
+            invoke_id = None
+            service = None
+            data = apdu[:0]
+            first_segment = True
+            extra = {}
+
+            if apdu_type == 0:
+                segmented = apdu[0] & 0x08
+                invoke_id = apdu[2]
+                header = 6 if segmented else 4
+                first_segment = not segmented or apdu[3] == 0
+                service = self.CONFIRMED_SERVICES.get(apdu[header - 1], str(apdu[header - 1]))
+                data = apdu[header:]
+            elif apdu_type == 1:
+                service = self.UNCONFIRMED_SERVICES.get(apdu[1], str(apdu[1]))
+                data = apdu[2:]
+            elif apdu_type == 3:
+                segmented = apdu[0] & 0x08
+                invoke_id = apdu[1]
+                header = 5 if segmented else 3
+                first_segment = not segmented or apdu[2] == 0
+                service = self.CONFIRMED_SERVICES.get(apdu[header - 1], str(apdu[header - 1]))
+                data = apdu[header:]
+            elif apdu_type in (2, 5):
+                invoke_id = apdu[1]
+                service = self.CONFIRMED_SERVICES.get(apdu[2], str(apdu[2]))
+                data = apdu[3:]
+            elif apdu_type in (4, 6, 7):
+                invoke_id = apdu[1]
+                if apdu_type != 4:
+                    extra["reason"] = str(apdu[2])
+
+            service_str = service or "Unknown"
+            extra_info = {
+                "apdu_type": type_desc,
+                "service": service_str,
+                "invoke_id": None if invoke_id is None else str(invoke_id)
+            }
+            extra_info.update(extra)
+
+            # 请求/响应关联 (分段传输只有首段参与配对)
+            if invoke_id is not None and first_segment:
+                if apdu_type == 0:
+                    self.pending_invokes.request(pkt, invoke_id, {'frame': str(pkt.number), 'service': service_str})
+                elif apdu_type in self.RESPONSE_TYPES:
+                    context, latency_ms = self.pending_invokes.response(pkt, invoke_id)
+                    extra_info.update(self.pairing_info(context, latency_ms))
+
+            tokens = _tokenize(data) if data and first_segment else []
+            if apdu_type == 5:
+                # Error: 错误类别 + 错误码 (两个枚举值)
+                codes = [value for kind, number, value in tokens if kind == _APP and number == 9]
+                if len(codes) >= 2:
+                    extra_info["error_class"] = str(codes[0])
+                    extra_info["error_code"] = str(codes[1])
+            items = self._native_items(apdu_type, service, tokens, type_desc, service_str)
+
+            return self.create_standard_result(
+                pkt,
+                protocol_name="BACnet/IP",
+                data_objects=items,
+                extra_info=extra_info,
+                normalized=True
+            )
+        except Exception as e:
+            return self.parse_failed(pkt, e)
+
+    def _native_items(self, apdu_type, service, tokens, type_desc, service_str):
+        if apdu_type == 0:
+            if service in ('readProperty', 'readPropertyMultiple'):
+                layout = self._PROPERTY_ACCESS if service == 'readProperty' else self._RPM_REQUEST
+                return [self._property_item(entry, "Read Request") for entry in self._walk(tokens, layout)[0]]
+            if service in ('writeProperty', 'writePropertyMultiple'):
+                layout = self._PROPERTY_ACCESS if service == 'writeProperty' else self._WPM_REQUEST
+                return [self._property_item(entry, "Write Request") for entry in self._walk(tokens, layout)[0]]
+        if service in ('confirmedCOVNotification', 'unconfirmedCOVNotification'):
+            entries, header = self._walk(tokens, self._COV_NOTIFICATION)
+            description = f"COV from {self.object_id(header[1])}" if 1 in header else "COV Notification"
+            return [self._property_item(entry, "COV Notification", description) for entry in entries]
+        if apdu_type == 3 and service in ('readProperty', 'readPropertyMultiple'):
+            layout = self._PROPERTY_ACCESS if service == 'readProperty' else self._RPM_ACK
+            return [self._property_item(entry, "Read Response") for entry in self._walk(tokens, layout)[0]]
+
+        return [{"address": "N/A", "value": type_desc, "other": {}, "type": "Info",
+                 "description": f"Status: {service_str}"}]
+
+    def _walk(self, tokens, layout):
+        """
+        按服务的标签布局遍历记号
+
+        Returns:
+            tuple: ([[对象, 属性, 数组下标, 值列表, 优先级, 错误值列表], ...], {列表外的上下文标签号: 原始字节})
+        """
+        obj_tag, list_tag, prop_tag, index_tag, value_tag, priority_tag, error_tag = layout
+        entries = []
+        header = {}
+        obj = None
+        in_list = list_tag is None
+        i, count = 0, len(tokens)
+        while i < count:
+            kind, number, data = tokens[i]
+            if kind == _OPEN:
+                if not in_list and number == list_tag:
+                    in_list = True
+                    i += 1
+                    continue
+                values, i = _constructed(tokens, i)
+                if in_list and entries:
+                    if number == value_tag:
+                        entries[-1][3] = values
+                    elif number == error_tag:
+                        entries[-1][5] = values
+                continue
+            if kind == _CLOSE:
+                if number == list_tag:
+                    in_list = False
+            elif kind == _CONTEXT:
+                if number == obj_tag and (list_tag is None or not in_list):
+                    obj = self.object_id(data)
+                elif not in_list:
+                    header[number] = data
+                elif number == prop_tag:
+                    prop = _unsigned(data)
+                    entries.append([obj, self.PROPERTY_IDS.get(prop, str(prop)), None, None, None, None])
+                elif entries and number == index_tag:
+                    entries[-1][2] = _unsigned(data)
+                elif entries and number == priority_tag:
+                    entries[-1][4] = _unsigned(data)
+            i += 1
+        return entries, header
+
+    @staticmethod
+    def _property_item(entry, item_type, description=None):
+        obj, prop, index, values, priority, error = entry
+        address = f"Obj: {obj} / Prop: {prop}" if index is None else f"Obj: {obj} / Prop: {prop}[{index}]"
+        other = {}
+        if error is not None:
+            codes = [str(value) for _number, value in error]
+            value = "N/A"
+            description = f"Error (class {codes[0]}, code {codes[1]})" if len(codes) >= 2 else "Error"
+            other["error"] = codes
+        elif values is None:
+            value = "Requesting Value..."
+            description = description or f"Reading {address}"
+        else:
+            if len(values) == 1:
+                tag, value = values[0]
+                other["value_type"] = APP_TAG_NAMES[tag] if tag < len(APP_TAG_NAMES) else str(tag)
+            else:
+                value = [v for _number, v in values]
+            if priority is not None:
+                other["priority"] = priority
+            if description is None:
+                description = f"Writing to {address}" if item_type == "Write Request" else "Read Result"
+        return {"address": address, "value": value, "other": other, "type": item_type, "description": description}
 
     def _extract_bacnet_data(self, layer, type_int, service_str):
         items = []
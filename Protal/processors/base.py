@@ -1,5 +1,14 @@
 # processors/base.py
 import json
+import time
+import logging
+
+from utils import metrics
+from .correlation import CorrelationTable
+
+logger = logging.getLogger(__name__)
+
+_NORMALIZE_KEY = metrics.metric_key('openlist_stage_seconds_total', stage='normalize')
 
 
 class BaseProtocolProcessor:
@@ -14,7 +23,117 @@ class BaseProtocolProcessor:
     # 任何不在这里面的字段，都会被自动移到 'other' 中
     STANDARD_ITEM_FIELDS = ['address', 'value', 'description', 'type']
 
-    def create_standard_result(self, pkt, protocol_name, data_objects, extra_info=None):
+    # tshark 字段提取模式 (-T ek) 下本处理器需要导出的字段
+    # 子类按需覆盖，字段名使用 Wireshark 的完整字段名 (如 'modbus.func_code')
+    TSHARK_FIELDS = ()
+
+    # 过滤下推：本处理器在 tshark 显示过滤器中对应的表达式 (None 表示不参与过滤)
+    DISPLAY_FILTER = None
+
+    # 原生后端预过滤使用的端口与负载魔数 (pcap 中无 dissector 信息时的启发式判断)
+    # PAYLOAD_MAGIC 同时作为 get_processor 在协议层名未命中时的负载特征
+    DEFAULT_PORTS = ()
+    PAYLOAD_MAGIC = None
+
+    # get_processor 分发表中对应本处理器的 dissector 层名 (为空时使用 protocol_id 小写)
+    LAYER_NAMES = ()
+
+    # /api/analyze 的 type 参数中可用来选择本处理器的名称
+    PROTOCOL_ALIASES = ()
+
+    # 请求/响应关联表的属性名 (如 'pending_requests')，实例化时各自创建一个 CorrelationTable
+    CORRELATION_STATE = ()
+
+    # 是否实现了直接解析原始负载字节的 parse_native：原生后端没有 dissector 层名，
+    # 分发时按 DEFAULT_PORTS 把数据包交给声明了原生解码器的处理器
+    NATIVE_DECODER = False
+
+    # 会话表 (utils.flows) 中作为功能码统计的结果字段 (result['other'] 中的键，None 表示不统计)
+    FLOW_CODE_FIELD = None
+
+    # 解析逻辑或输出内容变化时递增，磁盘结果缓存据此自动失效
+    VERSION = 1
+
+    def __init__(self):
+        # 关联表按 "连接 + 事务号" 索引，并受 CORRELATION_TTL / CORRELATION_MAX_PENDING 限制
+        name = getattr(self, 'protocol_id', type(self).__name__).lower()
+        for attr in self.CORRELATION_STATE:
+            setattr(self, attr, CorrelationTable(name))
+
+    def reset_state(self):
+        """
+        清空请求/响应关联状态 (并行分析时每个数据块开始前调用)
+        """
+        for name in self.CORRELATION_STATE:
+            getattr(self, name).clear()
+
+    def export_state(self):
+        """
+        复制当前的请求/响应关联状态 (增量分析在两次请求之间保存)
+
+        Returns:
+            dict: {状态属性名: 关联表快照}
+        """
+        return {name: getattr(self, name).snapshot() for name in self.CORRELATION_STATE}
+
+    def import_state(self, state):
+        """
+        恢复 export_state 保存的关联状态 (先清空当前状态)
+        """
+        self.reset_state()
+        for name, value in (state or {}).items():
+            if name in self.CORRELATION_STATE:
+                getattr(self, name).restore(value)
+
+    def parse_native(self, pkt):
+        """
+        原生后端数据包 (utils.native_reader.NativePacket，只有 L2-L4 头部与负载 memoryview) 的解析入口
+
+        默认沿用 parse (如 Yaskawa 通过 udp.payload 的 Hex 字符串解析)，实现了字节级解码的子类覆盖本方法
+        """
+        return self.parse(pkt)
+
+    def flow_code(self, result):
+        """
+        会话表中统计的功能码 (默认取 result['other'][FLOW_CODE_FIELD])
+        """
+        if self.FLOW_CODE_FIELD is None:
+            return None
+        return result['other'].get(self.FLOW_CODE_FIELD)
+
+    def is_error(self, result):
+        """
+        结果是否为错误 / 异常响应 (会话表的 errors 计数)，子类按协议覆盖
+        """
+        return False
+
+    @staticmethod
+    def pairing_info(context, latency_ms):
+        """
+        响应配对成功时附加到 extra_info 的字段 (请求帧号与请求 -> 响应时延)
+
+        Args:
+            context: CorrelationTable.response 取回的请求上下文 (含 'frame')
+            latency_ms: 时延毫秒，未配对时为 None
+        """
+        if latency_ms is None:
+            return {}
+        return {"request_frame": context.get('frame'), "latency_ms": round(latency_ms, 3)}
+
+    def parse_failed(self, pkt, error, level=logging.DEBUG):
+        """
+        parse 中捕获到异常时调用：记录日志与失败计数 (/api/metrics)，返回 None
+
+        Args:
+            pkt: 数据包对象
+            error: 捕获到的异常
+            level: 日志级别
+        """
+        logger.log(level, f"{self.protocol_id} parse error (No.{getattr(pkt, 'number', '?')}): {error}")
+        metrics.record('openlist_processor_packets_total', processor=self.protocol_id.lower(), result='failed')
+        return None
+
+    def create_standard_result(self, pkt, protocol_name, data_objects, extra_info=None, normalized=False):
         """
         统一格式生成器
 
@@ -23,41 +142,49 @@ class BaseProtocolProcessor:
             protocol_name: 协议名称 (如 "Modbus TCP")
             data_objects: 提取出的数据列表 (包含各种杂乱字段)
             extra_info: 额外的包级别信息 (如 func_code, tns)
+            normalized: data_objects 已是标准数据项 ({address, value, other, [type, description]}) 时为 True，
+                        跳过逐项映射 (原生解码器直接构造标准数据项，大块寄存器响应省去一次逐项拷贝)
         """
+        batch = metrics.active_batch()
+        started = time.perf_counter() if batch is not None else 0.0
+
         if extra_info is None:
             extra_info = {}
 
         # 1. 统一数据项 (Items Normalization)
-        normalized_items = []
-        for item in data_objects:
-            standard_item = {
-                "address": "N/A",
-                "value": "N/A",
-                "other": {}  # 专门存放协议特有字段
-            }
-
-            # --- 智能字段映射 ---
-            # 把各种叫法的地址统一映射为 'address'
-            if 'register_id' in item:
-                standard_item['address'] = item.pop('register_id')
-            elif 'address' in item:
-                standard_item['address'] = item.pop('address')
-
-            # 把各种叫法的值统一映射为 'value'
-            if 'value' in item:
-                standard_item['value'] = item.pop('value')
-
-            # 处理其他标准字段 (type, description)
-            for field in ['type', 'description']:
-                if field in item:
-                    standard_item[field] = item.pop(field)
-
-            # --- 剩余字段归档 ---
-            # 剩下的所有字段 (raw_hex, area_code, unit_id 等) 全部塞入 other
-            # 并将 extra_info 里的信息也合并进来（如果是针对该 item 的上下文）
-            standard_item['other'].update(item)
-
-            normalized_items.append(standard_item)
+        if normalized:
+            normalized_items = data_objects
+        else:
+            normalized_items = []
+            for item in data_objects:
+                standard_item = {
+                    "address": "N/A",
+                    "value": "N/A",
+                    "other": {}  # 专门存放协议特有字段
+                }
+
+                # --- 智能字段映射 ---
+                # 把各种叫法的地址统一映射为 'address'
+                if 'register_id' in item:
+                    standard_item['address'] = item.pop('register_id')
+                elif 'address' in item:
+                    standard_item['address'] = item.pop('address')
+
+                # 把各种叫法的值统一映射为 'value'
+                if 'value' in item:
+                    standard_item['value'] = item.pop('value')
+
+                # 处理其他标准字段 (type, description)
+                for field in ['type', 'description']:
+                    if field in item:
+                        standard_item[field] = item.pop(field)
+
+                # --- 剩余字段归档 ---
+                # 剩下的所有字段 (raw_hex, area_code, unit_id 等) 全部塞入 other
+                # 并将 extra_info 里的信息也合并进来（如果是针对该 item 的上下文）
+                standard_item['other'].update(item)
+
+                normalized_items.append(standard_item)
 
         # 2. 统一包结构 (Packet Normalization)
         # 将 extra_info 中不属于标准字段的内容也放入包级的 other
@@ -78,4 +205,6 @@ class BaseProtocolProcessor:
             "other": packet_other  # 包级别的特有字段 (如 tns, sid, func_code)
         }
 
+        if batch is not None:
+            batch.add_key(_NORMALIZE_KEY, time.perf_counter() - started)
         return result
\ No newline at end of file
@@ -1,12 +1,188 @@
 from .base import BaseProtocolProcessor
+import struct
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# 封装头: 命令、长度、会话句柄、状态、发送方上下文、选项
+_ENCAP = struct.Struct('<HHII8sI')
+# SendRRData / SendUnitData 的 CPF 头: 接口句柄、超时、条目数
+_CPF = struct.Struct('<IHH')
+_CPF_ITEM = struct.Struct('<HH')
+_UINT = struct.Struct('<H')
+_UDINT = struct.Struct('<I')
+# Read Tag Fragmented 请求: 元素数、字节偏移
+_FRAGMENT = struct.Struct('<HI')
+
+# 携带 CIP 报文的封装命令: SendRRData (非连接) / SendUnitData (连接)
+SEND_RR_DATA = 0x6F
+SEND_UNIT_DATA = 0x70
+
+# CIP 数据类型码 -> (名称, struct 格式)
+CIP_DATA_TYPES = {
+    0xC1: ('BOOL', '?'),
+    0xC2: ('SINT', 'b'),
+    0xC3: ('INT', 'h'),
+    0xC4: ('DINT', 'i'),
+    0xC5: ('LINT', 'q'),
+    0xC6: ('USINT', 'B'),
+    0xC7: ('UINT', 'H'),
+    0xC8: ('UDINT', 'I'),
+    0xC9: ('ULINT', 'Q'),
+    0xCA: ('REAL', 'f'),
+    0xCB: ('LREAL', 'd'),
+    0xD1: ('BYTE', 'B'),
+    0xD2: ('WORD', 'H'),
+    0xD3: ('DWORD', 'I'),
+    0xD4: ('LWORD', 'Q'),
+}
+# 结构体类型 (其后跟 2 字节结构句柄)；Logix 内置 STRING 的句柄为 0x0FCE (DINT 长度 + 82 字节字符 + 填充)
+STRUCT_TYPE = 0x02A0
+LOGIX_STRING_HANDLE = 0x0FCE
+_LOGIX_STRING_SIZE = 88
+
+# 逻辑段类型 (段字节 bit2-4)
+_LOGICAL_NAMES = ('class', 'instance', 'member', 'connection_point', 'attribute')
+
+
+@lru_cache(maxsize=4096)
+def _parse_epath(path):
+    """
+    EPATH 字节 -> (符号名, 逻辑段)
+
+    符号段 (0x91) 之间以 '.' 连接，紧跟符号段的成员段为数组下标 ("Tag[1,2].Member")；
+    端口段 (路由路径) 与简单数据段跳过，遇到无法识别的段时停止。
+    轮询时同一批路径反复出现，按路径字节缓存结果 (返回的 dict 为共享对象，调用方不要修改)。
+
+    Args:
+        path: EPATH (bytes，memoryview 需先转换)
+
+    Returns:
+        tuple: (符号名或 None, {'class': 2, 'instance': 1, 'attribute': 3, ...})
+    """
+    names = []
+    logical = {}
+    pos, end = 0, len(path)
+    while pos < end:
+        segment = path[pos]
+        if segment == 0x91:
+            size = path[pos + 1]
+            names.append([bytes(path[pos + 2:pos + 2 + size]).decode('ascii', 'replace'), []])
+            pos += 2 + size + (size & 1)
+        elif segment & 0xE0 == 0x20:
+            fmt = segment & 0x03
+            if fmt == 0:
+                value = path[pos + 1]
+                pos += 2
+            elif fmt == 1:
+                value = _UINT.unpack_from(path, pos + 2)[0]
+                pos += 4
+            elif fmt == 2:
+                value = _UDINT.unpack_from(path, pos + 2)[0]
+                pos += 6
+            else:
+                break
+            kind = (segment >> 2) & 0x07
+            if kind == 2 and names:
+                names[-1][1].append(str(value))
+            elif kind < len(_LOGICAL_NAMES):
+                logical[_LOGICAL_NAMES[kind]] = value
+        elif segment & 0xE0 == 0:
+            # 端口段: 扩展链路地址时第二字节为地址长度，整段补齐到偶数字节
+            if segment & 0x10:
+                size = path[pos + 1]
+                pos += 2 + size + (size & 1)
+            else:
+                pos += 2
+        elif segment == 0x80:
+            pos += 2 + 2 * path[pos + 1]
+        else:
+            break
+
+    tag = '.'.join(f"{name}[{','.join(index)}]" if index else name for name, index in names) if names else None
+    return tag, logical
+
+
+def _path_address(tag, logical):
+    """EPATH 解析结果 -> 显示地址"""
+    if tag:
+        return f"Tag: {tag}"
+    if 'class' in logical:
+        address = f"Class 0x{logical['class']:02x}"
+        if 'instance' in logical:
+            address += f" / Inst {logical['instance']}"
+        if 'attribute' in logical:
+            address += f" / Attr {logical['attribute']}"
+        return address
+    return "Unknown Target"
+
+
+def _typed_values(data, request=False, fragmented=False):
+    """
+    类型码 + 数据 -> (类型名, 值)，单个元素时值为标量，多个元素为列表
+
+    Args:
+        data: Read Tag (Fragmented) 应答为 类型 + 值；Write Tag 请求为 类型 + 元素数 + 值
+        request: Write Tag 请求 (类型之后有元素数)
+        fragmented: Write Tag Fragmented 请求 (元素数之后还有 4 字节字节偏移)，分片只解码其中完整的元素
+    """
+    type_code = _UINT.unpack_from(data)[0]
+    handle = None
+    offset = 2
+    if type_code == STRUCT_TYPE:
+        handle = _UINT.unpack_from(data, 2)[0]
+        offset = 4
+    count = None
+    if request:
+        count = _UINT.unpack_from(data, offset)[0]
+        offset += 6 if fragmented else 2
+    body = data[offset:]
+
+    if handle is not None:
+        if handle == LOGIX_STRING_HANDLE:
+            values = []
+            for start in range(0, len(body) - 3, _LOGIX_STRING_SIZE):
+                length = min(_UDINT.unpack_from(body, start)[0], 82)
+                values.append(bytes(body[start + 4:start + 4 + length]).decode('latin-1'))
+            return 'STRING', values[0] if len(values) == 1 else values
+        return f"STRUCT 0x{handle:04x}", f"0x{body.hex()}"
+
+    spec = CIP_DATA_TYPES.get(type_code)
+    if spec is None:
+        if type_code == 0xDA and body:
+            return 'SHORT_STRING', bytes(body[1:1 + body[0]]).decode('latin-1')
+        if type_code == 0xD0 and len(body) >= 2:
+            return 'STRING', bytes(body[2:2 + _UINT.unpack_from(body)[0]]).decode('latin-1')
+        return f"0x{type_code:02x}", f"0x{body.hex()}"
+
+    name, fmt = spec
+    available = len(body) // struct.calcsize(fmt)
+    count = available if count is None else min(count, available)
+    values = struct.unpack_from(f'<{count}{fmt}', body)
+    return name, values[0] if count == 1 else list(values)
+
 
 class CippcccProcessor(BaseProtocolProcessor):
     protocol_id = 'cip'
 
+    DISPLAY_FILTER = 'cip || cipcm'
+    DEFAULT_PORTS = (44818, 2222)
+    PROTOCOL_ALIASES = ('cip', 'enip', 'pccc', 'cippccc')
+    VERSION = 3
+    FLOW_CODE_FIELD = 'service_code'
+
+    # 原生后端：直接解析 ENIP 封装 + CPF + CIP 报文 (EPATH、Multiple Service Packet、带类型的 Tag 值)
+    NATIVE_DECODER = True
+
+    # 覆盖 FIELD_MAP 中各别名在 cip / cipcm 两层的字段 (当前 tshark 不支持的字段会被自动忽略)
+    TSHARK_FIELDS = tuple(
+        f"{layer}.{name}"
+        for layer in ('cip', 'cipcm')
+        for name in ('service', 'sc', 'symbol', 'request_path', 'epath', 'path_segment',
+                     'class', 'instance', 'pccc.tns_code', 'tns', 'trans_id', 'sequence_count', 'data')
+    )
+
     CIP_SERVICES = {
         0x4C: 'Read Tag',
         0x4D: 'Write Tag',
@@ -15,8 +191,43 @@ class CippcccProcessor(BaseProtocolProcessor):
         0x52: 'Unconnected Send'
     }
 
-    # 全局字典：用于"记住"请求中的 Tag 名
-    pending_tags = {}
+    # 原生解码的服务名：0x52 / 0x53 发往 Tag 时为分片读写，发往连接管理器 (Class 0x06) 时按 CONNECTION_MANAGER_SERVICES
+    NATIVE_SERVICES = {**CIP_SERVICES, **{
+        0x03: 'Get Attribute List',
+        0x0A: 'Multiple Service Packet',
+        0x10: 'Set Attribute Single',
+        0x4E: 'Read Modify Write Tag',
+        0x52: 'Read Tag Fragmented',
+        0x53: 'Write Tag Fragmented',
+    }}
+    CONNECTION_MANAGER_SERVICES = {
+        0x4E: 'Forward Close',
+        0x52: 'Unconnected Send',
+        0x54: 'Forward Open',
+        0x5B: 'Large Forward Open',
+    }
+
+    # 常见的通用状态码
+    GENERAL_STATUS = {
+        0x00: 'Success',
+        0x01: 'Connection failure',
+        0x02: 'Resource unavailable',
+        0x04: 'Path segment error',
+        0x05: 'Path destination unknown',
+        0x06: 'Partial transfer',
+        0x08: 'Service not supported',
+        0x0E: 'Attribute not settable',
+        0x10: 'Device state conflict',
+        0x13: 'Not enough data',
+        0x14: 'Attribute not supported',
+        0x15: 'Too much data',
+        0x1E: 'Embedded service error',
+        0x26: 'Path size invalid',
+        0xFF: 'General error',
+    }
+
+    # 关联表：用于"记住"请求中的 Tag 名 (按连接 + 交易号)
+    CORRELATION_STATE = ('pending_tags',)
 
     FIELD_MAP = {
         # 1. 服务码
@@ -68,10 +279,12 @@ class CippcccProcessor(BaseProtocolProcessor):
             # 3. 智能地址/Tag 解析
             tag_name = None
             addr_info = "Unknown"
+            context, latency_ms = None, None
 
             if is_response:
                 # === 响应包 ===
-                tag_name = self.pending_tags.pop(tns_key, None)
+                context, latency_ms = self.pending_tags.response(pkt, tns_key)
+                tag_name = context['tag'] if context else None
                 if tag_name:
                     addr_info = f"Tag: {tag_name} (Response)"
                 else:
@@ -95,7 +308,7 @@ class CippcccProcessor(BaseProtocolProcessor):
                             break
 
                 if tag_name:
-                    self.pending_tags[tns_key] = tag_name
+                    self.pending_tags.request(pkt, tns_key, {'frame': str(pkt.number), 'tag': tag_name})
                     addr_info = f"Tag: {tag_name}"
                 else:
                     addr_info = self._get_physical_addr(layers)
@@ -149,6 +362,7 @@ class CippcccProcessor(BaseProtocolProcessor):
                 "is_response": is_response,
                 "decoded_tag": tag_name if tag_name else "N/A"
             }
+            extra_info.update(self.pairing_info(context, latency_ms))
 
             return self.create_standard_result(
                 pkt,
@@ -158,7 +372,185 @@ class CippcccProcessor(BaseProtocolProcessor):
             )
 
         except Exception as e:
-            logger.debug(f"CIP parse error: {e}")
+            return self.parse_failed(pkt, e)
+
+    # ==========================================
+    # 原生解码 (ENIP 封装 / CPF / CIP 字节)
+    # ==========================================
+    def parse_native(self, pkt):
+        """
+        直接解析 EtherNet/IP：封装头 -> CPF 条目 -> CIP 报文，Tag 名由 EPATH 的符号段 / 成员段得到
+
+        SendRRData (非连接，按发送方上下文配对) 与 SendUnitData (连接，按 CPF 序列号配对) 均支持；
+        Unconnected Send 解出内嵌报文，Multiple Service Packet 按偏移表拆成逐个服务，
+        应答通过请求中记下的地址列表还原每个值对应的 Tag。
+        一个 TCP 段中有多个封装报文时只解析第一个；其他封装命令 (注册会话、ListIdentity 等) 与 I/O 报文不输出结果。
+        """
+        try:
+            payload = pkt.payload
+            if len(payload) < 40:
+                return None
+            command, _length, _session, _status, sender_context, _options = _ENCAP.unpack_from(payload)
+            if command != SEND_RR_DATA and command != SEND_UNIT_DATA:
+                return None
+
+            item_count = _CPF.unpack_from(payload, 24)[2]
+            offset = 32
+            message = None
+            txid = None
+            for _ in range(item_count):
+                item_type, item_len = _CPF_ITEM.unpack_from(payload, offset)
+                offset += 4
+                if item_type == 0xB2:
+                    message = payload[offset:offset + item_len]
+                    txid = sender_context.hex()
+                elif item_type == 0xB1:
+                    txid = _UINT.unpack_from(payload, offset)[0]
+                    message = payload[offset + 2:offset + item_len]
+                offset += item_len
+            if message is None or len(message) < 2:
+                return None
+
+            if message[0] & 0x80:
+                items, extra_info = self._native_response(pkt, txid, message)
+            else:
+                items, extra_info = self._native_request(pkt, txid, message)
+
+            return self.create_standard_result(
+                pkt,
+                protocol_name="CIP (Industrial)",
+                data_objects=items,
+                extra_info=extra_info,
+                normalized=True
+            )
+        except Exception as e:
+            return self.parse_failed(pkt, e)
+
+    @staticmethod
+    def _split_request(message):
+        """CIP 请求 -> (服务码, 请求路径, 请求数据)"""
+        end = 2 + 2 * message[1]
+        return message[0], message[2:end], message[end:]
+
+    @staticmethod
+    def _split_response(message):
+        """CIP 应答 -> (服务码, 通用状态, 应答数据) (跳过附加状态)"""
+        return message[0], message[2], message[4 + 2 * message[3]:]
+
+    @staticmethod
+    def _packet_offsets(data):
+        """Multiple Service Packet 的数据 -> [(起始, 结束), ...] (偏移从服务数字段算起)"""
+        count = _UINT.unpack_from(data)[0]
+        offsets = struct.unpack_from(f'<{count}H', data, 2)
+        return list(zip(offsets, offsets[1:] + (len(data),)))
+
+    def _native_request(self, pkt, txid, message):
+        service, path, data = self._split_request(message)
+        tag, logical = _parse_epath(bytes(path))
+        if service == 0x52 and logical.get('class') == 0x06:
+            # Unconnected Send: 优先级 / 超时 + 内嵌报文长度 + 内嵌报文 (+ 路由路径)
+            size = _UINT.unpack_from(data, 2)[0]
+            service, path, data = self._split_request(data[4:4 + size])
+            tag, logical = _parse_epath(bytes(path))
+
+        extra_info = {"service_code": hex(service), "is_response": False}
+        if service == 0x0A:
+            items, targets, tags = [], [], []
+            for start, end in self._packet_offsets(data):
+                sub_service, sub_path, sub_data = self._split_request(data[start:end])
+                sub_tag, sub_logical = _parse_epath(bytes(sub_path))
+                address = _path_address(sub_tag, sub_logical)
+                items.append(self._request_item(sub_service, address, sub_logical, sub_data))
+                targets.append(address)
+                if sub_tag:
+                    tags.append(sub_tag)
+            tag = tags[0] if tags else None
+            extra_info["services"] = len(items)
+        else:
+            address = _path_address(tag, logical)
+            items = [self._request_item(service, address, logical, data)]
+            targets = [address]
+
+        extra_info["decoded_tag"] = tag if tag else "N/A"
+        self.pending_tags.request(pkt, txid, {'frame': str(pkt.number), 'tag': tag, 'targets': targets})
+        return items, extra_info
+
+    def _request_item(self, service, address, logical, data):
+        if logical.get('class') == 0x06:
+            service_name = self.CONNECTION_MANAGER_SERVICES.get(service, f"Service 0x{service:02x}")
+        else:
+            service_name = self.NATIVE_SERVICES.get(service, f"Service 0x{service:02x}")
+
+        if service == 0x4C or (service == 0x52 and 'class' not in logical):
+            other = {"elements": _UINT.unpack_from(data)[0] if len(data) >= 2 else 1}
+            if service == 0x52:
+                other["byte_offset"] = _FRAGMENT.unpack_from(data)[1]
+            return {"address": address, "value": service_name, "other": other, "type": "Operation",
+                    "description": service_name}
+        if service in (0x4D, 0x53) and len(data) >= 4:
+            fragmented = service == 0x53
+            data_type, value = _typed_values(data, request=True, fragmented=fragmented)
+            other = {"data_type": data_type}
+            if fragmented:
+                # 类型 (+ 结构句柄) + 元素数之后为字节偏移
+                type_code = _UINT.unpack_from(data)[0]
+                other["byte_offset"] = _UDINT.unpack_from(data, 6 if type_code == STRUCT_TYPE else 4)[0]
+            return {"address": address, "value": value, "other": other, "type": "Data Value",
+                    "description": f"{service_name} Value"}
+        if data:
+            return {"address": address, "value": f"0x{data.hex()}", "other": {}, "type": "Data Value",
+                    "description": f"{service_name} Value"}
+        return {"address": address, "value": service_name, "other": {}, "type": "Operation",
+                "description": f"{service_name} - No Data"}
+
+    def _native_response(self, pkt, txid, message):
+        service, status, data = self._split_response(message)
+        context, latency_ms = self.pending_tags.response(pkt, txid)
+        targets = (context.get('targets') or []) if context else []
+
+        extra_info = {"service_code": hex(service), "is_response": True,
+                      "decoded_tag": context['tag'] if context and context.get('tag') else "N/A",
+                      "general_status": f"0x{status:02x}"}
+        if service == 0x8A and status in (0x00, 0x1E):
+            items = []
+            for i, (start, end) in enumerate(self._packet_offsets(data)):
+                address = targets[i] if i < len(targets) else "Unknown Target"
+                items.append(self._response_item(*self._split_response(data[start:end]), address))
+            extra_info["services"] = len(items)
+        else:
+            items = [self._response_item(service, status, data, targets[0] if targets else "Unknown Target")]
+
+        extra_info.update(self.pairing_info(context, latency_ms))
+        return items, extra_info
+
+    def _response_item(self, service, status, data, address):
+        service_name = self.NATIVE_SERVICES.get(service & 0x7F, f"Service 0x{service & 0x7F:02x}")
+        if status not in (0x00, 0x06):
+            return {"address": address, "value": f"Error 0x{status:02x}",
+                    "other": {"general_status": f"0x{status:02x}"}, "type": "Operation",
+                    "description": f"{service_name} - {self.GENERAL_STATUS.get(status, 'Error')}"}
+        if (service == 0xCC or service == 0xD2) and len(data) >= 2:
+            data_type, value = _typed_values(data)
+            other = {"data_type": data_type}
+            if status == 0x06:
+                other["partial"] = True
+            return {"address": address, "value": value, "other": other, "type": "Data Value",
+                    "description": f"{service_name} Value"}
+        if data:
+            return {"address": address, "value": f"0x{data.hex()}", "other": {}, "type": "Data Value",
+                    "description": "Response Payload"}
+        return {"address": address, "value": "Success", "other": {}, "type": "Operation",
+                "description": f"{service_name} - No Data"}
+
+    def is_error(self, result):
+        # 原生解码的应答带通用状态 (0x06 为分片读写的 "还有后续数据"，不算错误)
+        return result['other'].get('general_status') not in (None, '0x00', '0x06')
+
+    def flow_code(self, result):
+        # 请求与响应的服务码只差 0x80 (响应标志位)，按服务统计
+        try:
+            return hex(int(result['other']['service_code'], 16) & 0x7F)
+        except (KeyError, ValueError):
             return None
 
     def _get_field_from_layers(self, layers, key, default=None):
@@ -201,21 +593,13 @@ class CippcccProcessor(BaseProtocolProcessor):
             if len(hex_str) < 40 and hex_str.isalnum() and not hex_str.startswith('0x') and not hex_str.isdigit():
                 return hex_str
 
-            clean = hex_str.replace(':', '').replace(' ', '').lower()
-            if '91' in clean:
-                parts = clean.split('91')
-                for part in parts[1:]:
-                    if len(part) < 2: continue
-                    try:
-                        len_byte = int(part[0:2], 16)
-                        if 0 < len_byte < 40:
-                            expected_len = len_byte * 2
-                            if len(part) >= 2 + expected_len:
-                                ascii_hex = part[2: 2 + expected_len]
-                                decoded = bytes.fromhex(ascii_hex).decode('utf-8')
-                                if decoded.isprintable(): return decoded
-                    except:
-                        continue
-        except:
+            # 按段解析 EPATH 字节 (与原生解码相同)，不再在 Hex 文本中搜索 '91'
+            clean = hex_str.replace(':', '').replace(' ', '')
+            if clean.startswith('0x'):
+                clean = clean[2:]
+            tag = _parse_epath(bytes.fromhex(clean))[0]
+            if tag and tag.isprintable():
+                return tag
+        except (ValueError, IndexError, struct.error):
             pass
         return None
\ No newline at end of file
@@ -0,0 +1,327 @@
+# processors/correlation.py
+"""
+请求/响应关联
+
+处理器原先用类级 dict 按 SID / 请求号 / TNS 保存未完成的请求：响应丢失时无限增长，
+不同 PLC 连接的相同事务号还会互相覆盖。这里提供统一的关联表：
+
+    - 键为 (客户端 IP, 客户端端口, 服务端 IP, 服务端端口, 事务号)，不同连接互不干扰
+    - 按抓包时间 (而非系统时间) 的 TTL 过期 + 条数上限淘汰，多天的抓包内存也保持平稳
+    - 每配对成功一次得到一个请求 -> 响应时延，写入响应结果与时延统计
+
+时延统计按分析线程收集 (见 collect())：analyze_industrial_pcap 返回本次分析各协议的
+配对数、未匹配响应数、过期 / 淘汰数以及时延分布 (均值、最小、最大、P50 / P95 / P99)，
+分析结束时一并写入 /api/metrics。
+"""
+import time
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from config.settings import config
+from utils import metrics
+
+# 时延直方图的桶上界 (毫秒)，最后一个桶收集更大的值
+LATENCY_BUCKETS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+def packet_time(pkt):
+    """数据包的抓包时间 (epoch 秒)"""
+    ts = getattr(pkt, 'ts', None)
+    if isinstance(ts, float):
+        return ts
+    try:
+        return float(pkt.sniff_timestamp)
+    except (AttributeError, TypeError, ValueError):
+        return time.time()
+
+
+def packet_endpoints(pkt):
+    """
+    (源 IP, 源端口, 目的 IP, 目的端口)，各后端的端口类型不同 (int / str)，统一转为字符串
+    """
+    # 字段提取后端的数据包直接提供 (避免逐层构造字段对象)
+    if hasattr(type(pkt), 'endpoints'):
+        return pkt.endpoints
+
+    ip = getattr(pkt, 'ip', None) or getattr(pkt, 'ipv6', None)
+    transport = getattr(pkt, 'tcp', None) or getattr(pkt, 'udp', None)
+    src = str(ip.src) if ip is not None else ''
+    dst = str(ip.dst) if ip is not None else ''
+    sport = str(getattr(transport, 'srcport', '')) if transport is not None else ''
+    dport = str(getattr(transport, 'dstport', '')) if transport is not None else ''
+    return src, sport, dst, dport
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+def is_to_server(sport, dport, server_ports):
+    """
+    数据包是否为客户端 -> 服务端方向
+
+    Args:
+        sport / dport: 源 / 目的端口 (字符串)
+        server_ports: 服务端端口集合 (字符串)，通常取处理器的 DEFAULT_PORTS
+    """
+    if (dport in server_ports) != (sport in server_ports):
+        return dport in server_ports
+    # 两端都 (不) 是已知服务端端口时，端口号较小的一端视为服务端
+    return int(dport or 0) < int(sport or 0)
+
+
+class LatencyStats:
+    """
+    单个协议的关联统计 (固定大小：计数器 + 时延直方图)，可在进程间合并
+    """
+    __slots__ = ('pairs', 'unmatched', 'expired', 'evicted', 'total_ms', 'min_ms', 'max_ms', 'buckets')
+
+    def __init__(self):
+        self.pairs = 0
+        self.unmatched = 0
+        self.expired = 0
+        self.evicted = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add_latency(self, latency_ms):
+        self.pairs += 1
+        self.total_ms += latency_ms
+        if self.min_ms is None or latency_ms < self.min_ms:
+            self.min_ms = latency_ms
+        if self.max_ms is None or latency_ms > self.max_ms:
+            self.max_ms = latency_ms
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+
+    def merge(self, other):
+        self.pairs += other.pairs
+        self.unmatched += other.unmatched
+        self.expired += other.expired
+        self.evicted += other.evicted
+        self.total_ms += other.total_ms
+        for name, pick in (('min_ms', min), ('max_ms', max)):
+            values = [v for v in (getattr(self, name), getattr(other, name)) if v is not None]
+            setattr(self, name, pick(values) if values else None)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def percentile(self, fraction):
+        """按直方图估算分位数 (返回所在桶的上界，不超过实际最大值)"""
+        if not self.pairs:
+            return None
+        target = fraction * self.pairs
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min(LATENCY_BUCKETS_MS[i], self.max_ms) if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_raw(self):
+        return [self.pairs, self.unmatched, self.expired, self.evicted, self.total_ms,
+                self.min_ms, self.max_ms, list(self.buckets)]
+
+    @classmethod
+    def from_raw(cls, raw):
+        stats = cls()
+        (stats.pairs, stats.unmatched, stats.expired, stats.evicted, stats.total_ms,
+         stats.min_ms, stats.max_ms, stats.buckets) = raw
+        stats.buckets = list(stats.buckets)
+        return stats
+
+    def summary(self):
+        return {
+            "pairs": self.pairs,
+            "unmatched_responses": self.unmatched,
+            "expired_requests": self.expired,
+            "evicted_requests": self.evicted,
+            "latency_ms": {
+                "mean": round(self.total_ms / self.pairs, 3) if self.pairs else None,
+                "min": _round(self.min_ms),
+                "max": _round(self.max_ms),
+                "p50": _round(self.percentile(0.50)),
+                "p95": _round(self.percentile(0.95)),
+                "p99": _round(self.percentile(0.99)),
+            },
+        }
+
+
+class CorrelationStats:
+    """
+    一次分析中各协议的关联统计 {processor: LatencyStats}
+    """
+
+    def __init__(self):
+        self.protocols = {}
+
+    def get(self, name):
+        stats = self.protocols.get(name)
+        if stats is None:
+            stats = self.protocols[name] = LatencyStats()
+        return stats
+
+    def merge_raw(self, raw):
+        for name, values in (raw or {}).items():
+            self.get(name).merge(LatencyStats.from_raw(values))
+
+    def to_raw(self):
+        return {name: stats.to_raw() for name, stats in self.protocols.items()}
+
+    def summary(self):
+        return {name: stats.summary() for name, stats in sorted(self.protocols.items())}
+
+    def publish(self, batch=None):
+        """
+        写入 /api/metrics (分析结束时一次性写入，热路径上不逐包记录指标)
+
+        Args:
+            batch: 可选 MetricsBatch (并行分块时随结果带回主进程)，默认直接记录
+        """
+        if not config.METRICS_ENABLED:
+            return
+        add = batch.add if batch is not None else metrics.record
+        for name, stats in self.protocols.items():
+            for result, count in (('matched', stats.pairs), ('unmatched', stats.unmatched),
+                                  ('expired', stats.expired), ('evicted', stats.evicted)):
+                if count:
+                    add('openlist_correlation_pairs_total', count, processor=name, result=result)
+            if stats.pairs:
+                add('openlist_response_latency_seconds_total', stats.total_ms / 1000.0, processor=name)
+
+
+# ==========================================
+# 当前线程正在进行的分析 (与 utils.metrics 的 active_batch 相同的做法)
+# ==========================================
+_local = threading.local()
+
+
+class collect:
+    """
+    上下文管理器：在 with 块内，本线程所有关联表的配对 / 过期 / 淘汰都计入返回的 CorrelationStats
+
+    Args:
+        record_from: 只统计帧号 >= record_from 的数据包触发的事件 (并行分块时为块的首帧)
+        publish: 退出时是否把统计写入指标 (并行分块由调用方写入 MetricsBatch 带回主进程)
+
+        with collect() as stats:
+            ...
+        stats.summary()
+    """
+
+    def __init__(self, record_from=0, publish=True):
+        self.stats = CorrelationStats()
+        self.record_from = record_from
+        self.publish = publish
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = getattr(_local, 'active', None)
+        _local.active = self
+        return self.stats
+
+    def __exit__(self, *exc):
+        _local.active = self._previous
+        if self.publish:
+            self.stats.publish()
+        return False
+
+
+def _active_stats(name, pkt):
+    """
+    当前分析中 name 协议的统计；并行分块的预热区 (帧号 < record_from) 只建立关联状态，不计入统计
+    """
+    active = getattr(_local, 'active', None)
+    if active is None:
+        return None
+    if active.record_from and int(pkt.number) < active.record_from:
+        return None
+    return active.stats.get(name)
+
+
+class CorrelationTable:
+    """
+    按 "连接 + 事务号" 保存未完成请求的有界关联表
+
+    条目按插入顺序保存 (抓包时间基本单调)，过期检查只需查看最旧的几条，摊还 O(1)。
+    """
+
+    def __init__(self, name, ttl=None, max_entries=None):
+        self.name = name
+        self.ttl = float(config.CORRELATION_TTL if ttl is None else ttl)
+        self.max_entries = int(config.CORRELATION_MAX_PENDING if max_entries is None else max_entries)
+        self._entries = OrderedDict()  # key -> (ts, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def request(self, pkt, txid, value):
+        """
+        记录一个请求 (请求方向：源为客户端)
+
+        Args:
+            pkt: 请求数据包
+            txid: 事务号 (SID / 请求号 / TNS / PDU ref / invoke id 等)
+            value: 响应到达时需要取回的上下文
+        """
+        ts = packet_time(pkt)
+        key = packet_endpoints(pkt) + (str(txid),)
+        entries = self._entries
+        entries.pop(key, None)
+        entries[key] = (ts, value)
+        self._expire(ts, pkt)
+
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self._count('evicted', pkt)
+
+    def response(self, pkt, txid):
+        """
+        查找响应对应的请求 (响应方向与请求相反) 并移出关联表
+
+        Returns:
+            tuple: (请求上下文, 时延毫秒)；没有匹配的请求时返回 (None, None)
+        """
+        ts = packet_time(pkt)
+        src, sport, dst, dport = packet_endpoints(pkt)
+        entry = self._entries.pop((dst, dport, src, sport, str(txid)), None)
+        if entry is None:
+            self._count('unmatched', pkt)
+            return None, None
+
+        request_ts, value = entry
+        latency_ms = max(ts - request_ts, 0.0) * 1000.0
+        stats = _active_stats(self.name, pkt)
+        if stats is not None:
+            stats.add_latency(latency_ms)
+        return value, latency_ms
+
+    def _expire(self, now, pkt):
+        """移除抓包时间早于 now - ttl 的请求"""
+        if self.ttl <= 0:
+            return
+        deadline = now - self.ttl
+        entries = self._entries
+        while entries:
+            key, (ts, _value) = next(iter(entries.items()))
+            if ts >= deadline:
+                break
+            del entries[key]
+            self._count('expired', pkt)
+
+    def _count(self, result, pkt):
+        stats = _active_stats(self.name, pkt)
+        if stats is not None:
+            setattr(stats, result, getattr(stats, result) + 1)
+
+    # ---------- 增量分析的状态保存 / 恢复 ----------
+    def snapshot(self):
+        """[(key, ts, value), ...] (按插入顺序)"""
+        return [(key, ts, value) for key, (ts, value) in self._entries.items()]
+
+    def restore(self, items):
+        self._entries = OrderedDict((tuple(key), (ts, value)) for key, ts, value in items)
@@ -7,6 +7,30 @@ logger = logging.getLogger(__name__)
 class HartIpProcessor(BaseProtocolProcessor):
     protocol_id = 'HART_IP'
 
+    DISPLAY_FILTER = 'hart_ip'
+    DEFAULT_PORTS = (5094,)
+    PROTOCOL_ALIASES = ('hart', 'hart_ip', 'hart-ip')
+    VERSION = 2
+    FLOW_CODE_FIELD = 'message_id'
+
+    TSHARK_FIELDS = (
+        'hart_ip.message_id',
+        'hart_ip.message_type',
+        'hart_ip.status',
+        'hart_ip.transaction_id',
+        'hart_ip.session_init_inactivity_close_timer',
+        'hart_ip.session_init_master_type',
+        'hart.command',
+        'hart.address_long',
+        'hart.long_address',
+        'hart.response_code',
+        'hart.device_status',
+        'hart.device_specific_status',
+    )
+
+    # 请求-响应关联表 (按连接 + transaction_id)
+    CORRELATION_STATE = ('pending_transactions',)
+
     # 消息 ID 映射表
     MESSAGE_IDS = {
         0: 'Session Initiate',
@@ -91,6 +115,13 @@ class HartIpProcessor(BaseProtocolProcessor):
                 "status_code": status
             }
 
+            # 4. 请求/响应关联 (message_type: 0=Request, 1=Response)
+            if msg_type == 0:
+                self.pending_transactions.request(pkt, seq_num, {'frame': str(pkt.number), 'message_id': msg_id})
+            elif msg_type == 1:
+                context, latency_ms = self.pending_transactions.response(pkt, seq_num)
+                extra_info.update(self.pairing_info(context, latency_ms))
+
             return self.create_standard_result(
                 pkt,
                 protocol_name="HART-IP",
@@ -99,8 +130,14 @@ class HartIpProcessor(BaseProtocolProcessor):
             )
 
         except Exception as e:
-            logger.debug(f"HART-IP parse error: {e}")
-            return None
+            return self.parse_failed(pkt, e)
+
+    def is_error(self, result):
+        # HART-IP 头部状态非 0 表示会话层错误
+        try:
+            return int(str(result['other'].get('status_code', '0')), 0) != 0
+        except ValueError:
+            return False
 
     def _parse_hart_command(self, hart, msg_type_int):
         """解析内嵌的 HART 协议层"""
@@ -1,13 +1,51 @@
 # processors/modbus.py
 from .base import BaseProtocolProcessor
+from .correlation import packet_endpoints, is_to_server
+from utils.native_reader import be_words
+from itertools import chain
+import struct
 import logging
 
 logger = logging.getLogger(__name__)
 
+# MBAP 头: 事务号、协议号 (恒为 0)、长度 (含单元号)、单元号
+_MBAP = struct.Struct('>HHHB')
+_ADDR_QTY = struct.Struct('>HH')
+# 字节 -> 8 个线圈值 (低位在前)
+_BYTE_BITS = tuple(tuple((byte >> bit) & 1 for bit in range(8)) for byte in range(256))
+
+
+def _coils(data, count=None):
+    """线圈 / 离散输入的位图 -> 0/1 列表 (count 为请求的数量，用于去掉末字节的填充位)"""
+    bits = list(chain.from_iterable(_BYTE_BITS[byte] for byte in data))
+    return bits if count is None else bits[:count]
+
 
 class ModbusProcessor(BaseProtocolProcessor):
     protocol_id = 'MODBUS'
 
+    DISPLAY_FILTER = 'modbus'
+    DEFAULT_PORTS = (502,)
+    PROTOCOL_ALIASES = ('modbus', 'mbtcp')
+    VERSION = 4
+    FLOW_CODE_FIELD = 'func_code'
+
+    # 原生后端：直接从 TCP 负载解析 MBAP + PDU
+    NATIVE_DECODER = True
+
+    TSHARK_FIELDS = (
+        'modbus.func_code',
+        'modbus.reference_num',
+        'modbus.regval_uint16',
+        'modbus.bit_val',
+        'modbus.exception_code',
+        'mbtcp.trans_id',
+    )
+
+    # 请求-响应关联表 (按连接 + MBAP 事务号)
+    CORRELATION_STATE = ('pending_transactions',)
+    _server_ports = frozenset(str(port) for port in DEFAULT_PORTS)
+
     def parse(self, pkt):
         try:
             mb = pkt.modbus
@@ -15,15 +53,158 @@ class ModbusProcessor(BaseProtocolProcessor):
 
             data_objects = self._extract_data(mb, func_code)
 
+            extra_info = {"func_code": func_code}
+            # 异常响应：Wireshark 的 func_code 已去掉 0x80 标志位，异常码单独给出
+            if hasattr(mb, 'exception_code'):
+                extra_info["exception_code"] = str(mb.exception_code)
+            extra_info.update(self._correlate(pkt, func_code))
+
             return self.create_standard_result(
                 pkt,
                 protocol_name="Modbus",
                 data_objects=data_objects,
-                extra_info={"func_code": func_code}
+                extra_info=extra_info
+            )
+        except Exception as e:
+            return self.parse_failed(pkt, e)
+
+    def _correlate(self, pkt, func_code):
+        """
+        按 MBAP 事务号配对请求与响应：Modbus 请求与响应的功能码相同，按目的端口是否为服务端端口区分方向
+        (两端都不是 DEFAULT_PORTS 时，端口号较小的一端视为服务端)
+
+        Returns:
+            dict: 响应配对成功时为 {trans_id, request_frame, latency_ms}，否则只含 trans_id (如有)
+        """
+        mbtcp = getattr(pkt, 'mbtcp', None)
+        trans_id = getattr(mbtcp, 'trans_id', None) if mbtcp is not None else None
+        if trans_id is None:
+            return {}
+
+        trans_id = str(trans_id)
+        _src, sport, _dst, dport = packet_endpoints(pkt)
+        if is_to_server(sport, dport, self._server_ports):
+            self.pending_transactions.request(pkt, trans_id, {'frame': str(pkt.number), 'func_code': str(func_code)})
+            return {"trans_id": trans_id}
+
+        context, latency_ms = self.pending_transactions.response(pkt, trans_id)
+        return dict({"trans_id": trans_id}, **self.pairing_info(context, latency_ms))
+
+    # ==========================================
+    # 原生解码 (MBAP + PDU 字节)
+    # ==========================================
+    def parse_native(self, pkt):
+        """
+        直接解析 Modbus/TCP 负载：FC1-6 / 15 / 16 / 23 与异常响应
+
+        响应中没有起始地址 (FC1-4 / 23)，按事务号配对请求后取回起始地址与数量
+        (tshark 路径下由 Wireshark 自身的请求跟踪提供 reference_num)。
+        一个 TCP 段中有多个 ADU 时只解析第一个。
+        """
+        try:
+            payload = pkt.payload
+            if len(payload) < 8:
+                return None
+            trans_id, proto_id, length, _unit = _MBAP.unpack_from(payload)
+            if proto_id != 0 or length < 2:
+                return None
+            pdu = payload[7:6 + length]
+            fc = pdu[0]
+            func_code = str(fc & 0x7F)
+            transport = pkt.transport
+            to_server = is_to_server(str(transport.srcport), str(transport.dstport), self._server_ports)
+
+            extra_info = {"func_code": func_code, "trans_id": str(trans_id)}
+            if fc & 0x80:
+                # 异常响应: 功能码 | 0x80 + 异常码
+                extra_info["exception_code"] = str(pdu[1]) if len(pdu) > 1 else ''
+                context, latency_ms = self.pending_transactions.response(pkt, trans_id)
+                extra_info.update(self.pairing_info(context, latency_ms))
+                items = []
+            elif to_server:
+                items = self._native_request(pkt, trans_id, fc, pdu)
+            else:
+                context, latency_ms = self.pending_transactions.response(pkt, trans_id)
+                extra_info.update(self.pairing_info(context, latency_ms))
+                items = self._native_response(fc, pdu, context)
+
+            return self.create_standard_result(
+                pkt,
+                protocol_name="Modbus",
+                data_objects=items,
+                extra_info=extra_info,
+                normalized=True
             )
         except Exception as e:
-            logger.debug(f"Modbus parse error: {e}")
-            return None
+            return self.parse_failed(pkt, e)
+
+    def _native_request(self, pkt, trans_id, fc, pdu):
+        context = {'frame': str(pkt.number), 'func_code': str(fc), 'start': None, 'quantity': None}
+        items = []
+
+        if fc in (1, 2, 3, 4):
+            context['start'], context['quantity'] = _ADDR_QTY.unpack_from(pdu, 1)
+        elif fc == 5:
+            address, value = _ADDR_QTY.unpack_from(pdu, 1)
+            items = self._native_items(address, [1 if value == 0xFF00 else 0], "Coil")
+        elif fc == 6:
+            address, value = _ADDR_QTY.unpack_from(pdu, 1)
+            items = self._native_items(address, [value], "Holding Register")
+        elif fc == 15:
+            start, quantity = _ADDR_QTY.unpack_from(pdu, 1)
+            items = self._native_items(start, _coils(pdu[6:6 + pdu[5]], quantity), "Coil")
+        elif fc == 16:
+            start, _quantity = _ADDR_QTY.unpack_from(pdu, 1)
+            items = self._native_items(start, be_words(pdu[6:6 + pdu[5]]), "Holding Register")
+        elif fc == 23:
+            # 读写多个寄存器: 读起始 / 数量 + 写起始 / 数量 / 字节数 / 写入值
+            context['start'], context['quantity'] = _ADDR_QTY.unpack_from(pdu, 1)
+            write_start, _quantity = _ADDR_QTY.unpack_from(pdu, 5)
+            items = self._native_items(write_start, be_words(pdu[10:10 + pdu[9]]), "Holding Register")
+
+        self.pending_transactions.request(pkt, trans_id, context)
+        return items
+
+    def _native_response(self, fc, pdu, context):
+        start = context.get('start') if context else None
+
+        if fc in (1, 2):
+            quantity = context.get('quantity') if context else None
+            data_type = "Coil" if fc == 1 else "Discrete Input"
+            return self._native_items(start, _coils(pdu[2:2 + pdu[1]], quantity), data_type)
+        if fc in (3, 4, 23):
+            return self._native_items(start, be_words(pdu[2:2 + pdu[1]]), self._determine_type(fc))
+        if fc == 5:
+            address, value = _ADDR_QTY.unpack_from(pdu, 1)
+            return self._native_items(address, [1 if value == 0xFF00 else 0], "Coil")
+        if fc == 6:
+            address, value = _ADDR_QTY.unpack_from(pdu, 1)
+            return self._native_items(address, [value], "Holding Register")
+        # FC15 / FC16 响应只回显起始地址与数量
+        return []
+
+    @staticmethod
+    def _native_items(base_addr, values, data_type):
+        """
+        直接构造标准数据项 (与 _process_values 经 create_standard_result 映射后的结构一致)
+        base_addr 为 None (响应未能配对请求) 时地址记为 Unknown+i
+        """
+        if base_addr is None:
+            return [{"address": f"Unknown+{i}", "value": value, "other": {"protocol_specific": {}},
+                     "type": data_type}
+                    for i, value in enumerate(values)]
+        return [{"address": str(base_addr + i), "value": value,
+                 "other": {"protocol_specific": {"base_addr": base_addr}}, "type": data_type}
+                for i, value in enumerate(values)]
+
+    def is_error(self, result):
+        other = result['other']
+        if 'exception_code' in other:
+            return True
+        try:
+            return int(str(other.get('func_code', 0)), 0) & 0x80 != 0
+        except ValueError:
+            return False
 
     def _determine_type(self, func_code):
         """根据功能码判断数据类型"""
@@ -1,13 +1,39 @@
 # processors/omron.py
 from .base import BaseProtocolProcessor
+from utils.native_reader import be_words
+import struct
 import logging
 
 logger = logging.getLogger(__name__)
 
+# FINS/TCP 头部: 'FINS'、长度 (其后的字节数)、命令 (2 = FINS 帧)、错误码
+_FINS_TCP_MAGIC = b'FINS'
+_FINS_TCP_HEADER = struct.Struct('>4sIII')
+# 内存区域地址: 区域代码、字地址、位号
+_AREA_ADDRESS = struct.Struct('>BHB')
+# 区域代码 + 地址 + 数量 (0101 读 / 0102 写 / 0103 填充)
+_AREA_ACCESS = struct.Struct('>BHBH')
+
 
 class OmronFinsProcessor(BaseProtocolProcessor):
     protocol_id = 'omron'
 
+    DISPLAY_FILTER = 'omron'
+    DEFAULT_PORTS = (9600,)
+    PROTOCOL_ALIASES = ('omron', 'fins')
+    VERSION = 3
+    FLOW_CODE_FIELD = 'raw_cmd'
+
+    TSHARK_FIELDS = (
+        'omron.sid',
+        'omron.command',
+        'omron.response_code',
+        'omron.memory_address',
+        'omron.memory_area_read',
+        'omron.memory_numitems',
+        'omron.command_data',
+    )
+
     # FINS 内存区域代码映射
     MEMORY_AREAS = {
         '82': 'DM (Data Memory)',
@@ -15,11 +41,19 @@ class OmronFinsProcessor(BaseProtocolProcessor):
         '30': 'CIO-Alt',
         '31': 'WR',
         '32': 'HR',
-        '33': 'AR'
+        '33': 'AR',
+        'B1': 'WR',
+        'B2': 'HR',
+        'B3': 'AR',
+        '02': 'DM (Bit)',
+        '89': 'TIM/CNT PV',
     }
 
-    # 全局字典：用于存储未完成的请求信息
-    pending_requests = {}
+    # 原生后端：直接解析 FINS/UDP 帧与 FINS/TCP 封装
+    NATIVE_DECODER = True
+
+    # 未完成的请求 (按连接 + SID 关联)
+    CORRELATION_STATE = ('pending_requests',)
 
     def parse(self, pkt):
         try:
@@ -35,8 +69,11 @@ class OmronFinsProcessor(BaseProtocolProcessor):
             raw_sid = getattr(fins_layer, 'sid', '0')
             sid = str(raw_sid)
 
-            # 3. 提取数据
-            data_objects = self._extract_data(fins_layer, sid)
+            # 3. 响应包先取回对应请求的上下文，再提取数据
+            req_context, latency_ms = None, None
+            if hasattr(fins_layer, 'response_code'):
+                req_context, latency_ms = self.pending_requests.response(pkt, sid)
+            data_objects = self._extract_data(pkt, fins_layer, sid, req_context)
 
             # 4. 生成摘要描述
             raw_cmd = str(getattr(fins_layer, 'command', 'Unknown')).replace('0x', '')
@@ -67,6 +104,7 @@ class OmronFinsProcessor(BaseProtocolProcessor):
                 desc = f"Fins Packet {raw_cmd}"
 
             extra_info["info"] = desc
+            extra_info.update(self.pairing_info(req_context, latency_ms))
 
             # 5. 调用基类生成标准结果
             return self.create_standard_result(
@@ -77,13 +115,205 @@ class OmronFinsProcessor(BaseProtocolProcessor):
             )
 
         except Exception as e:
-            logger.error(f"Omron parse error: {e}")
-            return None
+            return self.parse_failed(pkt, e, level=logging.ERROR)
+
+    # ==========================================
+    # 原生解码 (FINS 帧字节)
+    # ==========================================
+    def parse_native(self, pkt):
+        """
+        直接解析 FINS 帧 (UDP 负载即 FINS 帧；TCP 负载先去掉 16 字节的 FINS/TCP 头部)
+
+        支持内存区域读 (0101)、写 (0102)、填充 (0103) 与多区域读 (0104)。
+        字区域的数据整块按大端 16 位字解码；区域代码 < 0x80 的位区域每项 1 字节，地址记为 "字.位"。
+        读响应本身不带地址，按 SID 配对请求后取回区域与起始地址。
+        """
+        try:
+            frame = pkt.payload
+            if pkt.transport.layer_name == 'tcp':
+                if len(frame) < 16 or frame[:4] != _FINS_TCP_MAGIC:
+                    return None
+                _magic, length, tcp_command, _error = _FINS_TCP_HEADER.unpack_from(frame)
+                # 命令 0 / 1 为节点地址交换 (握手)，不携带 FINS 帧
+                if tcp_command != 2:
+                    return None
+                frame = frame[16:8 + length]
+            if len(frame) < 12:
+                return None
+
+            sid = f"0x{frame[9]:02x}"
+            command = (frame[10] << 8) | frame[11]
+            raw_cmd = f"{command:04x}"
+            extra_info = {"sid": sid, "raw_cmd": raw_cmd}
+
+            if frame[0] & 0x40:
+                # ICF bit6 = 1 为响应: 命令码之后是 2 字节结束码 (MRES / SRES)
+                req_context, latency_ms = self.pending_requests.response(pkt, sid)
+                code = (frame[12] << 8) | frame[13] if len(frame) >= 14 else 0
+                resp_code = f"0x{code:04x}"
+                items = self._native_response(command, code, resp_code, frame[14:], req_context)
+                addr_hint = f" [Ref: {items[0]['address']}]" if req_context else ""
+                extra_info["response_code"] = resp_code
+                extra_info["info"] = f"Response (Code: {resp_code}){addr_hint}"
+                extra_info.update(self.pairing_info(req_context, latency_ms))
+            else:
+                items = self._native_request(pkt, sid, command, frame[12:])
+                extra_info["info"] = f"Request (Cmd: {raw_cmd})" if items else f"Fins Packet {raw_cmd}"
+
+            return self.create_standard_result(
+                pkt,
+                protocol_name="Omron FINS",
+                data_objects=items,
+                extra_info=extra_info,
+                normalized=True
+            )
+        except Exception as e:
+            return self.parse_failed(pkt, e)
+
+    def _area_info(self, area):
+        area_code = f"{area:02X}"
+        return area_code, self.MEMORY_AREAS.get(area_code, f"Area {area_code}")
+
+    @staticmethod
+    def _bit_address(address, bit, offset=0):
+        """位区域地址 "字.位" (offset 为相对起始位的偏移，满 16 位进位到下一字)"""
+        word, bit = divmod(address * 16 + bit + offset, 16)
+        return f"{word}.{bit:02d}"
+
+    def _native_request(self, pkt, sid, command, params):
+        if command in (0x0101, 0x0102, 0x0103):
+            area, address, bit, count = _AREA_ACCESS.unpack_from(params)
+            area_code, area_name = self._area_info(area)
+            self.pending_requests.request(pkt, sid, {
+                'frame': str(pkt.number),
+                'addr': address,
+                'area_name': area_name,
+                'area_code': area_code,
+                'command': command,
+                'bit': bit,
+            })
+            other = {"area_name": area_name, "area_code": area_code}
+
+            if command == 0x0101:
+                if area < 0x80:
+                    address, unit = self._bit_address(address, bit), "bits"
+                else:
+                    address, unit = str(address), "words"
+                return [{"address": address, "value": f"Requesting {count} {unit}",
+                         "other": dict(other, num_items=str(count), raw_hex="N/A"), "type": "Read Request"}]
+            if command == 0x0103:
+                # 填充: 同一个字写入 count 个地址
+                value = be_words(params[6:8])
+                return [{"address": str(address), "value": value[0] if value else "N/A",
+                         "other": dict(other, num_items=str(count)), "type": "Fill Data"}]
+            return self._native_values(area, address, bit, params[6:], "Write Data", other)
+
+        if command == 0x0104:
+            # 多区域读: (区域, 字地址, 位号) * n
+            targets = [_AREA_ADDRESS.unpack_from(params, offset) for offset in range(0, len(params) - 3, 4)]
+            if not targets:
+                return []
+            area_code, area_name = self._area_info(targets[0][0])
+            self.pending_requests.request(pkt, sid, {
+                'frame': str(pkt.number),
+                'addr': targets[0][1],
+                'area_name': area_name,
+                'area_code': area_code,
+                'command': command,
+                'targets': targets,
+            })
+            items = []
+            for area, address, bit in targets:
+                area_code, area_name = self._area_info(area)
+                items.append({"address": self._bit_address(address, bit) if area < 0x80 else str(address),
+                              "value": "Requesting 1 item",
+                              "other": {"area_name": area_name, "area_code": area_code}, "type": "Read Request"})
+            return items
+        return []
+
+    def _native_response(self, command, code, resp_code, data, req_context):
+        status = {
+            "address": f"{req_context['addr']} (Context)" if req_context else "N/A (Response)",
+            "value": f"Return Code: {resp_code}",
+            "other": {
+                "raw_hex": resp_code,
+                "area_name": req_context['area_name'] if req_context else "N/A",
+                "area_code": req_context['area_code'] if req_context else "N/A",
+                "is_response": True,
+            },
+            "type": "Response Packet",
+            "description": "Success" if code == 0 else "Error",
+        }
+        items = [status]
+        if code != 0 or not data:
+            return items
+
+        if command == 0x0101 and req_context and req_context.get('command') == 0x0101:
+            area = int(req_context['area_code'], 16)
+            other = {"area_name": req_context['area_name'], "area_code": req_context['area_code']}
+            items.extend(self._native_values(area, req_context['addr'], req_context['bit'], data, "Read Data", other))
+
+        elif command == 0x0104:
+            # 多区域读响应: 每项为 区域代码 + 数据 (位区域 1 字节，字区域 2 字节)
+            targets = req_context.get('targets', []) if req_context else []
+            offset, size, index = 0, len(data), 0
+            while offset < size:
+                area = data[offset]
+                width = 1 if area < 0x80 else 2
+                if offset + 1 + width > size:
+                    break
+                value = data[offset + 1] if width == 1 else (data[offset + 1] << 8) | data[offset + 2]
+                area_code, area_name = self._area_info(area)
+                if index < len(targets):
+                    _area, address, bit = targets[index]
+                    address = self._bit_address(address, bit) if width == 1 else str(address)
+                else:
+                    address = f"Item_{index + 1}"
+                items.append({"address": address, "value": value,
+                              "other": {"raw_hex": f"0x{value:0{width * 2}x}",
+                                        "area_name": area_name, "area_code": area_code},
+                              "type": "Read Data"})
+                offset += 1 + width
+                index += 1
+        return items
 
-    def _extract_data(self, fins_layer, sid):
+    def _native_values(self, area, address, bit, data, data_type, other):
+        """
+        内存区域的数据块 -> 标准数据项：字区域整块按大端 16 位字解码，位区域每字节一位
+        """
+        if area < 0x80:
+            return [{"address": self._bit_address(address, bit, i), "value": value,
+                     "other": dict(other, raw_hex=f"0x{value:02x}"), "type": data_type}
+                    for i, value in enumerate(bytes(data))]
+        return [{"address": str(address + i), "value": value,
+                 "other": dict(other, raw_hex=f"0x{value:04x}"), "type": data_type}
+                for i, value in enumerate(be_words(data))]
+
+    def is_error(self, result):
+        # 响应码 (MRES/SRES) 非 0 即为错误
+        code = result['other'].get('response_code')
+        if code is None:
+            return False
+        try:
+            return int(str(code), 16) != 0
+        except ValueError:
+            return False
+
+    @staticmethod
+    def _response_ok(resp_code):
+        """响应码为 0 (tshark 输出 '0x0000'，旧版本可能为 '00' / '0')"""
+        try:
+            return int(resp_code, 16) == 0
+        except ValueError:
+            return False
+
+    def _extract_data(self, pkt, fins_layer, sid, req_context=None):
         """
         数据提取逻辑
         注意：这里生成的字典包含所有字段，基类会自动把非标准字段移到 'other'
+
+        Args:
+            req_context: 响应包对应请求的上下文 (未配对时为 None)
         """
         items = []
 
@@ -92,11 +322,9 @@ class OmronFinsProcessor(BaseProtocolProcessor):
         # ==========================================
         if hasattr(fins_layer, 'response_code'):
             resp_code = str(getattr(fins_layer, 'response_code', 'Unknown'))
-            status_msg = "Success" if resp_code in ['00', '0000', '0'] else "Error"
+            status_msg = "Success" if self._response_ok(resp_code) else "Error"
 
             # --- 关联逻辑 ---
-            req_context = self.pending_requests.pop(sid, None)
-
             if req_context:
                 addr_str = f"{req_context['addr']} (Context)"
                 area_name = req_context['area_name']
@@ -134,11 +362,12 @@ class OmronFinsProcessor(BaseProtocolProcessor):
                 area_name = self.MEMORY_AREAS.get(area_code_raw, f"Area {area_code_raw}")
 
                 # 存储上下文
-                self.pending_requests[sid] = {
+                self.pending_requests.request(pkt, sid, {
+                    'frame': str(pkt.number),
                     'addr': start_addr,
                     'area_name': area_name,
                     'area_code': area_code_raw
-                }
+                })
 
             except ValueError:
                 start_addr = 0
@@ -1,13 +1,102 @@
 from .base import BaseProtocolProcessor
+import struct
 import logging
 import re
 
 logger = logging.getLogger(__name__)
 
+# TPKT: 版本 (3)、保留、总长度
+_TPKT = struct.Struct('>BBH')
+# S7 头部: 协议号 (0x32)、ROSCTR、保留、PDU reference、参数长度、数据长度
+_S7_HEADER = struct.Struct('>BBHHHH')
+# S7ANY 地址项 (不含 0x12 / 长度两字节): 语法 ID、传输尺寸、数量、DB 号、区域、地址高字节、地址低 16 位
+_S7ANY_ITEM = struct.Struct('>BBHHBBH')
+# 数据项头部: 返回码、传输尺寸、长度
+_DATA_ITEM = struct.Struct('>BBH')
+# 数据项长度以 bit 为单位的传输尺寸 (BIT / BYTE/WORD/DWORD / INTEGER)，其余以字节为单位
+_BIT_LENGTH_SIZES = frozenset((3, 4, 5))
+# 不超过该字节数的数据值显示为十进制 (覆盖到 LINT / LREAL)，更长的保留十六进制
+_DECIMAL_MAX_BYTES = 8
+
+
+def _display_value(raw_hex):
+    """数据项值的显示形式 (读响应与写请求、原生与 tshark 路径共用)"""
+    if len(raw_hex) <= _DECIMAL_MAX_BYTES * 2:
+        try:
+            return str(int(raw_hex, 16))
+        except ValueError:
+            pass
+    return f"0x{raw_hex}"
+
 
 class S7CommProcessor(BaseProtocolProcessor):
     protocol_id = 'S7COMM'
 
+    DISPLAY_FILTER = 's7comm'
+    DEFAULT_PORTS = (102,)
+    PROTOCOL_ALIASES = ('s7', 's7comm', 'siemens')
+    VERSION = 5
+    FLOW_CODE_FIELD = 'func_code'
+
+    # param.item 本身是无值的分组字段，字段提取模式下用其子字段重建地址字符串
+    TSHARK_FIELDS = (
+        's7comm.header.rosctr',
+        's7comm.header.pduref',
+        's7comm.header.errcls',
+        's7comm.header.errcod',
+        's7comm.param.func',
+        's7comm.param.item',
+        's7comm.param.item.transp_size',
+        's7comm.param.item.length',
+        's7comm.param.item.db',
+        's7comm.param.item.area',
+        's7comm.param.item.address.byte',
+        's7comm.param.item.address.bit',
+        's7comm.resp.data',
+    )
+
+    # 请求-响应关联表 (按连接 + PDU reference)
+    CORRELATION_STATE = ('pending_jobs',)
+
+    # 原生后端：直接从 TCP 负载解析 TPKT / COTP / S7 PDU
+    NATIVE_DECODER = True
+
+    # 存储区代码 -> Wireshark 显示的区域名
+    ITEM_AREAS = {
+        0x81: 'I',
+        0x82: 'Q',
+        0x83: 'M',
+        0x84: 'DB',
+        0x1C: 'C',
+        0x1D: 'T',
+    }
+
+    # 传输尺寸代码 -> 名称
+    TRANSPORT_SIZES = {
+        1: 'BIT',
+        2: 'BYTE',
+        3: 'CHAR',
+        4: 'WORD',
+        5: 'INT',
+        6: 'DWORD',
+        7: 'DINT',
+        8: 'REAL',
+        28: 'COUNTER',
+        29: 'TIMER',
+    }
+
+    # 数据项返回码
+    RETURN_CODES = {
+        0x00: 'Reserved',
+        0x01: 'Hardware error',
+        0x03: 'Accessing the object not allowed',
+        0x05: 'Invalid address',
+        0x06: 'Data type not supported',
+        0x07: 'Data type inconsistent',
+        0x0A: 'Object does not exist',
+        0xFF: 'Success',
+    }
+
     def parse(self, pkt):
         try:
             # 兼容处理：有些版本叫 s7comm，有些可能叫 s7
@@ -31,24 +120,36 @@ class S7CommProcessor(BaseProtocolProcessor):
                 func_code = 0
 
             # 生成任务描述
-            job_description = "Unknown S7 Job"
-            if rosctr == 3 and func_code == 4:
-                job_description = "Read Var Response"
-            elif rosctr == 1 and func_code == 5:
-                job_description = "Write Var Request"
-            elif rosctr == 1 and func_code == 4:
-                job_description = "Read Var Request"
+            job_description = self._job_description(rosctr, func_code)
+
+            # 请求/响应关联：Job(1) 记录请求，Ack(2) / Ack_Data(3) 按 PDU reference 取回
+            pdu_ref = getattr(s7_layer, 'header_pduref', 'N/A')
+            context, latency_ms = None, None
+            if rosctr == 1:
+                self.pending_jobs.request(pkt, pdu_ref, {
+                    'frame': str(pkt.number),
+                    'func_code': func_code,
+                    'addresses': self._item_addresses(s7_layer) if func_code == 4 else [],
+                })
+            elif rosctr in (2, 3):
+                context, latency_ms = self.pending_jobs.response(pkt, pdu_ref)
 
             # 提取数据
-            data_objects = self._extract_data(s7_layer, rosctr, func_code)
+            data_objects = self._extract_data(s7_layer, rosctr, func_code, context)
 
             # 准备额外信息
             extra_info = {
                 "job_type": job_description,
                 "rosctr": rosctr,
                 "func_code": func_code,
-                "pdu_ref": getattr(s7_layer, 'header_pduref', 'N/A')
+                "pdu_ref": pdu_ref
             }
+            # Ack / Ack_Data 头部的错误类别 (非 0 表示 PLC 拒绝了请求)
+            error_class = getattr(s7_layer, 'header_errcls', None)
+            if error_class is not None and self._to_int(error_class):
+                extra_info["error_class"] = str(error_class)
+                extra_info["error_code"] = str(getattr(s7_layer, 'header_errcod', ''))
+            extra_info.update(self.pairing_info(context, latency_ms))
 
             return self.create_standard_result(
                 pkt,
@@ -57,33 +158,201 @@ class S7CommProcessor(BaseProtocolProcessor):
                 extra_info=extra_info
             )
         except Exception as e:
-            logger.debug(f"S7 parse error: {e}")
-            return None
+            return self.parse_failed(pkt, e)
+
+    @staticmethod
+    def _job_description(rosctr, func_code):
+        if rosctr == 1 and func_code == 4:
+            return "Read Var Request"
+        if rosctr == 1 and func_code == 5:
+            return "Write Var Request"
+        if rosctr == 3 and func_code == 4:
+            return "Read Var Response"
+        if rosctr == 3 and func_code == 5:
+            return "Write Var Response"
+        return "Unknown S7 Job"
+
+    # ==========================================
+    # 原生解码 (TPKT / COTP / S7 PDU 字节)
+    # ==========================================
+    def parse_native(self, pkt):
+        """
+        直接解析 TPKT + COTP DT + S7 Job / Ack_Data
+
+        地址项按 S7ANY 格式解码 (语法 ID、区域、DB 号、字节 / 位地址)，读响应与写响应
+        按 PDU reference 配对写入请求中的地址，数据项的返回码写入各项的 other.return_code。
+        一个 TCP 段中有多个 TPKT 时只解析第一个；COTP 连接建立等非 DT 报文返回 None。
+        """
+        try:
+            payload = pkt.payload
+            if len(payload) < 17:
+                return None
+            version, _reserved, tpkt_len = _TPKT.unpack_from(payload)
+            # COTP: 长度字节 + PDU 类型 (0xF0 = DT 数据)
+            if version != 3 or payload[5] != 0xF0:
+                return None
+            offset = 5 + payload[4]
+            end = min(tpkt_len, len(payload))
+            if end < offset + 10:
+                return None
+            proto_id, rosctr, _reserved, pdu_ref, param_len, data_len = _S7_HEADER.unpack_from(payload, offset)
+            if proto_id != 0x32:
+                return None
+            offset += 10
+
+            error_class = error_code = 0
+            if rosctr in (2, 3):
+                # Ack / Ack_Data 头部多出错误类别与错误码
+                error_class, error_code = payload[offset], payload[offset + 1]
+                offset += 2
+            params = payload[offset:min(offset + param_len, end)]
+            data = payload[offset + param_len:min(offset + param_len + data_len, end)]
+            func_code = params[0] if params and rosctr in (1, 2, 3) else 0
+
+            context, latency_ms = None, None
+            items = []
+            if rosctr == 1:
+                addresses = self._native_item_addresses(params) if func_code in (4, 5) else []
+                self.pending_jobs.request(pkt, pdu_ref, {
+                    'frame': str(pkt.number),
+                    'func_code': func_code,
+                    'addresses': addresses,
+                })
+                if func_code == 5:
+                    items = self._native_write_request(addresses, data)
+            elif rosctr in (2, 3):
+                context, latency_ms = self.pending_jobs.response(pkt, pdu_ref)
+                addresses = context.get('addresses', []) if context else []
+                if rosctr == 3 and func_code == 4 and len(params) > 1:
+                    items = self._native_read_response(addresses, data, params[1])
+                elif rosctr == 3 and func_code == 5 and len(params) > 1:
+                    items = self._native_write_response(addresses, data[:params[1]])
+
+            extra_info = {
+                "job_type": self._job_description(rosctr, func_code),
+                "rosctr": rosctr,
+                "func_code": func_code,
+                "pdu_ref": str(pdu_ref)
+            }
+            if error_class:
+                extra_info["error_class"] = f"0x{error_class:02x}"
+                extra_info["error_code"] = f"0x{error_code:02x}"
+            extra_info.update(self.pairing_info(context, latency_ms))
+
+            return self.create_standard_result(
+                pkt,
+                protocol_name="Siemens S7Comm",
+                data_objects=items,
+                extra_info=extra_info,
+                normalized=True
+            )
+        except Exception as e:
+            return self.parse_failed(pkt, e)
+
+    def _native_item_addresses(self, params):
+        """
+        Job 参数中的地址项 (func, item_count, [0x12, 长度, 语法 ID, ...] * n) -> 地址字符串列表
+        """
+        addresses = []
+        offset = 2
+        size = len(params)
+        for _ in range(params[1] if size > 1 else 0):
+            if offset + 2 > size:
+                break
+            item_len = params[offset + 1]
+            syntax_id = params[offset + 2] if offset + 2 < size else 0
+            if syntax_id == 0x10 and item_len >= 10 and offset + 12 <= size:
+                _syntax, transp_size, length, db, area, addr_high, addr_low = _S7ANY_ITEM.unpack_from(params, offset + 2)
+                address = (addr_high << 16) | addr_low
+                addresses.append(self._format_address(area, db, address >> 3, address & 7, transp_size, length))
+            else:
+                # DBREAD / NCK 等其他寻址方式只记录语法 ID
+                addresses.append(f"Syntax 0x{syntax_id:02X}")
+            offset += 2 + item_len
+        return addresses
 
-    def _extract_data(self, s7_layer, rosctr, func_code):
+    @staticmethod
+    def _native_data_items(data, count):
+        """
+        数据区的数据项 -> [(返回码, 数据字节)]
+        传输尺寸为 BIT / BYTE / INTEGER 时长度以 bit 计；非最后一项的奇数长度后有一个填充字节
+        """
+        values = []
+        offset = 0
+        size = len(data)
+        for i in range(count):
+            if offset + 4 > size:
+                break
+            return_code, transp_size, length = _DATA_ITEM.unpack_from(data, offset)
+            if transp_size in _BIT_LENGTH_SIZES:
+                length = (length + 7) >> 3
+            offset += 4
+            values.append((return_code, data[offset:offset + length]))
+            offset += length
+            if length & 1 and i < count - 1:
+                offset += 1
+        return values
+
+    def _native_read_response(self, addresses, data, count):
+        items = []
+        for i, (return_code, value) in enumerate(self._native_data_items(data, count)):
+            address = f"{addresses[i]} (Response)" if i < len(addresses) else f"Item_{i + 1} (Response)"
+            if return_code != 0xFF:
+                items.append({"address": address, "value": "N/A",
+                              "other": {"return_code": f"0x{return_code:02x}"}, "type": "Read Response",
+                              "description": self.RETURN_CODES.get(return_code, f"0x{return_code:02X}")})
+                continue
+            raw_hex = value.hex()
+            items.append({"address": address, "value": _display_value(raw_hex),
+                          "other": {"raw_hex": f"0x{raw_hex}", "return_code": "0xff"},
+                          "type": "Read Response", "description": "Read Success"})
+        return items
+
+    def _native_write_request(self, addresses, data):
+        items = []
+        for address, (_return_code, value) in zip(addresses, self._native_data_items(data, len(addresses))):
+            raw_hex = value.hex()
+            items.append({"address": address, "value": _display_value(raw_hex), "other": {"raw_hex": f"0x{raw_hex}"},
+                          "type": "Write Request", "description": "Writing Value to PLC"})
+        return items
+
+    def _native_write_response(self, addresses, return_codes):
+        items = []
+        for i, return_code in enumerate(return_codes):
+            address = f"{addresses[i]} (Response)" if i < len(addresses) else f"Item_{i + 1} (Response)"
+            if return_code == 0xFF:
+                description = "Write Success"
+            else:
+                description = self.RETURN_CODES.get(return_code, f"0x{return_code:02X}")
+            items.append({"address": address, "value": "N/A", "other": {"return_code": f"0x{return_code:02x}"},
+                          "type": "Write Response", "description": description})
+        return items
+
+    def is_error(self, result):
+        return 'error_class' in result['other']
+
+    def _extract_data(self, s7_layer, rosctr, func_code, context=None):
         items = []
 
         # ---------------------------------------------------------
         # 场景 A: 读变量响应 (Read Var Response)
         # ---------------------------------------------------------
         if rosctr == 3 and func_code == 4:
-            # 响应包通常不带 Item 地址，只带数据
+            # 响应包通常不带 Item 地址，只带数据；配对成功时沿用读请求中的地址
             raw_vals = self._get_data_values(s7_layer)
+            request_addrs = context.get('addresses', []) if context else []
 
             for i, val_hex in enumerate(raw_vals):
                 clean_hex = val_hex.replace(':', '')
-                # 尝试转十进制显示
-                try:
-                    # 如果数据较短 (如 2字节/4字节)，转为数字更直观
-                    if len(clean_hex) <= 8:
-                        val_display = str(int(clean_hex, 16))
-                    else:
-                        val_display = f"0x{clean_hex}"
-                except:
-                    val_display = f"0x{clean_hex}"
+                val_display = _display_value(clean_hex)
+
+                if i < len(request_addrs):
+                    address = f"{request_addrs[i]} (Response)"
+                else:
+                    address = f"Item_{i + 1} (Response)"
 
                 items.append({
-                    "address": f"Item_{i + 1} (Response)",
+                    "address": address,
                     "value": val_display,
                     "type": "Read Response",
                     "description": "Read Success",
@@ -94,31 +363,20 @@ class S7CommProcessor(BaseProtocolProcessor):
         # 场景 B: 写变量请求 (Write Var Request)
         # ---------------------------------------------------------
         elif rosctr == 1 and func_code == 5:
-            # 1. 直接提取 param_item 字符串 (最准确！)
-            # 截图显示格式为: "Item [1]: (DB 1.DBX 0.0 BYTE 8)"
-            raw_addrs = self._get_field_list(s7_layer, 'param_item')
+            # 1. 提取各 Item 的地址
+            addrs = self._item_addresses(s7_layer)
 
             # 2. 提取数据值
             raw_vals = self._get_data_values(s7_layer)
 
             # 3. 配对
-            count = min(len(raw_addrs), len(raw_vals))
+            count = min(len(addrs), len(raw_vals))
             for i in range(count):
-                # 清洗地址字符串
-                # 从 "Item [1]: (DB 1.DBX 0.0 BYTE 8)" 提取 "DB 1.DBX 0.0 BYTE 8"
-                raw_addr_str = raw_addrs[i]
-                addr_clean = self._clean_address_string(raw_addr_str)
+                addr_clean = addrs[i]
 
                 # 处理数据值
                 clean_hex = raw_vals[i].replace(':', '')
-                try:
-                    if len(clean_hex) <= 16:
-                        val_int = int(clean_hex, 16)
-                        val_display = str(val_int)
-                    else:
-                        val_display = f"0x{clean_hex}"
-                except:
-                    val_display = f"0x{clean_hex}"
+                val_display = _display_value(clean_hex)
 
                 items.append({
                     "address": addr_clean,
@@ -130,6 +388,21 @@ class S7CommProcessor(BaseProtocolProcessor):
 
         return items
 
+    def _item_addresses(self, s7_layer):
+        """
+        请求中各 Item 的地址 (如 "DB 1.DBX 0.0 BYTE 8")
+        """
+        # 直接提取 param_item 字符串 (最准确！)
+        # 截图显示格式为: "Item [1]: (DB 1.DBX 0.0 BYTE 8)"
+        raw_addrs = self._get_field_list(s7_layer, 'param_item')
+
+        # 字段提取模式 (-T ek) 下 param_item 没有 showname，改用子字段重建地址
+        if not any(raw_addrs) and hasattr(s7_layer, 'param_item_area'):
+            raw_addrs = self._compose_item_addresses(s7_layer)
+
+        # 清洗地址字符串：从 "Item [1]: (DB 1.DBX 0.0 BYTE 8)" 提取 "DB 1.DBX 0.0 BYTE 8"
+        return [self._clean_address_string(raw_addr) for raw_addr in raw_addrs if raw_addr]
+
     def _get_field_list(self, layer, field_name):
         if not hasattr(layer, field_name):
             return []
@@ -166,6 +439,50 @@ class S7CommProcessor(BaseProtocolProcessor):
         # 过滤掉非 hex 数据 (有时 PyShark 会返回无关信息)
         return [v for v in vals if self._is_hex_string(v)]
 
+    def _compose_item_addresses(self, layer):
+        """
+        由 param_item 子字段 (area/db/address/transp_size/length) 拼出与 Wireshark 一致的地址
+        输出: "DB 1.DBX 0.0 BYTE 8"
+        """
+        def values(name):
+            field = layer.get_field(name)
+            if field is None:
+                return []
+            result = []
+            for f in field.all_fields:
+                try:
+                    result.append(int(str(f.show), 0))
+                except ValueError:
+                    result.append(0)
+            return result
+
+        areas = values('param_item_area')
+        dbs = values('param_item_db')
+        byte_addrs = values('param_item_address_byte')
+        bit_addrs = values('param_item_address_bit')
+        sizes = values('param_item_transp_size')
+        lengths = values('param_item_length')
+
+        addresses = []
+        for i, area in enumerate(areas):
+            addresses.append(self._format_address(
+                area,
+                dbs[i] if i < len(dbs) else 0,
+                byte_addrs[i] if i < len(byte_addrs) else 0,
+                bit_addrs[i] if i < len(bit_addrs) else 0,
+                sizes[i] if i < len(sizes) else None,
+                lengths[i] if i < len(lengths) else 0,
+            ))
+        return addresses
+
+    def _format_address(self, area, db, byte_addr, bit_addr, size, length):
+        """S7ANY 地址项 -> Wireshark 的显示格式 (如 "DB 1.DBX 0.0 BYTE 8")"""
+        size_name = '?' if size is None else self.TRANSPORT_SIZES.get(size, str(size))
+        if area == 0x84:
+            return f"DB {db}.DBX {byte_addr}.{bit_addr} {size_name} {length}"
+        area_name = self.ITEM_AREAS.get(area, f"0x{area:02X}")
+        return f"{area_name} {byte_addr}.{bit_addr} {size_name} {length}"
+
     def _clean_address_string(self, raw_str):
         """
         清洗 param_item 字符串
@@ -178,6 +495,13 @@ class S7CommProcessor(BaseProtocolProcessor):
             return match.group(1)
         return raw_str  # 如果没匹配到，返回原样
 
+    @staticmethod
+    def _to_int(value):
+        try:
+            return int(str(value), 0)
+        except ValueError:
+            return 0
+
     def _is_hex_string(self, s):
         """简单判断是否为 Hex 数据 (包含 0-9, a-f, :)"""
         clean = s.replace(':', '')
@@ -1,15 +1,43 @@
 # processors/yaskawa.py
 from .base import BaseProtocolProcessor
+import struct
 import logging
 
 logger = logging.getLogger(__name__)
 
+_YERC = b'YERC'
+# 头部 (小端，紧跟 'YERC'): 头部长度、数据长度、保留、处理区分、ACK、请求 ID、块号
+_HSE_HEADER = struct.Struct('<HHBBBBI')
+# 请求子头部 (第 24 字节起): 命令号、实例、属性、服务
+_REQUEST_SUB = struct.Struct('<HHBB')
+# 响应子头部 (第 24 字节起): 服务 (| 0x80)、状态、附加状态长度、(填充)、附加状态
+_RESPONSE_SUB = struct.Struct('<BBBxH')
+_HEADER_LEN = 32
+_COUNT = struct.Struct('<I')
+# 位置型变量: 数据类型、形态、工具号、用户坐标号、扩展形态 + 8 轴数据 (均为 int32)
+_POSITION = struct.Struct('<13i')
+_STRING_LEN = 16
+
 
 class YaskawaProcessor(BaseProtocolProcessor):
     # 如果 Wireshark 没有 yaskawa 层，我们可能需要监听 'data' 或 'udp' 层
     # 这里我们设置为 'yaskawa'，但在 get_processor 里建议增加端口判断逻辑
     protocol_id = 'yaskawa'
 
+    # 端口 10040 (机器人控制) / 10041 (文件控制)，或 UDP/TCP 负载中出现 "YERC" 魔数
+    DEFAULT_PORTS = (10040, 10041)
+    PAYLOAD_MAGIC = b'YERC'
+    DISPLAY_FILTER = 'udp.port in {10040 10041} || udp contains 59:45:52:43 || tcp contains 59:45:52:43'
+    PROTOCOL_ALIASES = ('yaskawa', 'hse', 'yerc')
+    VERSION = 3
+
+    # 无专用 dissector，直接导出原始负载
+    TSHARK_FIELDS = (
+        'data.data',
+        'udp.payload',
+        'tcp.payload',
+    )
+
     # 常见命令代码 (Command No.)
     COMMANDS = {
         '0x70': 'Read Byte',
@@ -22,9 +50,33 @@ class YaskawaProcessor(BaseProtocolProcessor):
         '0x7B': 'Write Alarm'
     }
 
-    # 全局字典：用于请求-响应关联
-    # Key: Packet_ID (Request ID), Value: {command, context_info}
-    pending_requests = {}
+    # 请求-响应关联表
+    # Key: 连接 + Packet_ID (Request ID), Value: {frame, command, context_info}
+    CORRELATION_STATE = ('pending_requests',)
+
+    # 原生后端：直接按结构体解析负载 (memoryview)，分发时先按端口、再按魔数匹配
+    NATIVE_DECODER = True
+    FLOW_CODE_FIELD = 'command'
+
+    # 变量 / 数据读写命令: 命令号 -> (地址前缀, 值格式, 名称)
+    # 值格式为 struct 格式字符；'S' 为 16 字节字符串，'P' 为位置型变量 (13 个 int32)
+    VARIABLE_COMMANDS = {
+        0x78: ('IO', 'B', 'IO Data'),
+        0x79: ('M', 'H', 'Register Data'),
+        0x7A: ('B', 'B', 'Byte Variable'),
+        0x7B: ('I', 'h', 'Integer Variable'),
+        0x7C: ('D', 'i', 'Double Variable'),
+        0x7D: ('R', 'f', 'Real Variable'),
+        0x7E: ('S', 'S', 'String Variable'),
+        0x7F: ('P', 'P', 'Robot Position Variable'),
+        0x80: ('BP', 'P', 'Base Position Variable'),
+        0x81: ('EX', 'P', 'External Axis Variable'),
+    }
+    # 多个数据读写 (0x300-0x309) -> 对应的单个数据命令，数据部分以 4 字节个数开头
+    PLURAL_COMMANDS = {0x300: 0x78, 0x301: 0x79, 0x302: 0x7A, 0x303: 0x7B, 0x304: 0x7C,
+                       0x305: 0x7D, 0x306: 0x7E, 0x307: 0x7F, 0x308: 0x80, 0x309: 0x81}
+    # 写服务: Set_Attribute_All / Set_Attribute_Single / 多个数据写
+    WRITE_SERVICES = frozenset((0x02, 0x10, 0x34))
 
     def parse(self, pkt):
         try:
@@ -67,8 +119,11 @@ class YaskawaProcessor(BaseProtocolProcessor):
             ack_flag = hex_str[20:22]
             is_response = (ack_flag != '00')
 
-            # 提取数据
-            data_objects = self._extract_data(hex_str, req_id, is_response)
+            # 提取数据 (响应包先取回对应请求的上下文)
+            context, latency_ms = None, None
+            if is_response and len(hex_str) >= 64:
+                context, latency_ms = self.pending_requests.response(pkt, req_id)
+            data_objects = self._extract_data(pkt, hex_str, req_id, is_response, context)
 
             # 生成描述
             cmd_no = "Unknown"
@@ -81,18 +136,153 @@ class YaskawaProcessor(BaseProtocolProcessor):
             desc_type = "Response" if is_response else "Request"
             desc = f"Yaskawa HSE {desc_type} ({cmd_no})"
 
+            extra_info = {"info": desc, "req_id": req_id}
+            extra_info.update(self.pairing_info(context, latency_ms))
             return self.create_standard_result(
                 pkt,
                 protocol_name="Yaskawa HSE",
                 data_objects=data_objects,
-                extra_info={"info": desc, "req_id": req_id}
+                extra_info=extra_info
             )
 
         except Exception as e:
-            logger.debug(f"Yaskawa parse error: {e}")
-            return None
+            return self.parse_failed(pkt, e)
+
+    def is_error(self, result):
+        return 'status' in result['other']
+
+    # ==========================================
+    # 原生解码 (memoryview + 预编译结构体)
+    # ==========================================
+    def parse_native(self, pkt):
+        """
+        按结构体直接解析 32 字节 HSE 头部与数据部分，不做 Hex 字符串转换
 
-    def _extract_data(self, hex_str, req_id, is_response):
+        B / I / D / R / IO / 寄存器变量的值按命令对应的类型一次解包 (多个数据命令 0x300-0x309 同样整块解包)，
+        字符串变量按 16 字节解码，位置型变量 (P / BP / EX) 解出形态、工具号与 8 轴数据。
+        响应按请求 ID 配对请求后取回命令号与变量编号。
+        """
+        try:
+            payload = pkt.payload
+            if len(payload) < _HEADER_LEN or payload[:4] != _YERC:
+                return None
+            header_len, data_len, _reserved, _division, ack, req_no, _block = _HSE_HEADER.unpack_from(payload, 4)
+            data = payload[header_len:header_len + data_len]
+            req_id = f"{req_no:02x}"
+            extra_info = {"req_id": req_id}
+
+            if ack:
+                service, status, _added_len, added_status = _RESPONSE_SUB.unpack_from(payload, 24)
+                context, latency_ms = self.pending_requests.response(pkt, req_id)
+                command = context['command'] if context else None
+                if status:
+                    extra_info["status"] = f"0x{status:02x}"
+                    extra_info["added_status"] = f"0x{added_status:04x}"
+                    items = [{"address": context['cmd_info'] if context else "N/A",
+                              "value": f"Error (Status: 0x{status:02x}, Added: 0x{added_status:04x})",
+                              "other": {}, "type": "Response Error"}]
+                elif not data:
+                    items = [{"address": context['cmd_info'] if context else "N/A", "value": "Success (No Data)",
+                              "other": {}, "type": "Response ACK"}]
+                else:
+                    items = None
+                    if context and (service & 0x7F) not in self.WRITE_SERVICES:
+                        items = self._native_values(command, context['instance'], data, "Read Data")
+                    if not items:
+                        raw = data.hex()
+                        items = [{"address": f"{context['cmd_info']} (Context)" if context else "N/A",
+                                  "value": raw, "other": {"raw_hex": f"0x{raw[:10]}..."}, "type": "Response Data"}]
+                extra_info.update(self.pairing_info(context, latency_ms))
+            else:
+                command, instance, attribute, service = _REQUEST_SUB.unpack_from(payload, 24)
+                cmd_info = self._native_address(command, instance, attribute)
+                self.pending_requests.request(pkt, req_id, {
+                    "frame": str(pkt.number),
+                    "cmd": f"0x{command:04x}",
+                    "cmd_info": cmd_info,
+                    "command": command,
+                    "instance": instance,
+                })
+                items = None
+                if service in self.WRITE_SERVICES and data:
+                    items = self._native_values(command, instance, data, "Write Data")
+                if not items:
+                    items = [{"address": cmd_info, "value": f"Cmd: {self._command_name(command)}",
+                              "other": {"raw_hex": f"0x{data.hex()}" if data else "N/A"}, "type": "Request"}]
+
+            desc_type = "Response" if ack else "Request"
+            extra_info["info"] = f"Yaskawa HSE {desc_type} ({self._command_name(command)})"
+            if command is not None:
+                extra_info["command"] = f"0x{command:04x}"
+
+            return self.create_standard_result(
+                pkt,
+                protocol_name="Yaskawa HSE",
+                data_objects=items,
+                extra_info=extra_info,
+                normalized=True
+            )
+        except Exception as e:
+            return self.parse_failed(pkt, e)
+
+    def _variable_spec(self, command):
+        """-> (单个数据命令的 (前缀, 格式, 名称), 是否为多个数据命令)"""
+        single = self.PLURAL_COMMANDS.get(command)
+        if single is not None:
+            return self.VARIABLE_COMMANDS[single], True
+        return self.VARIABLE_COMMANDS.get(command), False
+
+    def _command_name(self, command):
+        if command is None:
+            return "Unknown"
+        spec, plural = self._variable_spec(command)
+        if spec is None:
+            return f"Cmd 0x{command:02X}"
+        return f"{spec[2]} (Plural)" if plural else spec[2]
+
+    def _native_address(self, command, instance, attribute):
+        spec, _plural = self._variable_spec(command)
+        if spec is None:
+            return f"Inst:{instance} Attr:{attribute}"
+        return f"{spec[0]}{instance:03d}"
+
+    def _native_values(self, command, instance, data, data_type):
+        """
+        变量数据部分 -> 标准数据项 (同类型的值一次解包)；命令不是变量读写或数据不完整时返回 []
+        """
+        spec, plural = self._variable_spec(command)
+        if spec is None:
+            return []
+        prefix, fmt, _name = spec
+        count = 1
+        if plural:
+            if len(data) < 4:
+                return []
+            count = _COUNT.unpack_from(data)[0]
+            data = data[4:]
+
+        if fmt == 'P':
+            count = min(count, len(data) // _POSITION.size)
+            items = []
+            for i in range(count):
+                values = _POSITION.unpack_from(data, i * _POSITION.size)
+                items.append({"address": f"{prefix}{instance + i:03d}", "value": list(values[5:]),
+                              "other": {"data_type": values[0], "form": values[1], "tool_no": values[2],
+                                        "user_frame": values[3], "ext_form": values[4]},
+                              "type": data_type})
+            return items
+
+        if fmt == 'S':
+            count = min(count, len(data) // _STRING_LEN)
+            values = [bytes(data[i * _STRING_LEN:(i + 1) * _STRING_LEN]).split(b'\0', 1)[0]
+                      .decode('shift_jis', 'replace') for i in range(count)]
+        else:
+            count = min(count, len(data) // struct.calcsize(fmt))
+            values = struct.unpack_from(f'<{count}{fmt}', data)
+        return [{"address": f"{prefix}{instance + i:03d}", "value": value, "other": {}, "type": data_type}
+                for i, value in enumerate(values)]
+
+    def _extract_data(self, pkt, hex_str, req_id, is_response, context=None):
         items = []
 
         # 头部长度通常是 32 bytes (64 hex chars)，之后是数据
@@ -106,9 +296,7 @@ class YaskawaProcessor(BaseProtocolProcessor):
         # 场景 A: 响应包 (Response)
         # ==========================================
         if is_response:
-            # 1. 查找关联信息
-            context = self.pending_requests.pop(req_id, None)
-
+            # 1. 关联信息 (context) 已在 parse 中取回
             # 2. 提取状态码 (通常在 Payload 的前几个字节，或者头部 Status 字段)
             # 简单起见，我们假设数据部分包含具体值
             payload = hex_str[HEADER_LEN:]
@@ -144,10 +332,11 @@ class YaskawaProcessor(BaseProtocolProcessor):
             payload = hex_str[HEADER_LEN:]
 
             # 记录请求上下文
-            self.pending_requests[req_id] = {
+            self.pending_requests.request(pkt, req_id, {
+                "frame": str(pkt.number),
                 "cmd": cmd_hex,
                 "cmd_info": f"Inst:{instance} Attr:{attr}"
-            }
+            })
 
             items.append({
                 "type": "Request",
@@ -0,0 +1,121 @@
+# tests/conftest.py
+"""
+测试公共夹具：把项目根目录加入 sys.path，并提供合成数据包 / 抓包文件的构造函数
+
+帧封装 (以太网 / IPv4 / TCP|UDP) 与 pcap 写入在这里自带实现，测试不依赖 benchmarks 包
+"""
+import os
+import sys
+import struct
+
+import pytest
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from utils.native_reader import NativePacket, decode_packet  # noqa: E402
+
+LINKTYPE_ETHERNET = 1
+CLIENT = bytes([10, 0, 0, 10])
+SERVER = bytes([10, 0, 0, 1])
+CLIENT_PORT = 50000
+START_TS = 1700000000.0
+YASKAWA_PORT = 10040
+
+
+class FrameBuilder:
+    """
+    以太网 / IPv4 / TCP|UDP 封装 (按方向维护 TCP 序列号)
+    """
+
+    def __init__(self):
+        self.tcp_seq = {}
+
+    def frame(self, transport, src, dst, sport, dport, payload):
+        if transport == 'tcp':
+            seq = self.tcp_seq.get((src, sport), 1000)
+            self.tcp_seq[(src, sport)] = (seq + len(payload)) & 0xFFFFFFFF
+            l4 = struct.pack('>HHIIBBHHH', sport, dport, seq, 1000, 5 << 4, 0x18, 65535, 0, 0) + payload
+            proto = 6
+        else:
+            l4 = struct.pack('>HHHH', sport, dport, 8 + len(payload), 0) + payload
+            proto = 17
+        ip = struct.pack('>BBHHHBBH4s4s', 0x45, 0, 20 + len(l4), 1, 0x4000, 64, proto, 0, src, dst)
+        return b'\x02\x00' + dst + b'\x02\x00' + src + b'\x08\x00' + ip + l4
+
+
+def write_pcap(path, frames):
+    """frames: [(时间戳, 帧字节), ...]，返回写入的帧数"""
+    count = 0
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+        for ts, frame in frames:
+            sec = int(ts)
+            usec = int(round((ts - sec) * 1e6))
+            f.write(struct.pack('<IIII', sec, usec, len(frame), len(frame)) + frame)
+            count += 1
+    return count
+
+
+def yaskawa_exchange(request_id, value):
+    """安川 HSE 整数变量读取 (0x7B) 的 (请求负载, 响应负载)"""
+    def header(ack, data):
+        return b'YERC' + struct.pack('<HHBBBBI', 32, len(data), 3, 1, ack, request_id & 0xFF, 0) + b'9' * 8
+    request = header(0, b'') + struct.pack('<HHBBH', 0x7B, 5, 1, 0x0E, 0)
+    data = struct.pack('<i', value)
+    response = header(1, data) + struct.pack('<BBBBHH', 0x8E, 0, 0, 0, 0, 0) + data
+    return request, response
+
+
+def write_yaskawa_capture(path, exchanges):
+    """
+    写入 exchanges 对安川 HSE 请求 / 响应 (共 2 * exchanges 帧，相邻帧间隔 1 ms)
+    原生后端在所有阶段都能解析并配对该协议，用作通用的测试抓包
+    """
+    builder = FrameBuilder()
+    frames = []
+    for n in range(exchanges):
+        request, response = yaskawa_exchange(n, n)
+        frames.append((START_TS + len(frames) * 0.001,
+                       builder.frame('udp', CLIENT, SERVER, CLIENT_PORT, YASKAWA_PORT, request)))
+        frames.append((START_TS + len(frames) * 0.001,
+                       builder.frame('udp', SERVER, CLIENT, YASKAWA_PORT, CLIENT_PORT, response)))
+    return write_pcap(path, frames)
+
+
+class PacketFactory:
+    """
+    按 "客户端 <-> 服务端" 构造原生后端数据包 (帧号与时间戳递增，相邻帧间隔 1 ms)
+    """
+
+    def __init__(self, transport, port):
+        self.transport = transport
+        self.port = port
+        self.builder = FrameBuilder()
+        self.number = 0
+
+    def __call__(self, payload, to_server=True, client_port=CLIENT_PORT):
+        self.number += 1
+        if to_server:
+            frame = self.builder.frame(self.transport, CLIENT, SERVER, client_port, self.port, payload)
+        else:
+            frame = self.builder.frame(self.transport, SERVER, CLIENT, self.port, client_port, payload)
+        pkt = NativePacket(self.number, START_TS + self.number * 0.001, 0, 0, LINKTYPE_ETHERNET,
+                           len(frame), len(frame))
+        return decode_packet(pkt, memoryview(frame))
+
+
+@pytest.fixture
+def packet_factory():
+    return PacketFactory
+
+
+@pytest.fixture
+def yaskawa_capture(tmp_path):
+    """yaskawa_capture(exchanges, name='capture.pcap') -> 抓包文件路径"""
+    def make(exchanges, name='capture.pcap'):
+        path = str(tmp_path / name)
+        write_yaskawa_capture(path, exchanges)
+        return path
+    return make
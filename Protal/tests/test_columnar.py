@@ -0,0 +1,46 @@
+# tests/test_columnar.py
+from utils import analyzer
+from utils.analyzer import analyze_columnar
+from utils.columnar import ColumnarResults
+from utils.result_cache import ResultCache
+
+
+def _result(packet_no, ts, protocol, items):
+    return {
+        "packet_no": packet_no,
+        "timestamp": ts,
+        "src_ip": "10.0.0.10",
+        "dst_ip": "10.0.0.1",
+        "protocol": protocol,
+        "items": [{"address": address, "value": value} for address, value in items],
+    }
+
+
+def test_filter_combines_conditions():
+    table = ColumnarResults.from_results([
+        _result(1, 100, "Modbus TCP", [("40001", 1), ("40002", 2)]),
+        _result(2, 200, "Modbus TCP", [("40001", 3)]),
+        _result(3, 300, "S7Comm", [("DB1.DBW0", 4)]),
+    ])
+    subset = table.filter(protocol="Modbus TCP", address="40001", start_ts=150)
+    assert [row['value'] for row in subset.iter_rows()] == [3]
+    assert len(table.filter(protocol="Modbus TCP", end_ts=150)) == 2
+    assert len(table.filter(address="missing")) == 0
+    assert len(table.filter()) == len(table)
+
+
+def test_aggregate_reuses_cached_columnar_table(tmp_path, yaskawa_capture, monkeypatch):
+    capture = yaskawa_capture(100)
+    cache = ResultCache(cache_dir=str(tmp_path / 'cache'), max_bytes=1 << 30)
+
+    scanned, table = analyze_columnar(capture, backend='native', cache=cache)
+    assert len(table) and scanned
+
+    # 第二次汇总直接加载列式缓存，不再解码抓包
+    def no_decode(*args, **kwargs):
+        raise AssertionError("不应重新解码")
+
+    monkeypatch.setattr(analyzer, 'stream_analysis', no_decode)
+    cached_scanned, cached = analyze_columnar(capture, backend='native', cache=cache)
+    assert cached_scanned == scanned
+    assert list(cached.iter_rows()) == list(table.iter_rows())
@@ -0,0 +1,41 @@
+# tests/test_correlation_state.py
+import gc
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synth_pcap import generate
+from processors import select_processors
+from utils.analyzer import analyze_industrial_pcap, iter_results
+
+
+def test_select_processors_returns_independent_state():
+    first, second = select_processors('modbus'), select_processors('modbus')
+    assert first[0] is not second[0]
+    assert first[0].pending_transactions is not second[0].pending_transactions
+
+
+def test_finished_run_releases_its_processors(packet_factory):
+    pkt = packet_factory('tcp', 502)
+    processors = select_processors('auto')
+    list(iter_results([pkt(b'\x00\x01\x00\x00\x00\x06\x01\x03\x00\x00\x00\x01')], processors))
+
+    # 分发表不在模块级缓存中保留已结束运行的处理器 (及其关联表)
+    ref = weakref.ref(processors[0])
+    del processors
+    gc.collect()
+    assert ref() is None
+
+
+def test_concurrent_runs_do_not_share_correlation_state(tmp_path):
+    capture = str(tmp_path / 'a.pcap')
+    generate(capture, 2000)
+
+    def run(_n):
+        result = analyze_industrial_pcap(capture, backend='native', workers=1)
+        return result['correlation'], [r.get('other', {}).get('request_frame') for r in result['data']]
+
+    # 串行两次结果相同 (每次运行从空的关联状态开始)，并发运行也与串行一致
+    expected = run(0)
+    assert run(1) == expected
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert all(outcome == expected for outcome in executor.map(run, range(8)))
@@ -0,0 +1,32 @@
+# tests/test_dispatch.py
+import struct
+
+import pytest
+
+from processors import build_packet_filter, check_backend_support, get_processor, select_processors
+
+
+def test_native_filter_skips_processors_without_native_decoder(packet_factory):
+    packet_filter = build_packet_filter(select_processors('auto'))
+    hart = packet_factory('udp', 5094)(struct.pack('>BBBBHH', 1, 0, 0, 0, 1, 8))
+    modbus = packet_factory('tcp', 502)(struct.pack('>HHHBBHH', 1, 0, 6, 1, 3, 0, 1))
+
+    assert not packet_filter(hart)
+    assert get_processor(hart) is None
+    assert packet_filter(modbus)
+
+
+def test_native_backend_rejects_only_unsupported_protocols():
+    with pytest.raises(ValueError):
+        check_backend_support('hart', 'native')
+    assert len(check_backend_support('hart', 'fields')) == 1
+
+
+def test_native_backend_warns_on_partially_supported_selection(caplog):
+    processors = check_backend_support('hart,modbus', 'native')
+    assert [p.protocol_id for p in processors] == ['MODBUS', 'HART_IP']
+    assert 'HART_IP' in caplog.text
+    # auto 只是 "所有可用协议"，不警告
+    caplog.clear()
+    check_backend_support('auto', 'native')
+    assert not caplog.records
@@ -0,0 +1,106 @@
+# tests/test_flows.py
+import os
+import struct
+
+from benchmarks.synth_pcap import generate
+from config.settings import config
+from processors.modbus import ModbusProcessor
+from utils.analyzer import analyze_industrial_pcap
+from utils.flows import FlowTable
+
+
+def _mbap(trans_id, pdu):
+    return struct.pack('>HHHB', trans_id, 0, len(pdu) + 1, 1) + pdu
+
+
+def _result(func_code, **other):
+    """会话表只读取解析结果中的 other (功能码 / 异常码)"""
+    return {"other": dict(other, func_code=str(func_code)), "items": []}
+
+
+def _exchanges(pkt, client_port=50000):
+    """FC3 / FC6 / FC16 各一对请求-响应，另有一个 FC3 异常响应：[(数据包, 解析结果), ...]"""
+    pdus = [
+        (3, struct.pack('>BHH', 3, 0, 1), struct.pack('>BBH', 3, 2, 7), {}),
+        (6, struct.pack('>BHH', 6, 1, 9), struct.pack('>BHH', 6, 1, 9), {}),
+        (16, struct.pack('>BHHB2H', 16, 2, 2, 4, 1, 2), struct.pack('>BHH', 16, 2, 2), {}),
+        (3, struct.pack('>BHH', 3, 0, 1), struct.pack('>BB', 0x83, 2), {'exception_code': '2'}),
+    ]
+    for trans_id, (func_code, request, response, error) in enumerate(pdus):
+        yield pkt(_mbap(trans_id, request), client_port=client_port), _result(func_code)
+        response = pkt(_mbap(trans_id, response), to_server=False, client_port=client_port)
+        yield response, _result(func_code, **error)
+
+
+def _feed(table, processor, packets):
+    for pkt, result in packets:
+        table.add(pkt, processor, result)
+
+
+def test_flow_orientation_codes_and_errors(packet_factory):
+    processor = ModbusProcessor()
+    table = FlowTable(max_codes=2)
+    _feed(table, processor, _exchanges(packet_factory('tcp', 502)))
+
+    flow, = table.summary()['flows']
+    assert (flow['client_ip'], flow['client_port'], flow['server_ip'], flow['server_port']) == \
+        ('10.0.0.10', '50000', '10.0.0.1', '502')
+    assert (flow['packets'], flow['to_server'], flow['to_client']) == (8, 4, 4)
+    # 只保留 2 种功能码，其余计入 "other"
+    assert flow['function_codes'] == {'3': 4, '6': 2, 'other': 2}
+    assert flow['errors'] == 1
+    assert table.valid_packets == 8
+
+
+def test_full_table_still_counts_valid_packets(packet_factory):
+    processor = ModbusProcessor()
+    pkt = packet_factory('tcp', 502)
+    table = FlowTable(max_flows=1)
+    for client_port in (50001, 50002, 50003):
+        request = pkt(_mbap(1, struct.pack('>BHH', 3, 0, 1)), client_port=client_port)
+        _feed(table, processor, [(request, _result(3))])
+
+    assert len(table) == 1
+    assert table.untracked_packets == 2
+    assert table.valid_packets == 3
+
+
+def test_merge_raw_matches_single_table(packet_factory):
+    processor = ModbusProcessor()
+    pkt = packet_factory('tcp', 502)
+    packets = list(_exchanges(pkt, 50001)) + list(_exchanges(pkt, 50002))
+
+    serial = FlowTable()
+    _feed(serial, processor, packets)
+    merged = FlowTable()
+    for half in (packets[:5], packets[5:]):
+        chunk = FlowTable()
+        _feed(chunk, processor, half)
+        merged.merge_raw(chunk.to_raw())
+
+    assert merged.summary() == serial.summary()
+    assert merged.valid_packets == serial.valid_packets
+
+
+def test_packets_false_matches_serial_and_parallel(tmp_path, monkeypatch):
+    capture = str(tmp_path / 'a.pcap')
+    generate(capture, 3000)
+    full = analyze_industrial_pcap(capture, backend='native', workers=1, flows=True)
+
+    summary = analyze_industrial_pcap(capture, backend='native', workers=1, keep_packets=False)
+    assert summary['data'] == []
+    assert summary['packets_found'] == len(full['data'])
+    assert summary['flows'] == full['flows']
+
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    monkeypatch.setattr(config, 'PARALLEL_MIN_PACKETS', 1)
+    monkeypatch.setattr(config, 'PARALLEL_OVERLAP_PACKETS', 50)
+    parallel = analyze_industrial_pcap(capture, backend='native', workers=2, keep_packets=False)
+    assert parallel['packets_found'] == summary['packets_found']
+    assert parallel['flows'] == summary['flows']
+
+    # 会话表已满时 packets_found 不受影响
+    monkeypatch.setattr(config, 'FLOW_MAX_FLOWS', 1)
+    capped = analyze_industrial_pcap(capture, backend='native', workers=1, keep_packets=False)
+    assert capped['packets_found'] == summary['packets_found']
+    assert capped['flows']['total_flows'] == 1
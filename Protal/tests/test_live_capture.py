@@ -0,0 +1,29 @@
+# tests/test_live_capture.py
+from utils import live_capture
+from utils.live_capture import LiveSession
+
+
+def test_run_buffers_only_parsed_records(monkeypatch):
+    packets = ['p1', 'p2', 'p3']
+    results = [None, {"packet_no": 2}, {"packet_no": 3}]
+
+    def stub_fields_generator(*args, **kwargs):
+        yield from packets
+
+    def stub_iter_results(packet_iter, processors, backend=None):
+        for pkt, record in zip(packet_iter, results):
+            yield pkt, record
+
+    monkeypatch.setattr(live_capture, 'live_fields_generator', stub_fields_generator)
+    monkeypatch.setattr(live_capture, 'iter_results', stub_iter_results)
+
+    session = LiveSession('lo', capture_filter='tcp', ring_size=8)
+    # 视为主动停止，生成器结束后不按 tshark 异常退出处理
+    session._stop_event.set()
+    session._run()
+
+    assert session.status == LiveSession.STOPPED
+    assert session.packets_scanned == 3 and session.records == 2
+    records, cursor, dropped = session.read(0, 10)
+    assert [record for _seq, record in records] == results[1:]
+    assert (cursor, dropped) == (2, 0)
@@ -0,0 +1,239 @@
+# tests/test_native_decoders.py
+"""
+原生解码器的金样输出：按协议构造 请求 -> 响应 帧，逐字段核对 parse_native 的结果
+(帧号从 1 开始，相邻帧间隔 1 ms，配对成功的响应带 request_frame / latency_ms)
+"""
+import struct
+
+from processors.bacnet import BacnetProcessor
+from processors.cippccc import CippcccProcessor
+from processors.modbus import ModbusProcessor
+from processors.omron import OmronFinsProcessor
+from processors.s7comm import S7CommProcessor
+from processors.yaskawa import YaskawaProcessor
+
+
+def _items(result):
+    return [(item['address'], item['value'], item['type']) for item in result['items']]
+
+
+# ---------- Modbus/TCP ----------
+def _mbap(trans_id, pdu, unit=1):
+    return struct.pack('>HHHB', trans_id, 0, len(pdu) + 1, unit) + pdu
+
+
+def test_modbus_read_write_and_exception(packet_factory):
+    pkt = packet_factory('tcp', 502)
+    processor = ModbusProcessor()
+
+    request = processor.parse_native(pkt(_mbap(1, struct.pack('>BHH', 3, 100, 2))))
+    assert request['other'] == {'func_code': '3', 'trans_id': '1'}
+    response = processor.parse_native(pkt(_mbap(1, struct.pack('>BB2H', 3, 4, 1, 65535)), to_server=False))
+    assert response['other'] == {'func_code': '3', 'trans_id': '1', 'request_frame': '1', 'latency_ms': 1.0}
+    assert _items(response) == [('100', 1, 'Holding Register'), ('101', 65535, 'Holding Register')]
+
+    request = processor.parse_native(pkt(_mbap(2, struct.pack('>BHHB2H', 16, 30, 2, 4, 258, 772))))
+    assert _items(request) == [('30', 258, 'Holding Register'), ('31', 772, 'Holding Register')]
+    response = processor.parse_native(pkt(_mbap(2, struct.pack('>BHH', 16, 30, 2)), to_server=False))
+    assert response['other']['request_frame'] == '3' and response['items'] == []
+
+    processor.parse_native(pkt(_mbap(3, struct.pack('>BHH', 3, 0, 1))))
+    response = processor.parse_native(pkt(_mbap(3, struct.pack('>BB', 0x83, 2)), to_server=False))
+    assert response['other'] == {'func_code': '3', 'trans_id': '3', 'exception_code': '2',
+                                 'request_frame': '5', 'latency_ms': 1.0}
+
+    # 未配对的响应：地址记为 Unknown+i，数据项结构与 pyshark 路径经 create_standard_result 映射后一致
+    response = processor.parse_native(pkt(_mbap(9, struct.pack('>BB2H', 4, 4, 7, 8)), to_server=False))
+    assert _items(response) == [('Unknown+0', 7, 'Input Register'), ('Unknown+1', 8, 'Input Register')]
+    assert response['items'][0]['other'] == {'protocol_specific': {}}
+
+
+# ---------- S7comm ----------
+def _tpkt(s7):
+    cotp = b'\x02\xf0\x80'
+    return struct.pack('>BBH', 3, 0, 4 + len(cotp) + len(s7)) + cotp + s7
+
+
+def _s7_item(transport_size, length, db, area, byte, bit=0):
+    return struct.pack('>BBBBHHB', 0x12, 0x0A, 0x10, transport_size, length, db, area) + \
+        ((byte << 3) | bit).to_bytes(3, 'big')
+
+
+def _s7_job(ref, param, data=b''):
+    return _tpkt(struct.pack('>BBHHHH', 0x32, 1, 0, ref, len(param), len(data)) + param + data)
+
+
+def _s7_ack(ref, param, data=b''):
+    return _tpkt(struct.pack('>BBHHHHBB', 0x32, 3, 0, ref, len(param), len(data), 0, 0) + param + data)
+
+
+def test_s7_read_and_write_pairing(packet_factory):
+    pkt = packet_factory('tcp', 102)
+    processor = S7CommProcessor()
+
+    param = b'\x04\x02' + _s7_item(2, 3, 5, 0x84, 10) + _s7_item(1, 1, 0, 0x83, 4, 3)
+    processor.parse_native(pkt(_s7_job(1, param)))
+    data = struct.pack('>BBH', 0xFF, 4, 24) + b'\x01\x02\x03\x00' + struct.pack('>BBH', 0xFF, 3, 1) + b'\x01'
+    response = processor.parse_native(pkt(_s7_ack(1, b'\x04\x02', data), to_server=False))
+    assert response['other']['job_type'] == 'Read Var Response'
+    assert response['other']['request_frame'] == '1'
+    assert _items(response) == [
+        ('DB 5.DBX 10.0 BYTE 3 (Response)', '66051', 'Read Response'),
+        ('M 4.3 BIT 1 (Response)', '1', 'Read Response'),
+    ]
+
+    param = b'\x05\x02' + _s7_item(2, 1, 7, 0x84, 0) + _s7_item(8, 4, 7, 0x84, 4)
+    data = struct.pack('>BBH', 0, 4, 8) + b'\x2a\x00' + struct.pack('>BBH', 0, 7, 4) + struct.pack('>f', 1.5)
+    request = processor.parse_native(pkt(_s7_job(2, param, data)))
+    assert _items(request) == [('DB 7.DBX 0.0 BYTE 1', '42', 'Write Request'),
+                               ('DB 7.DBX 4.0 REAL 4', '1069547520', 'Write Request')]
+    response = processor.parse_native(pkt(_s7_ack(2, b'\x05\x02', b'\xff\x05'), to_server=False))
+    assert response['other']['request_frame'] == '3'
+    assert [(item['address'], item['description']) for item in response['items']] == [
+        ('DB 7.DBX 0.0 BYTE 1 (Response)', 'Write Success'),
+        ('DB 7.DBX 4.0 REAL 4 (Response)', 'Invalid address'),
+    ]
+
+    # 读响应与写请求对同样长度的数据使用同一显示规则 (<= 8 字节为十进制)
+    param = _s7_item(2, 8, 1, 0x84, 0) + _s7_item(2, 10, 1, 0x84, 8)
+    values = [bytes(range(1, 9)), bytes(range(1, 11))]
+    data = b''.join(struct.pack('>BBH', 0, 4, len(v) * 8) + v for v in values)
+    request = processor.parse_native(pkt(_s7_job(3, b'\x05\x02' + param, data)))
+    processor.parse_native(pkt(_s7_job(4, b'\x04\x02' + param)))
+    data = b''.join(struct.pack('>BBH', 0xFF, 4, len(v) * 8) + v for v in values)
+    response = processor.parse_native(pkt(_s7_ack(4, b'\x04\x02', data), to_server=False))
+    expected = [str(int.from_bytes(values[0], 'big')), '0x' + values[1].hex()]
+    assert [item['value'] for item in request['items']] == expected
+    assert [item['value'] for item in response['items']] == expected
+
+
+# ---------- Omron FINS ----------
+def _fins(response, sid, body):
+    return struct.pack('>10B', 0xC0 if response else 0x80, 0, 2, 0, 1, 0, 0, 10, 0, sid) + body
+
+
+def test_fins_word_and_bit_areas(packet_factory):
+    pkt = packet_factory('udp', 9600)
+    processor = OmronFinsProcessor()
+
+    processor.parse_native(pkt(_fins(False, 1, b'\x01\x01' + struct.pack('>BHBH', 0x82, 100, 0, 2))))
+    response = processor.parse_native(pkt(_fins(True, 1, b'\x01\x01\x00\x00' + struct.pack('>2H', 1, 0xFFFF)),
+                                          to_server=False))
+    assert response['other']['request_frame'] == '1'
+    assert _items(response)[1:] == [('100', 1, 'Read Data'), ('101', 65535, 'Read Data')]
+    assert response['items'][1]['other']['area_name'] == 'DM (Data Memory)'
+
+    request = processor.parse_native(pkt(_fins(False, 2, b'\x01\x01' + struct.pack('>BHBH', 0x30, 10, 14, 3))))
+    assert _items(request) == [('10.14', 'Requesting 3 bits', 'Read Request')]
+    response = processor.parse_native(pkt(_fins(True, 2, b'\x01\x01\x00\x00' + bytes([1, 0, 1])),
+                                          to_server=False))
+    assert _items(response)[1:] == [('10.14', 1, 'Read Data'), ('10.15', 0, 'Read Data'), ('11.00', 1, 'Read Data')]
+
+
+# ---------- Yaskawa HSE ----------
+def _yerc(ack, request_id, sub_header, data=b''):
+    return b'YERC' + struct.pack('<HHBBBBI', 32, len(data), 3, 1, ack, request_id, 0) + b'9' * 8 + sub_header + data
+
+
+def test_yaskawa_plural_read(packet_factory):
+    pkt = packet_factory('udp', 10040)
+    processor = YaskawaProcessor()
+
+    request = processor.parse_native(pkt(_yerc(0, 3, struct.pack('<HHBBH', 0x304, 10, 0, 0x33, 0),
+                                                struct.pack('<I', 3))))
+    assert request['other'] == {'req_id': '03', 'command': '0x0304'}
+    response = processor.parse_native(pkt(_yerc(1, 3, struct.pack('<BBBBHH', 0xB3, 0, 0, 0, 0, 0),
+                                                struct.pack('<I3i', 3, 1, -2, 300000)), to_server=False))
+    assert response['other']['request_frame'] == '1'
+    assert _items(response) == [('D010', 1, 'Read Data'), ('D011', -2, 'Read Data'), ('D012', 300000, 'Read Data')]
+
+
+# ---------- BACnet/IP ----------
+def _bvlc(apdu):
+    npdu = b'\x01\x04' + apdu
+    return struct.pack('>BBH', 0x81, 0x0A, 4 + len(npdu)) + npdu
+
+
+def _oid(object_type, instance):
+    return struct.pack('>I', (object_type << 22) | instance)
+
+
+def _real(value):
+    return b'\x44' + struct.pack('>f', value)
+
+
+def test_bacnet_read_property_multiple_and_cov(packet_factory):
+    pkt = packet_factory('udp', 47808)
+    processor = BacnetProcessor()
+
+    specs = b'\x0c' + _oid(0, 1) + b'\x1e\x09\x55\x09\x4d\x1f'
+    request = processor.parse_native(pkt(_bvlc(b'\x00\x05\x02\x0e' + specs)))
+    assert request['other'] == {'apdu_type': 'Confirmed-REQ', 'service': 'readPropertyMultiple', 'invoke_id': '2'}
+    ack = (b'\x0c' + _oid(0, 1) + b'\x1e' + b'\x29\x55\x4e' + _real(1.5) + b'\x4f'
+           + b'\x29\x4d\x4e' + b'\x75\x06\x00Zone1' + b'\x4f' + b'\x1f')
+    response = processor.parse_native(pkt(_bvlc(b'\x30\x02\x0e' + ack), to_server=False))
+    assert response['other']['request_frame'] == '1'
+    assert _items(response) == [
+        ('Obj: analog-input:1 / Prop: present-value', 1.5, 'Read Response'),
+        ('Obj: analog-input:1 / Prop: object-name', 'Zone1', 'Read Response'),
+    ]
+
+    cov = (b'\x09\x12' + b'\x1c' + _oid(8, 1234) + b'\x2c' + _oid(2, 7) + b'\x39\x00'
+           + b'\x4e' + b'\x09\x55\x2e' + _real(3.25) + b'\x2f' + b'\x4f')
+    notification = processor.parse_native(pkt(_bvlc(b'\x10\x02' + cov)))
+    assert notification['other']['service'] == 'unconfirmedCOVNotification'
+    assert _items(notification) == [('Obj: analog-value:7 / Prop: present-value', 3.25, 'COV Notification')]
+    assert notification['items'][0]['description'] == 'COV from device:1234'
+
+
+# ---------- EtherNet/IP CIP ----------
+def _connected(cip, seq):
+    items = (struct.pack('<IHH', 0, 0, 2) + struct.pack('<HHI', 0xA1, 4, 0x1234)
+             + struct.pack('<HHH', 0xB1, len(cip) + 2, seq) + cip)
+    return struct.pack('<HHII8sI', 0x70, len(items), 1, 0, b'\0' * 8, 0) + items
+
+
+def _symbol(name):
+    raw = name.encode()
+    return bytes([0x91, len(raw)]) + raw + (b'\0' if len(raw) % 2 else b'')
+
+
+def _cip_request(service, path, data=b''):
+    return bytes([service, len(path) // 2]) + path + data
+
+
+def _cip_response(service, data=b'', status=0):
+    return bytes([service | 0x80, 0, status, 0]) + data
+
+
+def _msp(messages, response=False, status=0):
+    offset = 2 + 2 * len(messages)
+    offsets, body = [], b''
+    for message in messages:
+        offsets.append(offset + len(body))
+        body += message
+    data = struct.pack('<H', len(messages)) + struct.pack(f'<{len(messages)}H', *offsets) + body
+    if response:
+        return _cip_response(0x0A, data, status)
+    return _cip_request(0x0A, bytes([0x20, 2, 0x24, 1]), data)
+
+
+def test_cip_multiple_service_with_fragmented_read(packet_factory):
+    pkt = packet_factory('tcp', 44818)
+    processor = CippcccProcessor()
+
+    request = processor.parse_native(pkt(_connected(_msp([
+        _cip_request(0x52, _symbol('Big'), struct.pack('<HI', 100, 0)),
+        _cip_request(0x4C, _symbol('A'), b'\x01\x00'),
+    ]), 7)))
+    assert request['other']['services'] == 2
+    assert _items(request) == [('Tag: Big', 'Read Tag Fragmented', 'Operation'), ('Tag: A', 'Read Tag', 'Operation')]
+
+    response = processor.parse_native(pkt(_connected(_msp([
+        _cip_response(0x52, struct.pack('<H4i', 0xC4, 1, 2, 3, 4), status=0x06),
+        _cip_response(0x4C, struct.pack('<Hh', 0xC3, 42)),
+    ], response=True, status=0x1E), 7), to_server=False))
+    assert response['other']['request_frame'] == '1'
+    assert response['other']['general_status'] == '0x1e'
+    assert _items(response) == [('Tag: Big', [1, 2, 3, 4], 'Data Value'), ('Tag: A', 42, 'Data Value')]
+    assert response['items'][0]['other'] == {'data_type': 'DINT', 'partial': True}
@@ -0,0 +1,75 @@
+# tests/test_paging.py
+import base64
+import json
+
+import pytest
+
+from utils import analyzer
+from utils.analyzer import analyze_page, decode_cursor
+from utils.pcap_index import get_or_build_index
+
+
+def test_decode_cursor_rejects_non_dict_state():
+    cursor = base64.urlsafe_b64encode(json.dumps([1]).encode()).decode().rstrip('=')
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+    with pytest.raises(ValueError):
+        decode_cursor('not-base64!')
+
+
+def test_page_totals_come_from_index_header(yaskawa_capture, monkeypatch):
+    capture = yaskawa_capture(150)
+    started = []
+    monkeypatch.setattr(analyzer, 'build_index_async', started.append)
+
+    # 索引不存在：首页不等待建立索引，总数为空并触发后台构建
+    page = analyze_page(capture, backend='native', limit=50)
+    assert page['pagination']['total_frames'] is None
+    assert started == [capture]
+
+    get_or_build_index(capture)
+    returned = len(page['data'])
+    cursor = page['pagination']['next_cursor']
+    while cursor:
+        page = analyze_page(capture, backend='native', limit=50, cursor=cursor)
+        pagination = page['pagination']
+        assert pagination['total_frames'] == 300
+        assert pagination['candidate_packets'] >= pagination['returned_packets']
+        returned += len(page['data'])
+        cursor = pagination['next_cursor']
+    assert pagination['total_packets'] == returned
+
+
+def test_offset_is_counted_in_totals(yaskawa_capture):
+    capture = yaskawa_capture(50)
+    everything = analyze_page(capture, backend='native', limit=1000)
+    assert everything['pagination']['total_packets'] == 100
+
+    page = analyze_page(capture, backend='native', limit=30, offset=25)
+    assert page['data'] == everything['data'][25:55]
+    returned = len(page['data'])
+    while page['pagination']['next_cursor']:
+        page = analyze_page(capture, backend='native', limit=30, cursor=page['pagination']['next_cursor'])
+        returned += len(page['data'])
+    assert page['pagination']['skipped_packets'] == 25
+    assert page['pagination']['returned_packets'] == returned == 75
+    assert page['pagination']['total_packets'] == 100
+
+    # offset 超过有效数据包总数：只计实际跳过的数量
+    page = analyze_page(capture, backend='native', limit=30, offset=500)
+    assert page['data'] == [] and page['pagination']['total_packets'] == 100
+
+
+def test_resume_slices_are_bounded(yaskawa_capture, monkeypatch):
+    capture = yaskawa_capture(1500)
+    slices = []
+
+    def fake_range(file_path, first_frame=None, last_frame=None, **kwargs):
+        slices.append((first_frame, last_frame))
+        return iter(())
+
+    monkeypatch.setattr(analyzer, 'pcap_range_generator', fake_range)
+    list(analyzer._windowed_range_packets(capture, 101, 10, 'tshark', None, None))
+    assert slices[0] == (101, 101 + analyzer._PAGE_WINDOW_MIN - 1)
+    assert slices[-1][1] == 3000
+    assert all(last - first < 3000 - 100 for first, last in slices)
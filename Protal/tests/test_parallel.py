@@ -0,0 +1,26 @@
+# tests/test_parallel.py
+import os
+
+from config.settings import config
+from utils.analyzer import analyze_industrial_pcap, plan_chunks
+
+
+def test_parallel_chunks_match_serial(yaskawa_capture, monkeypatch):
+    # 51 对请求 / 响应切成 8 块 (每块 13 帧)：块边界落在请求与响应之间
+    capture = yaskawa_capture(51)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    monkeypatch.setattr(config, 'PARALLEL_MIN_PACKETS', 1)
+    monkeypatch.setattr(config, 'PARALLEL_CHUNKS_PER_WORKER', 4)
+    monkeypatch.setattr(config, 'PARALLEL_OVERLAP_PACKETS', 4)
+    chunks = plan_chunks(capture, 2)
+    assert len(chunks) == 8 and chunks[1]['first_frame'] == 14
+
+    serial = analyze_industrial_pcap(capture, backend='native', workers=1)
+    parallel = analyze_industrial_pcap(capture, backend='native', workers=2)
+    assert parallel['total_scanned'] == serial['total_scanned'] == 102
+    assert parallel['data'] == serial['data']
+    assert parallel['correlation'] == serial['correlation']
+
+    # 没有预热区时跨块边界的响应无法配对，说明上面的比较确实覆盖了边界
+    monkeypatch.setattr(config, 'PARALLEL_OVERLAP_PACKETS', 0)
+    assert analyze_industrial_pcap(capture, backend='native', workers=2)['data'] != serial['data']
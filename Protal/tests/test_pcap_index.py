@@ -0,0 +1,32 @@
+# tests/test_pcap_index.py
+from utils import pcap_index
+from utils.pcap_index import PcapIndex, get_or_build_index
+
+
+def test_stale_sidecar_falls_back_to_temp_dir(tmp_path, yaskawa_capture, monkeypatch):
+    capture = yaskawa_capture(25)
+    fallback = str(tmp_path / 'fallback.olidx')
+    monkeypatch.setattr(pcap_index, '_fallback_index_path', lambda _path: fallback)
+
+    # 抓包目录中留有一个过期的索引且目录不可写：重建的索引只能保存在临时目录
+    index = PcapIndex.build(capture)
+    index.save(fallback)
+    index.source_size += 1
+    index.save(capture + pcap_index.INDEX_SUFFIX)
+
+    def no_rebuild(_path):
+        raise AssertionError("临时目录中的索引有效，不应重建")
+
+    monkeypatch.setattr(PcapIndex, 'build', staticmethod(no_rebuild))
+    index = get_or_build_index(capture)
+    assert index is not None and len(index) == 50
+
+
+def test_frames_for_time_handles_unsorted_timestamps():
+    index = PcapIndex()
+    for ts in (10.0, 11.0, 0.0, 12.0, 13.0):
+        index.offsets.append(0)
+        index.ts.append(ts)
+    assert not index.ts_sorted()
+    assert index.frames_for_time(11.0, 12.0) == (2, 4)
+    assert index.frames_for_time(20.0, 30.0) is None
@@ -0,0 +1,43 @@
+# tests/test_pcap_reader.py
+import itertools
+
+from utils import pcap_reader
+
+
+class FakeProcess:
+    def __init__(self):
+        self.killed = False
+
+    def kill(self):
+        self.killed = True
+
+
+class FakeCapture:
+    def __init__(self, *args, **kwargs):
+        self._running_processes = {FakeProcess()}
+        self.closed = False
+
+    def __iter__(self):
+        return itertools.count(1)
+
+    def close(self):
+        self.closed = True
+
+
+def test_pyshark_generator_exposes_tshark_for_cancel(tmp_path, monkeypatch):
+    capture = tmp_path / 'a.pcap'
+    capture.write_bytes(b'')
+    monkeypatch.setattr(pcap_reader.pyshark, 'FileCapture', FakeCapture)
+    handles = []
+
+    packets = pcap_reader.pcap_generator(str(capture), backend='pyshark', on_process=handles.append)
+    assert next(packets) == 1
+    handle, = handles
+    assert handle.poll() is None
+
+    # 任务取消时 Job.cancel 调用 kill()：tshark 被终止，生成器不再产出数据包
+    handle.kill()
+    assert handle.poll() is not None
+    assert all(proc.killed for proc in handle._cap._running_processes)
+    assert list(packets) == []
+    assert handle._cap.closed
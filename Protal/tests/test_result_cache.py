@@ -0,0 +1,84 @@
+# tests/test_result_cache.py
+import os
+
+from config.settings import config
+from processors.yaskawa import YaskawaProcessor
+from utils.result_cache import ResultCache, build_cache_key
+
+
+def _rewrite(path, offset, data):
+    """原地改写文件内容，保持大小与修改时间不变"""
+    stat = os.stat(path)
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        f.write(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_key_tracks_file_and_processors(yaskawa_capture, monkeypatch):
+    monkeypatch.setattr(config, 'RESULT_CACHE_HASH_BLOCK', 256)
+    capture = yaskawa_capture(20)
+    key = build_cache_key(capture, backend='native')
+    assert build_cache_key(capture, backend='native') == key
+    assert build_cache_key(capture, backend='pyshark') != key
+
+    stat = os.stat(capture)
+    os.utime(capture, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert build_cache_key(capture, backend='native') != key
+    os.utime(capture, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert build_cache_key(capture, backend='native') == key
+
+    # 大小与时间戳都不变，仅首块 / 尾块内容被替换
+    head = open(capture, 'rb').read()[100:104]
+    _rewrite(capture, 100, b'\xff' * 4)
+    assert build_cache_key(capture, backend='native') != key
+    _rewrite(capture, 100, head)
+    assert build_cache_key(capture, backend='native') == key
+    _rewrite(capture, stat.st_size - 4, b'\xff' * 4)
+    assert build_cache_key(capture, backend='native') != key
+
+    key = build_cache_key(capture, backend='native')
+    monkeypatch.setattr(YaskawaProcessor, 'VERSION', YaskawaProcessor.VERSION + 1)
+    assert build_cache_key(capture, backend='native') != key
+
+    with open(capture, 'ab') as f:
+        f.write(b'\0')
+    monkeypatch.undo()
+    assert build_cache_key(capture, backend='native') != key
+
+
+def test_put_evicts_least_recently_used(tmp_path):
+    result = {"total_scanned": 1, "packets_found": 1, "data": [{"frame": 1, "value": "x" * 100}]}
+    cache = ResultCache(cache_dir=str(tmp_path), max_bytes=10 ** 6)
+    assert cache.put('a', result)
+    size = os.path.getsize(os.path.join(str(tmp_path), 'a.json'))
+
+    cache.max_bytes = size * 2
+    assert cache.put('b', result)
+    os.utime(os.path.join(str(tmp_path), 'a.json'), (1, 1))
+    os.utime(os.path.join(str(tmp_path), 'b.json'), (2, 2))
+    # 命中刷新最近使用时间：a 比 b 新
+    assert cache.get('a') == result
+
+    assert cache.put('c', result)
+    assert cache.get('b') is None
+    assert cache.get('a') == result and cache.get('c') == result
+
+    # 单个结果超过上限时不写入
+    cache.max_bytes = size - 1
+    assert not cache.put('d', result)
+    assert not os.path.exists(os.path.join(str(tmp_path), 'd.json'))
+
+
+def test_corrupt_entries_are_removed(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    meta_path = os.path.join(str(tmp_path), 'meta.json')
+    data_path = os.path.join(str(tmp_path), 'data.json')
+    with open(meta_path, 'wb') as f:
+        f.write(b'{not json\n[]')
+    with open(data_path, 'wb') as f:
+        f.write(b'{"total_scanned":1}\n[{"frame"')
+
+    assert cache.get('meta') is None and not os.path.exists(meta_path)
+    assert cache.get('data') is None and not os.path.exists(data_path)
+    assert cache.get('missing') is None
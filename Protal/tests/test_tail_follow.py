@@ -0,0 +1,25 @@
+# tests/test_tail_follow.py
+from benchmarks.synth_pcap import generate
+from utils.analyzer import analyze_industrial_pcap
+from utils.tail_follow import FollowTracker
+
+
+def test_follow_pairs_across_refreshes(tmp_path):
+    source = str(tmp_path / 'full.pcap')
+    generate(source, 1000)
+    with open(source, 'rb') as f:
+        content = f.read()
+    expected = analyze_industrial_pcap(source, backend='native', workers=1)['data']
+
+    # 文件分两次写入 (第一次在记录中间截断)，两次增量结果拼起来应与一次性分析完全一致
+    growing = str(tmp_path / 'growing.pcap')
+    tracker = FollowTracker()
+    results = []
+    for size in (len(content) // 2 + 7, len(content)):
+        with open(growing, 'wb') as f:
+            f.write(content[:size])
+        results += tracker.analyze(growing, backend='native')['data']
+        # 其它分析不会改动增量进度中的关联状态
+        analyze_industrial_pcap(source, backend='native', workers=1)
+
+    assert results == expected
@@ -0,0 +1,619 @@
+# utils/analyzer.py
+"""
+工控协议分析核心逻辑
+
+从 app.py 中拆分出来，使多进程 worker 可以直接导入 (无需加载 Flask)。
+支持两种模式：
+    1. 串行：单个生成器从头到尾读取
+    2. 并行：按帧范围把大文件切成多个块，在 ProcessPoolExecutor 中并行解析，
+       结果按 packet_no 顺序合并
+"""
+import os
+import json
+import time
+import base64
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from config.settings import config
+from utils.pcap_reader import pcap_generator, pcap_range_generator, resolve_backend
+from utils.native_reader import native_packet_generator
+from utils.pcap_index import get_or_build_index, read_index_header, build_index_async
+from utils.columnar import ColumnarResults
+from utils.result_cache import build_cache_key
+from utils import metrics
+from utils.metrics import MetricsBatch, metric_key
+from processors import correlation
+from utils.flows import FlowTable
+from processors import (
+    ProcessorDispatcher,
+    select_processors,
+    build_display_filter,
+    build_packet_filter,
+)
+
+logger = logging.getLogger(__name__)
+
+# tshark 类后端分页续扫时第一段切片的最少帧数 (结果不够一页时逐段加倍)
+_PAGE_WINDOW_MIN = 1024
+
+
+def iter_results(packets, processors, record_from=0, backend=None, batch=None, flows=None):
+    """
+    遍历数据包并调用处理器，逐包 yield (pkt, 解析结果或 None)
+
+    Args:
+        packets: 数据包迭代器
+        processors: 候选处理器列表
+        record_from: 小于该帧号的包只用于预热关联状态，不会被 yield
+        backend: 读取后端名称 (仅用作指标标签)
+        batch: 可选，外部传入的 MetricsBatch (并行 worker 把指标带回主进程)；
+               默认在本次遍历内部创建并定期合并到全局注册表
+        flows: 可选 FlowTable，帧号 >= record_from 且匹配到处理器的包同时计入会话表
+    """
+    if not metrics.enabled():
+        # 分发表属于本次遍历的处理器实例，遍历开始前创建一次
+        dispatch = ProcessorDispatcher(processors).dispatch
+        for pkt in packets:
+            number = int(pkt.number)
+
+            # 1. 动态获取处理器 (Modbus/Omron/S7)
+            processor = dispatch(pkt)
+
+            # 2. 解析数据 (原生后端的数据包交给字节级解码器)
+            if processor is None:
+                parsed_data = None
+            elif getattr(type(pkt), 'native', False):
+                parsed_data = processor.parse_native(pkt)
+            else:
+                parsed_data = processor.parse(pkt)
+            if number >= record_from:
+                if flows is not None and processor is not None:
+                    flows.add(pkt, processor, parsed_data)
+                yield pkt, parsed_data
+        return
+
+    yield from _iter_results_instrumented(packets, processors, record_from, backend or 'unknown', batch, flows)
+
+
+def _iter_results_instrumented(packets, processors, record_from, backend, batch, flows):
+    """
+    与 iter_results 相同，额外统计读取 / 分发 / 解析耗时与各处理器计数
+    计数先累加在局部变量中，每 METRICS_FLUSH_PACKETS 个包写入一次 MetricsBatch
+    """
+    own_batch = batch is None
+    if own_batch:
+        batch = MetricsBatch()
+    previous = metrics.activate(batch)
+    batch.add('openlist_analysis_runs_total', backend=backend)
+
+    perf = time.perf_counter
+    flush_every = max(config.METRICS_FLUSH_PACKETS, 1)
+    stage_keys = {stage: metric_key('openlist_stage_seconds_total', stage=stage)
+                  for stage in ('read', 'dispatch', 'parse')}
+    scanned_key = metric_key('openlist_packets_scanned_total', backend=backend)
+    unmatched_key = metric_key('openlist_packets_unmatched_total', backend=backend)
+
+    # 处理器 -> [matched, parsed, empty, 耗时] 局部累加
+    counters = {}
+    processor_keys = {}
+    for processor in processors:
+        label = processor.protocol_id.lower()
+        counters[processor] = [0, 0, 0, 0.0]
+        processor_keys[processor] = tuple(
+            metric_key('openlist_processor_packets_total', processor=label, result=result)
+            for result in ('matched', 'parsed', 'empty')
+        ) + (metric_key('openlist_processor_parse_seconds_total', processor=label),)
+
+    totals = [0, 0, 0.0, 0.0, 0.0]  # scanned, unmatched, read, dispatch, parse
+
+    def flush():
+        values = batch.values
+        values[scanned_key] += totals[0]
+        values[unmatched_key] += totals[1]
+        values[stage_keys['read']] += totals[2]
+        values[stage_keys['dispatch']] += totals[3]
+        values[stage_keys['parse']] += totals[4]
+        totals[:] = [0, 0, 0.0, 0.0, 0.0]
+        for processor, counter in counters.items():
+            if counter[0]:
+                keys = processor_keys[processor]
+                for key, value in zip(keys, counter):
+                    values[key] += value
+                counter[:] = [0, 0, 0, 0.0]
+        if own_batch:
+            batch.flush()
+
+    dispatch = ProcessorDispatcher(processors).dispatch
+    iterator = iter(packets)
+    pending = 0
+    try:
+        while True:
+            t0 = perf()
+            try:
+                pkt = next(iterator)
+            except StopIteration:
+                break
+            t1 = perf()
+
+            # 1. 动态获取处理器 (Modbus/Omron/S7)
+            processor = dispatch(pkt)
+            t2 = perf()
+            totals[0] += 1
+            totals[2] += t1 - t0
+            totals[3] += t2 - t1
+
+            # 2. 解析数据
+            if processor is None:
+                parsed_data = None
+                totals[1] += 1
+            else:
+                if getattr(type(pkt), 'native', False):
+                    parsed_data = processor.parse_native(pkt)
+                else:
+                    parsed_data = processor.parse(pkt)
+                elapsed = perf() - t2
+                totals[4] += elapsed
+                counter = counters.get(processor)
+                if counter is not None:
+                    counter[0] += 1
+                    counter[1 if parsed_data else 2] += 1
+                    counter[3] += elapsed
+
+            pending += 1
+            if pending >= flush_every:
+                pending = 0
+                flush()
+
+            if int(pkt.number) >= record_from:
+                if flows is not None and processor is not None:
+                    flows.add(pkt, processor, parsed_data)
+                yield pkt, parsed_data
+    finally:
+        flush()
+        metrics.activate(previous)
+
+
+def _scan_packets(packets, processors, record_from=0, backend=None, batch=None, flows=None, keep_packets=True):
+    """
+    遍历数据包并收集全部结果
+
+    Args:
+        flows: 可选 FlowTable，遍历时同时累加会话表
+        keep_packets: False 时不保留逐包结果 (只需要会话汇总时，内存与结果数量无关)
+
+    Returns:
+        tuple: (扫描包数, 结果列表)
+    """
+    results = []
+    packet_count = 0
+
+    for _pkt, parsed_data in iter_results(packets, processors, record_from, backend=backend, batch=batch,
+                                          flows=flows):
+        packet_count += 1
+        if parsed_data and keep_packets:
+            results.append(parsed_data)
+
+    return packet_count, results
+
+
+def analyze_industrial_pcap(file_path, backend=None, protocol_type='auto', workers=None, frame_range=None,
+                            flows=False, keep_packets=True):
+    """
+    分析 PCAP 文件的核心逻辑
+
+    Args:
+        file_path: 抓包文件路径
+        backend: 读取后端 ('pyshark' / 'native' / 'fields')，默认取配置
+        protocol_type: 协议类型 ('auto' 或逗号分隔的协议名)，用于过滤下推与处理器选择
+        workers: 并行进程数，默认取 config.ANALYZE_WORKERS (1 表示串行)
+        frame_range: 可选，{'first_frame', 'last_frame', 'start_time', 'end_time'}，
+                     借助帧索引只分析指定帧范围 / 时间窗口
+        flows: True 时在同一次遍历中生成会话表，结果中附带 "flows" 汇总
+        keep_packets: False 时不保留逐包结果 (data 为空，只返回会话汇总；隐含 flows=True)
+    """
+    backend = resolve_backend(backend)
+    workers = min(int(workers or config.ANALYZE_WORKERS), os.cpu_count() or 1)
+    flows = flows or not keep_packets
+
+    # 如果用户没指定协议，默认开启所有常见工控协议
+    processors = select_processors(protocol_type)
+    display_filter = build_display_filter(processors)
+
+    logger.info(f"开始分析文件: {file_path} (后端: {backend}, 进程数: {workers}, 过滤器: {display_filter})")
+
+    try:
+        if workers > 1 and not frame_range:
+            chunks = plan_chunks(file_path, workers)
+            if len(chunks) > 1:
+                return _analyze_parallel(file_path, backend, protocol_type, chunks, workers, flows, keep_packets)
+
+        # 使用生成器迭代读取 (过滤下推：非工控帧不会进入 Python)
+        if frame_range:
+            packets = pcap_range_generator(
+                file_path,
+                backend=backend,
+                display_filter=display_filter,
+                packet_filter=build_packet_filter(processors),
+                **frame_range
+            )
+        else:
+            packets = pcap_generator(
+                file_path,
+                backend=backend,
+                display_filter=display_filter,
+                packet_filter=build_packet_filter(processors),
+            )
+        flow_table = FlowTable() if flows else None
+        with correlation.collect() as pairing:
+            packet_count, results = _scan_packets(packets, processors, backend=backend,
+                                                  flows=flow_table, keep_packets=keep_packets)
+
+        return _analysis_result(packet_count, results, pairing, flow_table, keep_packets)
+
+    except Exception as e:
+        logger.error(f"底层分析中断: {str(e)}")
+        # 抛出异常以便外层捕获
+        raise RuntimeError(f"分析失败: {str(e)}")
+
+
+def _analysis_result(packet_count, results, pairing, flow_table, keep_packets):
+    result = {
+        "success": True,
+        "total_scanned": packet_count,
+        "packets_found": len(results) if keep_packets else flow_table.valid_packets,
+        "data": results,
+        "correlation": pairing.summary()
+    }
+    if flow_table is not None:
+        result['flows'] = flow_table.summary()
+    return result
+
+
+def stream_analysis(file_path, backend=None, protocol_type='auto', frame_range=None):
+    """
+    流式分析：每解码出一个数据包就立即 yield 标准化结果，最后 yield 一条汇总记录
+    服务端不积累结果列表，内存占用与文件大小无关
+
+    Yields:
+        dict: 数据包结果 (create_standard_result 的输出)；
+              最后一条为 {"summary": {"total_scanned": ..., "valid_packets": ...}}
+    """
+    backend = resolve_backend(backend)
+    processors = select_processors(protocol_type)
+    display_filter = build_display_filter(processors)
+    packet_filter = build_packet_filter(processors)
+
+    logger.info(f"开始流式分析文件: {file_path} (后端: {backend}, 过滤器: {display_filter})")
+
+    if frame_range:
+        packets = pcap_range_generator(file_path, backend=backend, display_filter=display_filter,
+                                       packet_filter=packet_filter, **frame_range)
+    else:
+        packets = pcap_generator(file_path, backend=backend, display_filter=display_filter,
+                                 packet_filter=packet_filter)
+
+    packet_count = 0
+    valid_count = 0
+    try:
+        for _pkt, parsed_data in iter_results(packets, processors, backend=backend):
+            packet_count += 1
+            if parsed_data:
+                valid_count += 1
+                yield parsed_data
+    finally:
+        # 客户端断开时生成器被关闭，同时终止 tshark 子进程
+        packets.close()
+
+    yield {
+        "summary": {
+            "filename": os.path.basename(file_path),
+            "total_scanned": packet_count,
+            "valid_packets": valid_count,
+        }
+    }
+
+
+def analyze_columnar(file_path, backend=None, protocol_type='auto', frame_range=None, cache=None):
+    """
+    分析结果直接写入列式存储：每个包的结果 dict 追加后即被丢弃，
+    内存占用只与数据项数量 (每项约 49 字节) 和不同字符串的个数有关
+
+    Args:
+        cache: 可选的 ResultCache；与完整分析结果共用缓存键，命中时直接加载列式表 (不重新解码)，
+               未命中时解码后写入
+
+    Returns:
+        tuple: (扫描包数, ColumnarResults)
+    """
+    cache_key = None
+    if cache is not None:
+        cache_key = build_cache_key(file_path, backend=backend, protocol_type=protocol_type,
+                                    frame_range=frame_range)
+        table = cache.get_columnar(cache_key)
+        if table is not None:
+            return table.info.get('total_scanned', 0), table
+
+    table = ColumnarResults()
+    packet_count = 0
+    for record in stream_analysis(file_path, backend=backend, protocol_type=protocol_type,
+                                  frame_range=frame_range):
+        if 'summary' in record:
+            packet_count = record['summary']['total_scanned']
+            continue
+        table.append_result(record)
+    table.info = {"total_scanned": packet_count}
+    if cache is not None:
+        cache.put_columnar(cache_key, table)
+    return packet_count, table
+
+
+# ==========================================
+# 游标分页
+# ==========================================
+def _source_fingerprint(file_path):
+    stat = os.stat(file_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def encode_cursor(state):
+    raw = json.dumps(state, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError):
+        raise ValueError("无效的分页游标")
+    # 合法的 JSON 但不是 encode_cursor 生成的状态 (如列表) 同样视为无效游标
+    if not isinstance(state, dict) or not all(isinstance(state.get(key), int) for key in ('f', 's', 'r')) \
+            or not isinstance(state.get('k', 0), int):
+        raise ValueError("无效的分页游标")
+    return state
+
+
+def _windowed_range_packets(file_path, first_frame, limit, backend, display_filter, packet_filter):
+    """
+    tshark 类后端的分页续扫：从 first_frame 起按帧窗口逐段切片解析，第一段约为 limit 的数倍，
+    结果不够一页时下一段加倍，而不是把续扫起点到文件末尾整个复制成临时文件
+    (调用方凑满一页后关闭生成器，后面的切片不会生成)
+    """
+    index = get_or_build_index(file_path)
+    total = len(index)
+    first = first_frame
+    window = max(limit * 4, _PAGE_WINDOW_MIN)
+    while first <= total:
+        last = min(first + window - 1, total)
+        yield from pcap_range_generator(file_path, first_frame=first, last_frame=last, backend=backend,
+                                        display_filter=display_filter, packet_filter=packet_filter, index=index)
+        first = last + 1
+        window *= 2
+
+
+def _page_totals(file_path, processors):
+    """
+    分页响应中的总数：帧总数与所选协议的候选帧数 (按端口 / 魔数识别，有效数据包数的上限)
+
+    只读取索引文件头；索引尚未建立时在后台构建 (首页不等待全量扫描)，之后的页面即可给出总数
+    """
+    header = read_index_header(file_path)
+    if header is None:
+        build_index_async(file_path)
+        return None, None
+    counts = header['protocol_counts']
+    if counts is None:
+        return header['total_frames'], None
+    names = {p.PROTOCOL_ALIASES[0] if p.PROTOCOL_ALIASES else p.protocol_id.lower() for p in processors}
+    return header['total_frames'], sum(count for name, count in counts.items() if name in names)
+
+
+def analyze_page(file_path, backend=None, protocol_type='auto', limit=None, cursor=None, offset=0):
+    """
+    分页分析：每页从上一页停下的位置继续扫描，而不是重新解码整个文件
+
+    游标中记录下一帧帧号、已扫描 / 已返回 / 按 offset 跳过的累计数量；
+    原生后端还记录预热起点的字节偏移，可以直接 seek 而无需帧索引，其它后端借助帧索引定位。
+    续扫时会先回放 PARALLEL_OVERLAP_PACKETS 帧 (结果丢弃) 以恢复请求/响应关联状态。
+
+    Args:
+        limit: 每页最多返回的有效数据包数，默认 config.PAGE_SIZE
+        cursor: 上一页返回的 next_cursor (为空表示第一页)
+        offset: 无游标时跳过的有效数据包数 (需要扫描被跳过的部分)
+
+    Returns:
+        dict: 与 analyze_industrial_pcap 相同的字段，外加 pagination 信息
+    """
+    backend = resolve_backend(backend)
+    limit = max(1, min(int(limit or config.PAGE_SIZE), config.PAGE_SIZE_MAX))
+    processors = select_processors(protocol_type)
+    display_filter = build_display_filter(processors)
+    packet_filter = build_packet_filter(processors)
+    fingerprint = _source_fingerprint(file_path)
+
+    state = {"f": 1, "s": 0, "r": 0}
+    if cursor:
+        state = decode_cursor(cursor)
+        if state.get('v') != fingerprint or state.get('b') != backend or state.get('t') != protocol_type:
+            raise ValueError("分页游标已失效 (文件或查询条件已变化)，请从第一页重新开始")
+
+    next_frame = state['f']
+
+    # 1. 定位到续扫起点 (含关联状态预热区)
+    if next_frame <= 1:
+        packets = pcap_generator(file_path, backend=backend, display_filter=display_filter,
+                                 packet_filter=packet_filter)
+    elif backend == 'native' and 'o' in state:
+        packets = native_packet_generator(file_path, start_offset=state['o'], first_number=state['w'],
+                                          packet_filter=packet_filter)
+    else:
+        packets = _windowed_range_packets(
+            file_path,
+            max(next_frame - config.PARALLEL_OVERLAP_PACKETS, 1),
+            limit,
+            backend,
+            display_filter,
+            packet_filter,
+        )
+
+    # 2. 扫描直到凑满一页
+    results = []
+    scanned = 0
+    skip = skipped = int(offset or 0) if not cursor else 0
+    last_frame = next_frame - 1
+    has_more = False
+    recent = deque(maxlen=max(config.PARALLEL_OVERLAP_PACKETS, 1))
+    try:
+        for pkt, parsed_data in iter_results(packets, processors, record_from=next_frame, backend=backend):
+            last_frame = int(pkt.number)
+            scanned += 1
+            if backend == 'native':
+                recent.append((last_frame, pkt.offset))
+            if not parsed_data:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            results.append(parsed_data)
+            if len(results) >= limit:
+                has_more = True
+                break
+    finally:
+        # 提前结束时关闭生成器 (终止 tshark 子进程)
+        packets.close()
+    skipped = state.get('k', 0) + skipped - skip
+
+    # 3. 生成下一页游标
+    next_cursor = None
+    if has_more:
+        next_state = {
+            "v": fingerprint,
+            "b": backend,
+            "t": protocol_type,
+            "f": last_frame + 1,
+            "s": state['s'] + scanned,
+            "r": state['r'] + len(results),
+        }
+        if skipped:
+            next_state["k"] = skipped
+        if recent:
+            next_state["w"], next_state["o"] = recent[0]
+        next_cursor = encode_cursor(next_state)
+
+    total_frames, candidate_packets = _page_totals(file_path, processors)
+
+    return {
+        "success": True,
+        "total_scanned": scanned,
+        "packets_found": len(results),
+        "data": results,
+        "pagination": {
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+            "next_frame": last_frame + 1,
+            "scanned_frames": state['s'] + scanned,
+            "returned_packets": state['r'] + len(results),
+            "skipped_packets": skipped,
+            "total_frames": total_frames,
+            "candidate_packets": candidate_packets,
+            # 有效数据包总数只有扫描到文件末尾 (最后一页) 时才确定，包含首页按 offset 跳过的部分
+            "total_packets": None if has_more else skipped + state['r'] + len(results),
+        }
+    }
+
+
+# ==========================================
+# 并行分块分析
+# ==========================================
+def plan_chunks(file_path, workers):
+    """
+    借助帧索引按帧数把文件切分为若干块
+
+    Returns:
+        list[dict]: 每块包含 first_frame / last_frame，以及用于预热关联状态的 warm_frame；
+                    文件格式不支持或包数太少时返回空列表 (调用方退回串行)
+    """
+    index = get_or_build_index(file_path)
+    if index is None:
+        logger.info("非 pcap/pcapng 文件，无法建立帧索引，使用串行分析")
+        return []
+
+    total = len(index)
+    if total < config.PARALLEL_MIN_PACKETS:
+        return []
+
+    chunk_count = max(workers * config.PARALLEL_CHUNKS_PER_WORKER, 1)
+    chunk_size = max(-(-total // chunk_count), 1)
+
+    chunks = []
+    for start in range(0, total, chunk_size):
+        end = min(start + chunk_size, total)
+        warm = max(start - config.PARALLEL_OVERLAP_PACKETS, 0)
+        chunks.append({
+            "index": len(chunks),
+            "first_frame": start + 1,
+            "last_frame": end,
+            "warm_frame": warm + 1,
+        })
+    return chunks
+
+
+def analyze_chunk(file_path, backend, protocol_type, chunk, flows=False, keep_packets=True):
+    """
+    进程池 worker：分析单个数据块
+
+    预热区 [warm_frame, first_frame) 只用于建立请求/响应关联状态，
+    这样跨块边界的请求与响应仍能正确配对。
+
+    Returns:
+        tuple: (扫描包数, 结果列表, 指标累加值, 关联统计, 会话表) ——
+               指标、关联统计与会话表在子进程中无法直接写入主进程，随结果带回 (预热区均不计入)
+    """
+    processors = select_processors(protocol_type)
+
+    # 原生后端直接 seek 到块偏移；tshark 类后端解析切出来的独立小文件
+    packets = pcap_range_generator(
+        file_path,
+        first_frame=chunk['warm_frame'],
+        last_frame=chunk['last_frame'],
+        backend=backend,
+        display_filter=build_display_filter(processors),
+        packet_filter=build_packet_filter(processors),
+    )
+    batch = MetricsBatch()
+    flow_table = FlowTable() if flows else None
+    with correlation.collect(record_from=chunk['first_frame'], publish=False) as pairing:
+        packet_count, results = _scan_packets(packets, processors, chunk['first_frame'], backend=backend, batch=batch,
+                                              flows=flow_table, keep_packets=keep_packets)
+    pairing.publish(batch)
+    return (packet_count, results, dict(batch.values), pairing.to_raw(),
+            flow_table.to_raw() if flow_table is not None else None)
+
+
+def _analyze_parallel(file_path, backend, protocol_type, chunks, workers, flows=False, keep_packets=True):
+    logger.info(f"并行分析: {len(chunks)} 个数据块, {workers} 个进程")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(analyze_chunk, os.path.abspath(file_path), backend, protocol_type, chunk,
+                            flows, keep_packets)
+            for chunk in chunks
+        ]
+        # 块本身按帧号顺序排列，按提交顺序收集即为 packet_no 顺序
+        packet_count = 0
+        results = []
+        pairing = correlation.CorrelationStats()
+        flow_table = FlowTable() if flows else None
+        for future in futures:
+            count, chunk_results, chunk_metrics, chunk_pairing, chunk_flows = future.result()
+            metrics.REGISTRY.merge(chunk_metrics)
+            pairing.merge_raw(chunk_pairing)
+            if flow_table is not None:
+                flow_table.merge_raw(chunk_flows)
+            packet_count += count
+            results.extend(chunk_results)
+
+    return _analysis_result(packet_count, results, pairing, flow_table, keep_packets)
@@ -0,0 +1,340 @@
+# utils/columnar.py
+"""
+解码结果的列式存储
+
+create_standard_result 输出的是 "每包一个 dict、每个数据项一个 dict (外加 other dict)" 的嵌套结构，
+数百万个寄存器值时每项要占用数百字节。这里把数据项展开为一行一项的定长列：
+
+    packet_no(I) ts(d) src(I) dst(I) protocol(I) address(I) type(I) description(I)
+    value_kind(B) value_num(d) value_str(I)
+
+字符串列全部做字典编码 (共用一张字符串表)，每个数据项约 49 字节。
+过滤只比较整数编号，聚合直接在数值列上进行；可以像帧索引一样保存为紧凑的二进制文件
+(结果缓存在 JSON 条目旁以同一缓存键保存列式表，见 utils.result_cache)。
+
+注意：包级 info / other 与数据项的 other 字段不进入列式存储。
+"""
+import os
+import re
+import sys
+import csv
+import json
+import math
+import struct
+import threading
+from array import array
+from datetime import datetime
+from itertools import compress
+
+COLUMNAR_MAGIC = b'OLCOL\x00\x00\x01'
+COLUMNAR_VERSION = 1
+_HEADER = struct.Struct('<8sHHQI')
+
+# (列名, array 类型码)
+COLUMNS = (
+    ('packet_no', 'I'),
+    ('ts', 'd'),
+    ('src', 'I'),
+    ('dst', 'I'),
+    ('protocol', 'I'),
+    ('address', 'I'),
+    ('type', 'I'),
+    ('description', 'I'),
+    ('value_kind', 'B'),
+    ('value_num', 'd'),
+    ('value_str', 'I'),
+)
+
+# 字符串列 -> 导出时使用的字段名
+STRING_COLUMNS = {
+    'src': 'src_ip',
+    'dst': 'dst_ip',
+    'protocol': 'protocol',
+    'address': 'address',
+    'type': 'type',
+    'description': 'description',
+}
+
+# value_kind：原始值的 Python 类型，保证导出时原样还原
+KIND_NONE, KIND_INT, KIND_FLOAT, KIND_STR, KIND_BOOL, KIND_JSON = range(6)
+
+# 超过该范围的整数无法用 double 精确表示，按字符串保存
+_MAX_EXACT_INT = 2 ** 53
+
+NAN = float('nan')
+
+# 十进制数值字符串；带前导零的 (如 '01000000') 通常是十六进制原始数据，不视为数值
+_DECIMAL_RE = re.compile(r'^\s*-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?\s*$')
+
+
+def _parse_timestamp(value):
+    """create_standard_result 的 timestamp 字符串 -> epoch 秒"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return NAN
+
+
+def _to_number(text):
+    """数值字符串 (如 '123'、'-1.5') 转为 float，非数值返回 NaN"""
+    if not _DECIMAL_RE.match(str(text)):
+        return NAN
+    try:
+        number = float(text)
+    except (TypeError, ValueError):
+        return NAN
+    return number if math.isfinite(number) else NAN
+
+
+class ColumnarResults:
+    """
+    列式解码结果：第 i 行对应一个数据项 (没有数据项的包也占一行，address 为空字符串)
+    """
+
+    def __init__(self):
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode))
+        self.strings = ['']
+        self._string_ids = {'': 0}
+        # 随表一起保存的附加信息 (如扫描包数)
+        self.info = {}
+
+    def __len__(self):
+        return len(self.packet_no)
+
+    # ---------- 构建 ----------
+    @classmethod
+    def from_results(cls, results):
+        """由 create_standard_result 输出的结果列表构建"""
+        table = cls()
+        for result in results:
+            table.append_result(result)
+        return table
+
+    def string_id(self, value):
+        """字符串 -> 字典编号 (不存在时追加)"""
+        value = '' if value is None else str(value)
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def lookup(self, value):
+        """只查询字典编号，不存在时返回 None (用于过滤)"""
+        return self._string_ids.get(str(value))
+
+    def append_result(self, result):
+        """
+        追加一个包的解析结果 (create_standard_result 的输出)
+        """
+        packet_no = int(result['packet_no'])
+        ts = _parse_timestamp(result.get('timestamp'))
+        src = self.string_id(result.get('src_ip'))
+        dst = self.string_id(result.get('dst_ip'))
+        protocol = self.string_id(result.get('protocol'))
+
+        for item in result.get('items') or ({},):
+            self.packet_no.append(packet_no)
+            self.ts.append(ts)
+            self.src.append(src)
+            self.dst.append(dst)
+            self.protocol.append(protocol)
+            self.address.append(self.string_id(item.get('address', '')))
+            self.type.append(self.string_id(item.get('type', '')))
+            self.description.append(self.string_id(item.get('description', '')))
+            self._append_value(item.get('value'))
+
+    def _append_value(self, value):
+        if value is None:
+            kind, number, text = KIND_NONE, NAN, 0
+        elif isinstance(value, bool):
+            kind, number, text = KIND_BOOL, float(value), 0
+        elif isinstance(value, int) and abs(value) < _MAX_EXACT_INT:
+            kind, number, text = KIND_INT, float(value), 0
+        elif isinstance(value, float):
+            kind, number, text = KIND_FLOAT, value, 0
+        elif isinstance(value, (str, int)):
+            kind, number, text = KIND_STR, _to_number(value), self.string_id(value)
+        else:
+            # 列表 / 字典等复合值以 JSON 文本保存
+            text = self.string_id(json.dumps(value, ensure_ascii=False, default=str))
+            kind, number = KIND_JSON, NAN
+        self.value_kind.append(kind)
+        self.value_num.append(number)
+        self.value_str.append(text)
+
+    # ---------- 读取 ----------
+    def value_at(self, i):
+        """还原第 i 行的原始值"""
+        kind = self.value_kind[i]
+        if kind == KIND_NONE:
+            return None
+        if kind == KIND_INT:
+            return int(self.value_num[i])
+        if kind == KIND_FLOAT:
+            return self.value_num[i]
+        if kind == KIND_BOOL:
+            return bool(self.value_num[i])
+        if kind == KIND_JSON:
+            return json.loads(self.strings[self.value_str[i]])
+        return self.strings[self.value_str[i]]
+
+    def row(self, i):
+        """第 i 行的扁平 dict"""
+        strings = self.strings
+        return {
+            "packet_no": self.packet_no[i],
+            "timestamp": self.ts[i],
+            "src_ip": strings[self.src[i]],
+            "dst_ip": strings[self.dst[i]],
+            "protocol": strings[self.protocol[i]],
+            "address": strings[self.address[i]],
+            "value": self.value_at(i),
+            "type": strings[self.type[i]],
+            "description": strings[self.description[i]],
+        }
+
+    def iter_rows(self):
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def memory_bytes(self):
+        """列数据占用的字节数 (不含字符串字典)"""
+        return sum(len(getattr(self, name)) * getattr(self, name).itemsize for name, _ in COLUMNS)
+
+    # ---------- 过滤 / 聚合 ----------
+    def select(self, mask):
+        """
+        按掩码取子集，返回新的 ColumnarResults (共用字符串字典)
+
+        Args:
+            mask: 每行一个字节的 bytes / bytearray / array('B') (非零表示保留)，其它可迭代对象先转换为 bytes
+        """
+        subset = ColumnarResults()
+        subset.strings = self.strings
+        subset._string_ids = self._string_ids
+        subset.info = self.info
+        if not isinstance(mask, (bytes, bytearray, array)):
+            mask = bytes(map(bool, mask))
+        for name, typecode in COLUMNS:
+            setattr(subset, name, array(typecode, compress(getattr(self, name), mask)))
+        return subset
+
+    def filter(self, protocol=None, address=None, src_ip=None, dst_ip=None, start_ts=None, end_ts=None):
+        """
+        按条件过滤 (各条件取交集)；字符串条件先换成字典编号
+
+        每个条件在 C 层用 map 对定长列生成 bytes 掩码并 compress 出子集，
+        后续条件只在已经缩小的子集上比较，不构建逐行的 Python bool 列表
+
+        Returns:
+            ColumnarResults: 过滤后的子集
+        """
+        table = self
+        for column, value in (('protocol', protocol), ('address', address), ('src', src_ip), ('dst', dst_ip)):
+            if value is None:
+                continue
+            string_id = self.lookup(value)
+            if string_id is None:
+                return self.select(bytes(len(self)))
+            table = table.select(bytes(map(string_id.__eq__, getattr(table, column))))
+
+        # 时间条件统一转为 float 比较 (int.__le__(float) 返回 NotImplemented)；NaN 时间戳不满足任何条件
+        if start_ts is not None:
+            table = table.select(bytes(map(float(start_ts).__le__, table.ts)))
+        if end_ts is not None:
+            table = table.select(bytes(map(float(end_ts).__ge__, table.ts)))
+
+        if table is self:
+            return self.select(b'\x01' * len(self))
+        return table
+
+    def aggregate(self, by='address'):
+        """
+        按字符串列分组统计：行数、数值个数、最小 / 最大 / 平均值、最后一个值
+
+        Args:
+            by: 分组列，可选 'address' / 'protocol' / 'src_ip' / 'dst_ip' / 'type'
+
+        Returns:
+            dict: {分组值: {"count", "numeric_count", "min", "max", "mean", "last"}}
+        """
+        columns = {v: k for k, v in STRING_COLUMNS.items()}
+        if by not in columns:
+            raise ValueError(f"不支持的分组列: {by} (可选: {', '.join(columns)})")
+        keys = getattr(self, columns[by])
+
+        groups = {}
+        for i, (key, number) in enumerate(zip(keys, self.value_num)):
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = [0, 0, math.inf, -math.inf, 0.0, i]
+            group[0] += 1
+            group[5] = i
+            if number == number:  # 非 NaN
+                group[1] += 1
+                group[4] += number
+                if number < group[2]:
+                    group[2] = number
+                if number > group[3]:
+                    group[3] = number
+
+        result = {}
+        for key, (count, numeric, low, high, total, last) in groups.items():
+            result[self.strings[key]] = {
+                "count": count,
+                "numeric_count": numeric,
+                "min": low if numeric else None,
+                "max": high if numeric else None,
+                "mean": total / numeric if numeric else None,
+                "last": self.value_at(last),
+            }
+        return result
+
+    # ---------- 导出 / 序列化 ----------
+    def to_csv(self, path):
+        """导出为 CSV (每行一个数据项)"""
+        fieldnames = ['packet_no', 'timestamp', 'src_ip', 'dst_ip', 'protocol', 'address', 'value',
+                      'type', 'description']
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in self.iter_rows():
+                writer.writerow(row)
+
+    def save(self, path):
+        meta = json.dumps({"strings": self.strings, "info": self.info}, ensure_ascii=False).encode('utf-8')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(COLUMNAR_MAGIC, COLUMNAR_VERSION, 0, len(self), len(meta)))
+            f.write(meta)
+            for name, _typecode in COLUMNS:
+                column = getattr(self, name)
+                if sys.byteorder == 'big':
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            magic, version, _reserved, count, meta_len = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != COLUMNAR_MAGIC or version != COLUMNAR_VERSION:
+                raise ValueError(f"列式结果文件格式不匹配: {path}")
+            meta = json.loads(f.read(meta_len).decode('utf-8'))
+
+            table = cls()
+            table.strings = meta['strings']
+            table._string_ids = {value: i for i, value in enumerate(table.strings)}
+            table.info = meta.get('info') or {}
+            for name, typecode in COLUMNS:
+                column = array(typecode)
+                column.fromfile(f, count)
+                if sys.byteorder == 'big':
+                    column.byteswap()
+                setattr(table, name, column)
+        return table
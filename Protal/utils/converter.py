@@ -38,13 +38,15 @@ class PcapConverter:
         '.5vw': '5Views'
     }
     
-    def __init__(self, tshark_path=None):
+    def __init__(self, tshark_path=None, on_process=None):
         """
         初始化转换器
         
         Args:
             tshark_path: tshark 可执行文件路径（可选）
+            on_process: 可选回调 on_process(proc)，editcap 启动后调用 (供后台任务取消时终止进程)
         """
+        self.on_process = on_process
         self.tshark_path = tshark_path or config.get_tshark_path()
         if not self.tshark_path:
             raise RuntimeError("未找到 tshark，请确保已安装 Wireshark")
@@ -87,6 +89,30 @@ class PcapConverter:
             return 'Standard PCAP (无需转换)'
         return self.SUPPORTED_FORMATS.get(ext, 'Unknown Format')
     
+    def _run_command(self, cmd, timeout=None):
+        """
+        执行外部命令 (与 subprocess.run(capture_output=True, text=True) 等价)
+        进程启动后先交给 on_process 回调，使外部可以在转换过程中直接终止它
+        
+        Returns:
+            subprocess.CompletedProcess: 执行结果
+        """
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        if self.on_process is not None:
+            self.on_process(proc)
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+    
     def convert_to_pcap(self, input_file, output_file=None, overwrite=False):
         """
         将输入文件转换为 PCAP 格式
@@ -169,12 +195,7 @@ class PcapConverter:
             ]
             
             # 执行命令
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5分钟超时
-            )
+            result = self._run_command(cmd, timeout=300)  # 5分钟超时
             
             # 7. 检查转换结果
             if result.returncode != 0:
@@ -194,12 +215,7 @@ class PcapConverter:
                         str(output_file.absolute())
                     ]
                     
-                    fallback_result = subprocess.run(
-                        fallback_cmd,
-                        capture_output=True,
-                        text=True,
-                        timeout=300
-                    )
+                    fallback_result = self._run_command(fallback_cmd, timeout=300)
                     
                     if fallback_result.returncode == 0:
                         logger.info(f"Fallback 转换成功: {output_file}")
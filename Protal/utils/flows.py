@@ -0,0 +1,188 @@
+# utils/flows.py
+"""
+按连接汇总的会话表 (flow table)
+
+分析遍历数据包时顺带按 (客户端 IP, 客户端端口, 服务端 IP, 服务端端口, 协议) 累加：
+包数 / 字节数 (双向分别计数)、首末时间、功能码分布与错误 (异常响应) 数。
+
+    - 每条会话是一个固定字段的 __slots__ 记录，功能码分布最多保留 FLOW_MAX_CODES 种 (其余计入 "other")
+    - 会话数上限为 FLOW_MAX_FLOWS，超出后新会话的数据包只计入 untracked_packets，内存不随文件增长
+    - 只需要连接概览时可以不保留逐包结果 (/api/analyze 的 packets: false)，单次遍历即可得到汇总
+
+服务端的判断与处理器一致：端口属于处理器 DEFAULT_PORTS 的一端为服务端，
+两端都 (不) 属于时端口号较小的一端视为服务端。
+"""
+from config.settings import config
+from processors.correlation import packet_endpoints, is_to_server
+
+# 功能码种类超过上限后的汇总键
+OTHER_CODES = 'other'
+
+
+def packet_length(pkt):
+    """数据包的帧长度 (字节)，取不到时为 0"""
+    try:
+        return int(pkt.length)
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+class FlowRecord:
+    """
+    单条会话的累计值
+    """
+    __slots__ = ('packets', 'bytes', 'to_server', 'to_client', 'first_ts', 'last_ts', 'errors', 'codes')
+
+    def __init__(self):
+        self.packets = 0
+        self.bytes = 0
+        self.to_server = 0
+        self.to_client = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.errors = 0
+        self.codes = {}
+
+    def add_code(self, code, count, max_codes):
+        codes = self.codes
+        if code in codes:
+            codes[code] += count
+        elif len(codes) < max_codes:
+            codes[code] = count
+        else:
+            codes[OTHER_CODES] = codes.get(OTHER_CODES, 0) + count
+
+    def to_raw(self):
+        return [self.packets, self.bytes, self.to_server, self.to_client,
+                self.first_ts, self.last_ts, self.errors, self.codes]
+
+    def merge_raw(self, raw, max_codes):
+        packets, length, to_server, to_client, first_ts, last_ts, errors, codes = raw
+        self.packets += packets
+        self.bytes += length
+        self.to_server += to_server
+        self.to_client += to_client
+        if first_ts is not None and (self.first_ts is None or first_ts < self.first_ts):
+            self.first_ts = first_ts
+        if last_ts is not None and (self.last_ts is None or last_ts > self.last_ts):
+            self.last_ts = last_ts
+        self.errors += errors
+        for code, count in codes.items():
+            self.add_code(code, count, max_codes)
+
+
+class FlowTable:
+    """
+    分析过程中的会话表 (由 iter_results 逐包调用 add)
+    """
+
+    def __init__(self, max_flows=None, max_codes=None):
+        self.max_flows = max(int(max_flows or config.FLOW_MAX_FLOWS), 1)
+        self.max_codes = max(int(max_codes or config.FLOW_MAX_CODES), 1)
+        self.flows = {}             # (client, client_port, server, server_port, protocol) -> FlowRecord
+        self.valid_packets = 0      # 解析出结果的数据包数 (不保留逐包结果时用于 packets_found)
+        self.untracked_packets = 0  # 会话表已满时未计入的数据包数
+        self._server_ports = {}
+
+    def __len__(self):
+        return len(self.flows)
+
+    def add(self, pkt, processor, result):
+        """
+        累加一个已匹配处理器的数据包
+
+        Args:
+            pkt: 数据包对象
+            processor: 匹配到的处理器
+            result: processor.parse 的结果 (解析失败时为 None)
+        """
+        # 有效包数与会话表是否已满无关 (packets: false 时即 packets_found)
+        if result:
+            self.valid_packets += 1
+
+        ports = self._server_ports.get(processor)
+        if ports is None:
+            ports = self._server_ports[processor] = frozenset(str(port) for port in processor.DEFAULT_PORTS)
+
+        src, sport, dst, dport = packet_endpoints(pkt)
+        to_server = is_to_server(sport, dport, ports)
+        if to_server:
+            key = (src, sport, dst, dport, processor.protocol_id)
+        else:
+            key = (dst, dport, src, sport, processor.protocol_id)
+
+        record = self.flows.get(key)
+        if record is None:
+            if len(self.flows) >= self.max_flows:
+                self.untracked_packets += 1
+                return
+            record = self.flows[key] = FlowRecord()
+
+        ts = pkt.ts if isinstance(getattr(pkt, 'ts', None), float) else float(pkt.sniff_timestamp)
+        record.packets += 1
+        record.bytes += packet_length(pkt)
+        if to_server:
+            record.to_server += 1
+        else:
+            record.to_client += 1
+        if record.first_ts is None:
+            record.first_ts = ts
+        record.last_ts = ts
+
+        if result:
+            code = processor.flow_code(result)
+            if code is not None:
+                record.add_code(str(code), 1, self.max_codes)
+            if processor.is_error(result):
+                record.errors += 1
+
+    # ---------- 并行分块的合并 ----------
+    def to_raw(self):
+        return {
+            "flows": [list(key) + [record.to_raw()] for key, record in self.flows.items()],
+            "valid_packets": self.valid_packets,
+            "untracked_packets": self.untracked_packets,
+        }
+
+    def merge_raw(self, raw):
+        self.valid_packets += raw['valid_packets']
+        self.untracked_packets += raw['untracked_packets']
+        for entry in raw['flows']:
+            key = tuple(entry[:5])
+            record = self.flows.get(key)
+            if record is None:
+                if len(self.flows) >= self.max_flows:
+                    self.untracked_packets += entry[5][0]
+                    continue
+                record = self.flows[key] = FlowRecord()
+            record.merge_raw(entry[5], self.max_codes)
+
+    def summary(self):
+        """
+        Returns:
+            dict: {"total_flows", "untracked_packets", "flows": [...]}，会话按包数倒序
+        """
+        flows = []
+        for (client, client_port, server, server_port, protocol), record in self.flows.items():
+            flows.append({
+                "client_ip": client,
+                "client_port": client_port,
+                "server_ip": server,
+                "server_port": server_port,
+                "protocol": protocol,
+                "packets": record.packets,
+                "bytes": record.bytes,
+                "to_server": record.to_server,
+                "to_client": record.to_client,
+                "first_seen": record.first_ts,
+                "last_seen": record.last_ts,
+                "duration": round(record.last_ts - record.first_ts, 6),
+                "function_codes": dict(sorted(record.codes.items(), key=lambda kv: kv[1], reverse=True)),
+                "errors": record.errors,
+            })
+        flows.sort(key=lambda flow: flow['packets'], reverse=True)
+        return {
+            "total_flows": len(flows),
+            "untracked_packets": self.untracked_packets,
+            "flows": flows,
+        }
@@ -0,0 +1,372 @@
+# utils/jobs.py
+"""
+后台任务 (异步分析 / 格式转换)
+
+长时间的分析不再占用 Flask 请求线程：提交后立即返回任务 ID，任务在有界线程池中执行，
+客户端轮询进度 (已扫描包数、已读取字节、预计剩余时间) 或随时取消。
+
+    - 并发数由 config.JOB_WORKERS 限制，排队数由 config.JOB_QUEUE_SIZE 限制 (超出时拒绝提交)
+    - 取消时设置取消标志并直接终止任务启动的 tshark / editcap 子进程
+    - 已结束的任务在 config.JOB_RETENTION_SECONDS 秒后从内存中清除
+"""
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import config
+from utils.analyzer import iter_results
+from utils.pcap_reader import pcap_generator, pcap_range_generator, resolve_backend
+from utils.pcap_index import load_index
+from utils.converter import PcapConverter
+from utils.result_cache import get_result_cache, build_cache_key
+from processors import select_processors, build_display_filter, build_packet_filter, correlation
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+class JobQueueFull(Exception):
+    """任务队列已满"""
+
+
+class Job:
+    """
+    单个后台任务的状态与进度
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+    def __init__(self, kind, params):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = self.QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        # 进度
+        self.packets_scanned = 0
+        self.packets_found = 0
+        self.bytes_read = None
+        self.total_bytes = None
+
+        self.result = None
+        self.error = None
+        self.future = None
+
+        self._cancel_event = threading.Event()
+        self._processes = []
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in self.FINISHED_STATES
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def attach_process(self, proc):
+        """登记任务启动的子进程；任务已取消时立即终止"""
+        with self._lock:
+            self._processes.append(proc)
+        if self.cancelled:
+            _kill(proc)
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        """设置取消标志并终止所有仍在运行的子进程"""
+        self._cancel_event.set()
+        with self._lock:
+            processes = list(self._processes)
+        for proc in processes:
+            _kill(proc)
+
+    def update_progress(self, packets_scanned, packets_found, bytes_read=None):
+        self.packets_scanned = packets_scanned
+        self.packets_found = packets_found
+        if bytes_read is not None:
+            self.bytes_read = bytes_read
+
+    def progress(self):
+        """
+        进度概要：已读取字节占比推算百分比与预计剩余时间 (字节数未知时为 None)
+        """
+        percent = None
+        eta = None
+        if self.status == self.SUCCEEDED:
+            percent = 100.0
+        elif self.bytes_read is not None and self.total_bytes:
+            fraction = min(self.bytes_read / self.total_bytes, 1.0)
+            percent = round(fraction * 100, 2)
+            if self.started_at and fraction > 0 and not self.finished:
+                elapsed = time.time() - self.started_at
+                eta = round(elapsed / fraction - elapsed, 1)
+        return {
+            "packets_scanned": self.packets_scanned,
+            "packets_found": self.packets_found,
+            "bytes_read": self.bytes_read,
+            "total_bytes": self.total_bytes,
+            "percent": percent,
+            "eta_seconds": eta,
+        }
+
+    def to_dict(self, include_result=True):
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress(),
+            "error": self.error,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+def _kill(proc):
+    if proc.poll() is None:
+        try:
+            proc.kill()
+        except OSError:
+            pass
+
+
+# ==========================================
+# 任务执行逻辑
+# ==========================================
+def run_analysis_job(job):
+    """
+    分析任务：逐包解析并持续更新进度，每包检查一次取消标志
+
+    已读取字节：原生后端直接取记录偏移；tshark 类后端在帧索引已存在时按帧号查偏移，否则未知
+    与 /api/analyze 共用磁盘结果缓存
+    """
+    params = job.params
+    file_path = params['path']
+    backend = resolve_backend(params.get('backend'))
+    protocol_type = params.get('type', 'auto')
+    processors = select_processors(protocol_type)
+    display_filter = build_display_filter(processors)
+    packet_filter = build_packet_filter(processors)
+    frame_range = params.get('frame_range')
+
+    job.total_bytes = os.path.getsize(file_path)
+
+    cache = get_result_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = build_cache_key(file_path, backend=backend, protocol_type=protocol_type,
+                                    frame_range=frame_range)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            job.update_progress(cached['total_scanned'], cached['packets_found'], job.total_bytes)
+            return _analysis_response(file_path, cached, True)
+    index = load_index(file_path) if backend != 'native' else None
+
+    if frame_range:
+        packets = pcap_range_generator(file_path, backend=backend, display_filter=display_filter,
+                                       packet_filter=packet_filter, on_process=job.attach_process,
+                                       **frame_range)
+    else:
+        packets = pcap_generator(file_path, backend=backend, display_filter=display_filter,
+                                 packet_filter=packet_filter, on_process=job.attach_process)
+
+    results = []
+    packet_count = 0
+    with correlation.collect() as pairing:
+        try:
+            for pkt, parsed_data in iter_results(packets, processors, backend=backend):
+                job.check_cancelled()
+                packet_count += 1
+                if parsed_data:
+                    results.append(parsed_data)
+
+                bytes_read = None
+                if backend == 'native':
+                    bytes_read = pkt.offset
+                elif index is not None:
+                    number = int(pkt.number)
+                    if number <= len(index):
+                        bytes_read = index.offset_of(number)
+                job.update_progress(packet_count, len(results), bytes_read)
+        finally:
+            packets.close()
+
+    job.bytes_read = job.total_bytes
+    result = {
+        "success": True,
+        "total_scanned": packet_count,
+        "packets_found": len(results),
+        "data": results,
+        "correlation": pairing.summary()
+    }
+    if cache is not None:
+        cache.put(cache_key, result)
+    return _analysis_response(file_path, result, False)
+
+
+def _analysis_response(file_path, result, cached):
+    """与 /api/analyze 响应中的 data 字段结构一致"""
+    response = {
+        "filename": os.path.basename(file_path),
+        "total_scanned": result['total_scanned'],
+        "valid_packets": result['packets_found'],
+        "protocols": result['data'],
+        "cached": cached,
+    }
+    if 'correlation' in result:
+        response['correlation'] = result['correlation']
+    return response
+
+
+def run_convert_job(job):
+    """
+    转换任务：editcap 子进程登记到任务上，取消时直接终止
+    """
+    params = job.params
+    job.total_bytes = os.path.getsize(params['input_path'])
+
+    converter = PcapConverter(on_process=job.attach_process)
+    result = converter.convert_to_pcap(params['input_path'], params.get('output_path'),
+                                       params.get('overwrite', False))
+    job.check_cancelled()
+    if not result['success']:
+        raise RuntimeError(result.get('error', '转换失败'))
+
+    job.bytes_read = job.total_bytes
+    return result
+
+
+JOB_RUNNERS = {
+    'analyze': run_analysis_job,
+    'convert': run_convert_job,
+}
+
+
+# ==========================================
+# 任务管理器
+# ==========================================
+class JobManager:
+    """
+    有界线程池 + 内存任务表
+    """
+
+    def __init__(self, max_workers=None, queue_size=None, retention=None):
+        self.max_workers = max(int(max_workers or config.JOB_WORKERS), 1)
+        self.queue_size = max(int(queue_size if queue_size is not None else config.JOB_QUEUE_SIZE), 0)
+        self.retention = config.JOB_RETENTION_SECONDS if retention is None else retention
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, params):
+        """
+        提交任务
+
+        Raises:
+            ValueError: 未知的任务类型
+            JobQueueFull: 运行中 + 排队中的任务已达上限
+        """
+        if kind not in JOB_RUNNERS:
+            raise ValueError(f"不支持的任务类型: {kind} (可选: {', '.join(JOB_RUNNERS)})")
+
+        with self._lock:
+            self._prune()
+            active = sum(1 for job in self._jobs.values() if not job.finished)
+            if active >= self.max_workers + self.queue_size:
+                raise JobQueueFull(f"任务队列已满 ({active} 个任务未完成)，请稍后重试")
+
+            job = Job(kind, params)
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job)
+
+        logger.info(f"任务已提交: {job.id} ({kind})")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            self._prune()
+            return sorted(self._jobs.values(), key=lambda job: job.created_at)
+
+    def cancel(self, job_id):
+        """
+        取消任务：排队中的直接移出队列，运行中的设置取消标志并终止子进程
+
+        Returns:
+            Job: 任务不存在时返回 None
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+
+        job.cancel()
+        if job.future is not None and job.future.cancel():
+            job.status = Job.CANCELLED
+            job.finished_at = time.time()
+        logger.info(f"任务已取消: {job.id}")
+        return job
+
+    def _run(self, job):
+        if job.cancelled:
+            job.status = Job.CANCELLED
+            job.finished_at = time.time()
+            return
+
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = JOB_RUNNERS[job.kind](job)
+            job.status = Job.SUCCEEDED
+        except Exception as e:
+            # 被终止的 tshark 会让读取端报错，此时以取消为准
+            if job.cancelled:
+                job.status = Job.CANCELLED
+            else:
+                logger.error(f"任务执行失败: {job.id}: {e}")
+                job.error = str(e)
+                job.status = Job.FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at and now - job.finished_at > self.retention]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """全局任务管理器 (首次使用时创建线程池)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
@@ -0,0 +1,342 @@
+# utils/live_capture.py
+"""
+实时抓包模式
+
+在网卡上启动 tshark (-i，带 BPF 预过滤)，复用字段提取后端与现有处理器逐包增量解析，
+解码记录写入每个会话独立的有界环形缓冲，客户端通过 SSE 或轮询接口按序号消费：
+
+    - 写入永不阻塞：缓冲满时覆盖最旧的记录，内存占用固定为 LIVE_RING_SIZE 条
+    - 每个消费者自己维护读取序号，落后超过缓冲容量时跳到最旧的可用记录，并返回被跳过 (丢弃) 的条数
+    - tshark 每 LIVE_SESSION_RESET 个包重置一次解析状态，长时间运行时内存不随时间增长
+
+本地测试可以在回环网卡 (Linux 'lo' / Windows 'Adapter for loopback traffic capture') 上抓取。
+"""
+import time
+import uuid
+import logging
+import threading
+import subprocess
+
+from config.settings import config
+from utils import metrics
+from utils.analyzer import iter_results
+from utils.tshark_fields import live_fields_generator
+from processors import select_processors, build_display_filter, build_capture_filter, collect_tshark_fields
+
+logger = logging.getLogger(__name__)
+
+
+class LiveSessionLimit(Exception):
+    """同时运行的实时抓包会话已达上限"""
+
+
+class RecordRing:
+    """
+    固定容量的环形缓冲，记录按全局递增序号 (从 0 开始) 定位
+    """
+
+    def __init__(self, capacity):
+        self.capacity = max(int(capacity), 1)
+        self._items = [None] * self.capacity
+        self.next_seq = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def oldest_seq(self):
+        """仍保存在缓冲中的最旧记录序号"""
+        return max(self.next_seq - self.capacity, 0)
+
+    def append(self, record):
+        with self._cond:
+            self._items[self.next_seq % self.capacity] = record
+            self.next_seq += 1
+            self._cond.notify_all()
+
+    def close(self):
+        """生产者结束：唤醒所有等待中的消费者"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def read(self, cursor, max_items, timeout=None):
+        """
+        读取序号 >= cursor 的记录，没有新记录时最多等待 timeout 秒
+
+        Args:
+            cursor: 消费者下一条要读取的序号
+            max_items: 本次最多返回的记录数
+            timeout: 等待秒数 (None 表示不等待)
+
+        Returns:
+            tuple: ([(序号, 记录), ...], 新的 cursor, 因落后而被覆盖 (丢弃) 的条数)
+        """
+        with self._cond:
+            if cursor >= self.next_seq and not self.closed and timeout:
+                self._cond.wait(timeout)
+
+            dropped = 0
+            oldest = self.oldest_seq
+            if cursor < oldest:
+                dropped = oldest - cursor
+                cursor = oldest
+            end = min(self.next_seq, cursor + max_items)
+            records = [(seq, self._items[seq % self.capacity]) for seq in range(cursor, end)]
+            return records, end, dropped
+
+
+class LiveSession:
+    """
+    单个实时抓包会话 (独立线程运行 tshark + 处理器)
+    """
+    STARTING = 'starting'
+    RUNNING = 'running'
+    STOPPED = 'stopped'
+    FAILED = 'failed'
+    FINISHED_STATES = (STOPPED, FAILED)
+
+    def __init__(self, interface, capture_filter=None, protocol_type='auto', ring_size=None):
+        self.id = uuid.uuid4().hex
+        self.interface = interface
+        self.protocol_type = protocol_type
+        self.processors = select_processors(protocol_type)
+        # 未指定 BPF 时按所选处理器的端口生成
+        self.capture_filter = capture_filter or build_capture_filter(self.processors)
+        self.ring = RecordRing(ring_size or config.LIVE_RING_SIZE)
+
+        self.status = self.STARTING
+        self.error = None
+        self.created_at = time.time()
+        self.stopped_at = None
+
+        # 统计
+        self.packets_scanned = 0
+        self.records = 0
+        self.dropped = 0
+        self.subscribers = 0
+
+        self._stop_event = threading.Event()
+        self._proc = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def finished(self):
+        return self.status in self.FINISHED_STATES
+
+    # ---------- 生产者 ----------
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"live-{self.id[:8]}", daemon=True)
+        self._thread.start()
+
+    def _attach_process(self, proc):
+        with self._lock:
+            self._proc = proc
+        if self._stop_event.is_set():
+            self._kill()
+
+    def _count_packets(self, packets):
+        for pkt in packets:
+            self.packets_scanned += 1
+            yield pkt
+
+    def _run(self):
+        packets = None
+        try:
+            packets = live_fields_generator(
+                self.interface,
+                config.get_tshark_path(),
+                collect_tshark_fields(self.processors),
+                capture_filter=self.capture_filter,
+                display_filter=build_display_filter(self.processors),
+                on_process=self._attach_process,
+                session_reset=config.LIVE_SESSION_RESET or None,
+            )
+            self.status = self.RUNNING
+            for _pkt, record in iter_results(self._count_packets(packets), self.processors, backend='fields'):
+                # 未识别 / 解析失败的包 (None) 不进入缓冲
+                if record:
+                    self.ring.append(record)
+                    self.records += 1
+            if not self._stop_event.is_set():
+                raise RuntimeError("tshark 抓包进程意外退出")
+            self.status = self.STOPPED
+        except Exception as e:
+            if self._stop_event.is_set():
+                # 主动停止时 tshark 被终止，退出码非零属于预期
+                self.status = self.STOPPED
+            else:
+                logger.error(f"实时抓包会话 {self.id} 异常结束: {e}")
+                self.error = str(e)
+                self.status = self.FAILED
+        finally:
+            if packets is not None:
+                packets.close()
+            self.stopped_at = time.time()
+            self.ring.close()
+            logger.info(f"实时抓包会话结束: {self.id} ({self.status}, {self.packets_scanned} 包, "
+                        f"{self.records} 条记录, 丢弃 {self.dropped} 条)")
+
+    def _kill(self):
+        with self._lock:
+            proc = self._proc
+        if proc is not None and proc.poll() is None:
+            try:
+                proc.terminate()
+                proc.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                proc.kill()
+
+    def stop(self):
+        """停止抓包 (终止 tshark 进程，已缓冲的记录仍可继续读取)"""
+        self._stop_event.set()
+        self._kill()
+
+    # ---------- 消费者 ----------
+    def read(self, cursor, max_items, timeout=None):
+        """
+        读取记录 (见 RecordRing.read)，被覆盖的条数计入会话的 dropped 统计
+        """
+        records, cursor, dropped = self.ring.read(cursor, max_items, timeout)
+        if dropped:
+            with self._lock:
+                self.dropped += dropped
+            metrics.record('openlist_live_records_dropped_total', dropped, interface=str(self.interface))
+        return records, cursor, dropped
+
+    def exhausted(self, cursor):
+        """会话已结束且消费者已读完全部记录"""
+        return self.ring.closed and cursor >= self.ring.next_seq
+
+    def subscribe(self):
+        with self._lock:
+            self.subscribers += 1
+
+    def unsubscribe(self):
+        with self._lock:
+            self.subscribers -= 1
+
+    def to_dict(self):
+        return {
+            "session_id": self.id,
+            "interface": self.interface,
+            "capture_filter": self.capture_filter,
+            "protocol_type": self.protocol_type,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "stopped_at": self.stopped_at,
+            "packets_scanned": self.packets_scanned,
+            "records": self.records,
+            "dropped": self.dropped,
+            "subscribers": self.subscribers,
+            "buffer": {
+                "capacity": self.ring.capacity,
+                "oldest_seq": self.ring.oldest_seq,
+                "next_seq": self.ring.next_seq,
+            },
+        }
+
+
+class LiveCaptureManager:
+    """
+    实时抓包会话表 (同时运行的会话数受 LIVE_MAX_SESSIONS 限制)
+    """
+
+    def __init__(self, max_sessions=None, retention=None):
+        self.max_sessions = max(int(max_sessions or config.LIVE_MAX_SESSIONS), 1)
+        self.retention = config.LIVE_RETENTION_SECONDS if retention is None else retention
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def start(self, interface, capture_filter=None, protocol_type='auto', ring_size=None):
+        """
+        创建并启动会话
+
+        Raises:
+            ValueError: 协议类型不支持
+            LiveSessionLimit: 运行中的会话已达上限
+        """
+        with self._lock:
+            self._prune()
+            running = sum(1 for session in self._sessions.values() if not session.finished)
+            if running >= self.max_sessions:
+                raise LiveSessionLimit(f"实时抓包会话已达上限 ({running} 个运行中)，请先停止不需要的会话")
+            session = LiveSession(interface, capture_filter, protocol_type, ring_size)
+            self._sessions[session.id] = session
+
+        session.start()
+        logger.info(f"实时抓包会话已启动: {session.id} (网卡: {interface}, BPF: {session.capture_filter})")
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def list(self):
+        with self._lock:
+            self._prune()
+            return sorted(self._sessions.values(), key=lambda session: session.created_at)
+
+    def stop(self, session_id):
+        """
+        Returns:
+            LiveSession: 会话不存在时返回 None
+        """
+        session = self.get(session_id)
+        if session is not None:
+            session.stop()
+        return session
+
+    def _prune(self):
+        """清除已结束超过保留时间的会话 (调用方需持有锁)"""
+        now = time.time()
+        expired = [
+            session_id for session_id, session in self._sessions.items()
+            if session.finished and session.stopped_at and now - session.stopped_at > self.retention
+        ]
+        for session_id in expired:
+            del self._sessions[session_id]
+
+
+def list_interfaces(tshark_path=None):
+    """
+    可用于抓包的网卡列表 (tshark -D)
+
+    Returns:
+        list: [{"index": "1", "name": "eth0", "description": "..."}]
+    """
+    tshark_path = tshark_path or config.get_tshark_path()
+    if not tshark_path:
+        raise RuntimeError("未找到 tshark，请确保已安装 Wireshark")
+
+    result = subprocess.run([tshark_path, '-D'], capture_output=True, text=True,
+                            encoding='utf-8', errors='replace', timeout=30)
+    if result.returncode != 0:
+        raise RuntimeError(f"获取网卡列表失败: {result.stderr.strip() or result.returncode}")
+
+    interfaces = []
+    for line in result.stdout.splitlines():
+        index, _, rest = line.partition('. ')
+        if not index.strip().isdigit():
+            continue
+        name, _, description = rest.partition(' (')
+        interfaces.append({
+            "index": index.strip(),
+            "name": name.strip(),
+            "description": description.rstrip(')').strip(),
+        })
+    return interfaces
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_live_manager():
+    """全局实时抓包会话管理器 (首次使用时创建)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = LiveCaptureManager()
+        return _manager
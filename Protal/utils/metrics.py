@@ -0,0 +1,151 @@
+# utils/metrics.py
+"""
+运行指标 (Prometheus 文本格式)
+
+热路径上不直接写全局注册表：每次分析在本线程内使用一个 MetricsBatch 本地累加，
+每 METRICS_FLUSH_PACKETS 个包以及分析结束时才加锁合并一次，开销只有几次 perf_counter 与字典累加，
+可以在生产环境常开。
+
+指标：
+    openlist_packets_scanned_total{backend}          扫描的数据包数
+    openlist_packets_unmatched_total{backend}        没有处理器匹配的数据包数
+    openlist_processor_packets_total{processor,result}  各处理器 matched / parsed / empty / failed 包数 (empty 含 failed)
+    openlist_stage_seconds_total{stage}              各阶段累计耗时 (read / dispatch / parse / normalize / serialize)
+    openlist_processor_parse_seconds_total{processor}   各处理器 parse 累计耗时 (含 normalize)
+    openlist_analysis_runs_total{backend}            分析 (遍历) 次数，分页时每页计一次
+    openlist_result_cache_total{result}              结果缓存 hit / miss
+    openlist_live_records_dropped_total{interface}   实时抓包中消费者落后而被覆盖的记录数
+"""
+import threading
+from collections import defaultdict
+
+from config.settings import config
+
+
+METRIC_HELP = {
+    'openlist_packets_scanned_total': ('counter', '扫描的数据包数'),
+    'openlist_packets_unmatched_total': ('counter', '没有处理器匹配的数据包数'),
+    'openlist_processor_packets_total': ('counter', '各处理器处理的数据包数 (matched / parsed / empty / failed)'),
+    'openlist_stage_seconds_total': ('counter', '各处理阶段累计耗时 (秒)'),
+    'openlist_processor_parse_seconds_total': ('counter', '各处理器 parse 累计耗时 (秒)'),
+    'openlist_analysis_runs_total': ('counter', '分析 (遍历) 次数'),
+    'openlist_result_cache_total': ('counter', '结果缓存命中情况'),
+    'openlist_live_records_dropped_total': ('counter', '实时抓包中因消费者落后而丢弃的记录数'),
+    'openlist_correlation_pairs_total': ('counter', '请求/响应关联结果 (matched / unmatched / expired / evicted)'),
+    'openlist_response_latency_seconds_total': ('counter', '已配对请求的响应时延累计 (秒)'),
+}
+
+
+class MetricsRegistry:
+    """
+    全局指标表：{(指标名, ((标签, 值), ...)): 数值}
+    """
+
+    def __init__(self):
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] += value
+
+    def merge(self, values):
+        """合并一批本地累加值 ({key: 数值}，key 格式同上)"""
+        if not values:
+            return
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] += value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        """
+        输出 Prometheus 文本格式 (text/plain; version=0.0.4)
+        """
+        grouped = defaultdict(list)
+        for (name, labels), value in self.snapshot().items():
+            grouped[name].append((labels, value))
+
+        lines = []
+        for name in sorted(grouped):
+            metric_type, help_text = METRIC_HELP.get(name, ('untyped', ''))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in sorted(grouped[name]):
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+                number = repr(value) if not float(value).is_integer() else str(int(value))
+                lines.append(f"{name}{{{label_text}}} {number}" if label_text else f"{name} {number}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsBatch:
+    """
+    单次分析在本线程内的本地累加器 (不加锁)，定期 flush 到全局注册表
+    """
+    __slots__ = ('values', 'registry')
+
+    def __init__(self, registry=None):
+        self.values = defaultdict(float)
+        self.registry = registry
+
+    def add(self, name, value=1, **labels):
+        self.values[(name, tuple(sorted(labels.items())))] += value
+
+    def add_key(self, key, value):
+        """热路径使用：调用方预先构造好 key，省去每次排序标签"""
+        self.values[key] += value
+
+    def flush(self):
+        if self.values:
+            (self.registry or REGISTRY).merge(self.values)
+            self.values = defaultdict(float)
+
+
+def metric_key(name, **labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+# ==========================================
+# 当前线程正在进行的分析 (供处理器基类记录 normalize 耗时与解析失败)
+# ==========================================
+_local = threading.local()
+
+
+def active_batch():
+    """当前线程正在使用的 MetricsBatch (未开启或不在分析中时返回 None)"""
+    return getattr(_local, 'batch', None)
+
+
+def activate(batch):
+    """设置当前线程的 MetricsBatch，返回之前的值以便恢复"""
+    previous = getattr(_local, 'batch', None)
+    _local.batch = batch
+    return previous
+
+
+def enabled():
+    return config.METRICS_ENABLED
+
+
+def record(name, value=1, **labels):
+    """
+    非热路径的直接记录：有活动 batch 时写入 batch，否则直接写全局注册表
+    """
+    if not config.METRICS_ENABLED:
+        return
+    batch = active_batch()
+    if batch is not None:
+        batch.add(name, value, **labels)
+    else:
+        REGISTRY.inc(name, value, **labels)
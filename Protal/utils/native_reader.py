@@ -0,0 +1,698 @@
+# utils/native_reader.py
+"""
+原生 PCAP / PCAPNG 读取后端
+
+直接对内存映射 (mmap) 的抓包文件做块解析 (pcap 记录头 / pcapng SHB、IDB、EPB、SPB)，
+不启动 tshark，也不构建 PDML 树。每个数据包只解析 L2-L4 头部，
+应用层负载以 memoryview 的形式零拷贝暴露给处理器。
+
+生成的 NativePacket 与 pyshark 数据包在以下属性上保持兼容：
+    number / sniff_time / layers / ip / ipv6 / tcp / udp / transport_layer / `'udp' in pkt`
+因此 BaseProtocolProcessor.create_standard_result 可以直接使用。
+"""
+import os
+import sys
+import mmap
+import socket
+import struct
+import logging
+from array import array
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+# --- 文件格式常量 ---
+PCAP_MAGIC_US = 0xA1B2C3D4
+PCAP_MAGIC_NS = 0xA1B23C4D
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+# pcapng 块类型
+BLOCK_IDB = 0x00000001
+BLOCK_PB = 0x00000002  # 旧版 Packet Block (已废弃，但仍有工具生成)
+BLOCK_SPB = 0x00000003
+BLOCK_EPB = 0x00000006
+
+# 链路层类型 (LINKTYPE_*)
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+# 以太网类型
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLAN = (0x8100, 0x88A8, 0x9100)
+
+# IP 协议号
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+IPV6_EXT_HEADERS = (0, 43, 60)  # Hop-by-Hop / Routing / Destination Options
+IPV6_FRAGMENT = 44
+
+_EMPTY = memoryview(b'')
+_LAYER_ATTRS = ('eth', 'ip', 'ipv6', 'tcp', 'udp')
+
+
+# ==========================================
+# 轻量级协议层对象 (兼容 pyshark 的属性命名)
+# ==========================================
+class EthLayer:
+    layer_name = 'eth'
+    __slots__ = ('_raw', 'type')
+
+    def __init__(self, raw, eth_type):
+        self._raw = raw
+        self.type = eth_type
+
+    @property
+    def dst(self):
+        return bytes(self._raw[0:6]).hex(':')
+
+    @property
+    def src(self):
+        return bytes(self._raw[6:12]).hex(':')
+
+
+class IpLayer:
+    layer_name = 'ip'
+    __slots__ = ('_src', '_dst', 'proto', 'ttl', 'len')
+
+    def __init__(self, src, dst, proto, ttl, total_len):
+        self._src = src
+        self._dst = dst
+        self.proto = proto
+        self.ttl = ttl
+        self.len = total_len
+
+    @property
+    def src(self):
+        return socket.inet_ntoa(self._src)
+
+    @property
+    def dst(self):
+        return socket.inet_ntoa(self._dst)
+
+
+class Ipv6Layer:
+    layer_name = 'ipv6'
+    __slots__ = ('_src', '_dst', 'nxt', 'hlim', 'plen')
+
+    def __init__(self, src, dst, nxt, hlim, plen):
+        self._src = src
+        self._dst = dst
+        self.nxt = nxt
+        self.hlim = hlim
+        self.plen = plen
+
+    @property
+    def src(self):
+        return socket.inet_ntop(socket.AF_INET6, self._src)
+
+    @property
+    def dst(self):
+        return socket.inet_ntop(socket.AF_INET6, self._dst)
+
+
+class TransportLayer:
+    """
+    TCP / UDP 层
+    注意：srcport / dstport 为 int (pyshark 中为字符串)，payload 属性保持 pyshark 的冒号 Hex 格式
+    """
+    __slots__ = ('layer_name', 'srcport', 'dstport', 'flags', 'seq', '_payload')
+
+    def __init__(self, layer_name, srcport, dstport, payload, flags=0, seq=0):
+        self.layer_name = layer_name
+        self.srcport = srcport
+        self.dstport = dstport
+        self.flags = flags
+        self.seq = seq
+        self._payload = payload
+
+    @property
+    def payload(self):
+        if not len(self._payload):
+            raise AttributeError('payload')
+        return bytes(self._payload).hex(':')
+
+
+class NativePacket:
+    """
+    原生后端生成的轻量数据包对象
+    """
+    native = True
+
+    __slots__ = ('number', 'ts', 'offset', 'interface_id', 'linktype', 'frame_len', 'cap_len',
+                 'eth', 'ip', 'ipv6', 'tcp', 'udp', 'payload')
+
+    def __init__(self, number, ts, offset, interface_id, linktype, frame_len, cap_len):
+        self.number = number
+        self.ts = ts
+        self.offset = offset
+        self.interface_id = interface_id
+        self.linktype = linktype
+        self.frame_len = frame_len
+        self.cap_len = cap_len
+        # 未解析出的层保持未赋值，访问时抛出 AttributeError (与 pyshark 行为一致)
+        self.payload = _EMPTY
+
+    @property
+    def sniff_time(self):
+        return datetime.fromtimestamp(self.ts)
+
+    @property
+    def sniff_timestamp(self):
+        return str(self.ts)
+
+    @property
+    def length(self):
+        return self.frame_len
+
+    @property
+    def layers(self):
+        result = []
+        for name in _LAYER_ATTRS:
+            layer = getattr(self, name, None)
+            if layer is not None:
+                result.append(layer)
+        return result
+
+    @property
+    def layer_names(self):
+        return [name for name in _LAYER_ATTRS if hasattr(self, name)]
+
+    @property
+    def transport_layer(self):
+        if hasattr(self, 'tcp'):
+            return 'TCP'
+        if hasattr(self, 'udp'):
+            return 'UDP'
+        return None
+
+    @property
+    def highest_layer(self):
+        layers = self.layers
+        return layers[-1].layer_name.upper() if layers else 'FRAME'
+
+    @property
+    def transport(self):
+        """返回 TCP 或 UDP 层 (不存在时返回 None)"""
+        return getattr(self, 'tcp', None) or getattr(self, 'udp', None)
+
+    def __contains__(self, item):
+        name = str(item).lower()
+        return name in _LAYER_ATTRS and hasattr(self, name)
+
+    def __repr__(self):
+        return f"<NativePacket #{self.number} {self.highest_layer} {self.cap_len} bytes>"
+
+
+# ==========================================
+# L2 - L4 解析
+# ==========================================
+_U16 = struct.Struct('>H')
+_TCP_HDR = struct.Struct('>HHIIBB')
+_UDP_HDR = struct.Struct('>HHH')
+
+
+def _decode_l2(pkt, data, linktype):
+    """
+    解析链路层，返回 (ethertype, L3 起始偏移)；无法识别时返回 (None, 0)
+    """
+    if linktype == LINKTYPE_ETHERNET:
+        if len(data) < 14:
+            return None, 0
+        eth_type = _U16.unpack_from(data, 12)[0]
+        offset = 14
+        # 剥离 VLAN 标签 (支持 QinQ)
+        while eth_type in ETHERTYPE_VLAN and len(data) >= offset + 4:
+            eth_type = _U16.unpack_from(data, offset + 2)[0]
+            offset += 4
+        pkt.eth = EthLayer(data, eth_type)
+        return eth_type, offset
+
+    if linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        if not len(data):
+            return None, 0
+        version = data[0] >> 4
+        return (ETHERTYPE_IPV4 if version == 4 else ETHERTYPE_IPV6 if version == 6 else None), 0
+
+    if linktype == LINKTYPE_LINUX_SLL:
+        if len(data) < 16:
+            return None, 0
+        return _U16.unpack_from(data, 14)[0], 16
+
+    if linktype == LINKTYPE_LINUX_SLL2:
+        if len(data) < 20:
+            return None, 0
+        return _U16.unpack_from(data, 0)[0], 20
+
+    if linktype == LINKTYPE_NULL:
+        if len(data) < 4:
+            return None, 0
+        # BSD loopback: 4 字节地址族，字节序取决于抓包主机
+        family = struct.unpack_from('<I', data, 0)[0]
+        if family > 0xFFFF:
+            family = struct.unpack_from('>I', data, 0)[0]
+        if family == 2:
+            return ETHERTYPE_IPV4, 4
+        if family in (10, 24, 28, 30):
+            return ETHERTYPE_IPV6, 4
+        return None, 0
+
+    return None, 0
+
+
+def _decode_l3_l4(pkt, data, eth_type, offset):
+    """
+    解析 IP / TCP / UDP 头部，并设置 pkt.payload
+    """
+    size = len(data)
+
+    if eth_type == ETHERTYPE_IPV4:
+        if size < offset + 20:
+            return
+        ver_ihl = data[offset]
+        ihl = (ver_ihl & 0x0F) * 4
+        total_len = _U16.unpack_from(data, offset + 2)[0]
+        frag = _U16.unpack_from(data, offset + 6)[0]
+        proto = data[offset + 9]
+        pkt.ip = IpLayer(bytes(data[offset + 12:offset + 16]), bytes(data[offset + 16:offset + 20]),
+                         proto, data[offset + 8], total_len)
+        # 以 IP 总长度截断，去除以太网填充字节
+        end = offset + total_len if total_len and offset + total_len <= size else size
+        offset += ihl
+        # 非首个分片不包含 L4 头部
+        if frag & 0x1FFF:
+            return
+
+    elif eth_type == ETHERTYPE_IPV6:
+        if size < offset + 40:
+            return
+        plen = _U16.unpack_from(data, offset + 4)[0]
+        proto = data[offset + 6]
+        pkt.ipv6 = Ipv6Layer(bytes(data[offset + 8:offset + 24]), bytes(data[offset + 24:offset + 40]),
+                             proto, data[offset + 7], plen)
+        end = offset + 40 + plen if plen and offset + 40 + plen <= size else size
+        offset += 40
+        # 跳过扩展头
+        while proto in IPV6_EXT_HEADERS or proto == IPV6_FRAGMENT:
+            if end < offset + 8:
+                return
+            nxt = data[offset]
+            if proto == IPV6_FRAGMENT:
+                if _U16.unpack_from(data, offset + 2)[0] & 0xFFF8:
+                    return
+                offset += 8
+            else:
+                offset += (data[offset + 1] + 1) * 8
+            proto = nxt
+    else:
+        return
+
+    if proto == IPPROTO_TCP:
+        if end < offset + 20:
+            return
+        sport, dport, seq, _ack, data_off, flags = _TCP_HDR.unpack_from(data, offset)
+        start = offset + (data_off >> 4) * 4
+        payload = data[start:end] if start < end else _EMPTY
+        pkt.tcp = TransportLayer('tcp', sport, dport, payload, flags, seq)
+        pkt.payload = payload
+
+    elif proto == IPPROTO_UDP:
+        if end < offset + 8:
+            return
+        sport, dport, udp_len = _UDP_HDR.unpack_from(data, offset)
+        start = offset + 8
+        if udp_len >= 8 and offset + udp_len < end:
+            end = offset + udp_len
+        payload = data[start:end] if start < end else _EMPTY
+        pkt.udp = TransportLayer('udp', sport, dport, payload)
+        pkt.payload = payload
+
+
+def decode_packet(pkt, data):
+    """
+    对一帧原始数据做 L2-L4 解析 (原地填充 NativePacket)
+    """
+    eth_type, offset = _decode_l2(pkt, data, pkt.linktype)
+    if eth_type is not None:
+        _decode_l3_l4(pkt, data, eth_type, offset)
+    return pkt
+
+
+# ==========================================
+# 应用层负载的批量解码 (供处理器的原生解码器使用)
+# ==========================================
+# array 为本机字节序，小端机器上整体 byteswap 一次
+_SWAP_WORDS = sys.byteorder == 'little'
+
+
+def be_words(data):
+    """
+    大端 16 位字块 -> int 列表 (Modbus 寄存器、FINS 字数据等)，一次调用完成整块转换，
+    末尾不足 2 字节的部分忽略
+    """
+    words = array('H')
+    words.frombytes(data[:len(data) & ~1])
+    if _SWAP_WORDS:
+        words.byteswap()
+    return words.tolist()
+
+
+# ==========================================
+# 文件格式解析
+# ==========================================
+class _Interface:
+    """pcapng 接口描述 (IDB)"""
+    __slots__ = ('linktype', 'snaplen', 'ts_divisor', 'ts_offset')
+
+    def __init__(self, linktype, snaplen, ts_divisor=1000000, ts_offset=0):
+        self.linktype = linktype
+        self.snaplen = snaplen
+        self.ts_divisor = ts_divisor
+        self.ts_offset = ts_offset
+
+
+def _parse_if_tsresol(value):
+    """if_tsresol 选项: 最高位为 0 表示 10 的负幂，为 1 表示 2 的负幂"""
+    if value & 0x80:
+        return 2 ** (value & 0x7F)
+    return 10 ** value
+
+
+def _parse_idb(mm, offset, block_len, endian):
+    linktype, _reserved, snaplen = struct.unpack_from(endian + 'HHI', mm, offset + 8)
+    iface = _Interface(linktype, snaplen)
+
+    # 解析选项 (只关心 if_tsresol=9 和 if_tsoffset=14)
+    opt = offset + 16
+    end = offset + block_len - 4
+    while opt + 4 <= end:
+        code, length = struct.unpack_from(endian + 'HH', mm, opt)
+        if code == 0:
+            break
+        value_off = opt + 4
+        if code == 9 and length >= 1:
+            iface.ts_divisor = _parse_if_tsresol(mm[value_off])
+        elif code == 14 and length >= 8:
+            iface.ts_offset = struct.unpack_from(endian + 'q', mm, value_off)[0]
+        opt = value_off + ((length + 3) & ~3)
+    return iface
+
+
+def detect_format(path):
+    """
+    根据魔数判断文件格式
+
+    Returns:
+        str: 'pcap' / 'pcapng' / None
+    """
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    if len(head) < 4:
+        return None
+    magic_le = struct.unpack('<I', head)[0]
+    if magic_le == PCAPNG_SHB:
+        return 'pcapng'
+    if magic_le in (PCAP_MAGIC_US, PCAP_MAGIC_NS) or struct.unpack('>I', head)[0] in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+        return 'pcap'
+    return None
+
+
+def _iter_pcap(mm, start_offset=None, first_number=1):
+    """
+    经典 pcap 格式迭代器，yield (number, ts, record_offset, interface_id, linktype, orig_len, data)
+    """
+    magic = struct.unpack_from('<I', mm, 0)[0]
+    if magic in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+        endian = '<'
+    else:
+        endian = '>'
+        magic = struct.unpack_from('>I', mm, 0)[0]
+    ts_divisor = 1000000000 if magic == PCAP_MAGIC_NS else 1000000
+    # 高 4 位可能携带 FCS 信息，只取低 16 位作为链路类型
+    linktype = struct.unpack_from(endian + 'I', mm, 20)[0] & 0xFFFF
+
+    rec_hdr = struct.Struct(endian + 'IIII')
+    size = len(mm)
+    offset = 24 if start_offset is None else start_offset
+    number = first_number
+
+    while offset + 16 <= size:
+        ts_sec, ts_frac, incl_len, orig_len = rec_hdr.unpack_from(mm, offset)
+        data_off = offset + 16
+        if data_off + incl_len > size:
+            logger.warning(f"PCAP 文件在偏移 {offset} 处截断，已停止读取")
+            break
+        yield number, ts_sec + ts_frac / ts_divisor, offset, 0, linktype, orig_len, data_off, incl_len
+        number += 1
+        offset = data_off + incl_len
+
+
+def _iter_pcapng(mm, start_offset=None, first_number=1, interfaces=None):
+    """
+    pcapng 格式迭代器 (支持多 Section / 多接口 / 大小端)
+    """
+    size = len(mm)
+    offset = 0
+    endian = '<'
+    if interfaces is None:
+        interfaces = []
+    number = first_number
+
+    # 从中间位置恢复时，需要先读取头部的 SHB / IDB 获得接口表与字节序
+    if start_offset is not None:
+        endian, interfaces = read_pcapng_interfaces(mm, start_offset)
+        offset = start_offset
+
+    while offset + 12 <= size:
+        block_type = struct.unpack_from(endian + 'I', mm, offset)[0]
+
+        if block_type == PCAPNG_SHB:
+            bom = struct.unpack_from('<I', mm, offset + 8)[0]
+            endian = '<' if bom == PCAPNG_BYTE_ORDER_MAGIC else '>'
+            interfaces = []
+
+        block_len = struct.unpack_from(endian + 'I', mm, offset + 4)[0]
+        if block_len < 12 or offset + block_len > size:
+            logger.warning(f"PCAPNG 文件在偏移 {offset} 处截断或损坏，已停止读取")
+            break
+
+        if block_type == BLOCK_EPB:
+            iface_id, ts_high, ts_low, cap_len, orig_len = struct.unpack_from(endian + 'IIIII', mm, offset + 8)
+            iface = interfaces[iface_id] if iface_id < len(interfaces) else _Interface(LINKTYPE_ETHERNET, 0)
+            ts = ((ts_high << 32) | ts_low) / iface.ts_divisor + iface.ts_offset
+            yield number, ts, offset, iface_id, iface.linktype, orig_len, offset + 28, cap_len
+            number += 1
+
+        elif block_type == BLOCK_SPB:
+            orig_len = struct.unpack_from(endian + 'I', mm, offset + 8)[0]
+            iface = interfaces[0] if interfaces else _Interface(LINKTYPE_ETHERNET, 0)
+            cap_len = min(orig_len, block_len - 16)
+            if iface.snaplen:
+                cap_len = min(cap_len, iface.snaplen)
+            # SPB 不携带时间戳
+            yield number, 0.0, offset, 0, iface.linktype, orig_len, offset + 12, cap_len
+            number += 1
+
+        elif block_type == BLOCK_PB:
+            iface_id, _drops, ts_high, ts_low, cap_len, orig_len = struct.unpack_from(endian + 'HHIIII', mm, offset + 8)
+            iface = interfaces[iface_id] if iface_id < len(interfaces) else _Interface(LINKTYPE_ETHERNET, 0)
+            ts = ((ts_high << 32) | ts_low) / iface.ts_divisor + iface.ts_offset
+            yield number, ts, offset, iface_id, iface.linktype, orig_len, offset + 28, cap_len
+            number += 1
+
+        elif block_type == BLOCK_IDB:
+            interfaces.append(_parse_idb(mm, offset, block_len, endian))
+
+        offset += block_len
+
+
+def read_pcapng_interfaces(mm, until_offset):
+    """
+    扫描 until_offset 之前的 SHB / IDB，返回 (字节序, 接口列表)
+    用于从文件中间某个块恢复读取
+    """
+    offset = 0
+    endian = '<'
+    interfaces = []
+    while offset + 12 <= min(until_offset, len(mm)):
+        block_type = struct.unpack_from(endian + 'I', mm, offset)[0]
+        if block_type == PCAPNG_SHB:
+            bom = struct.unpack_from('<I', mm, offset + 8)[0]
+            endian = '<' if bom == PCAPNG_BYTE_ORDER_MAGIC else '>'
+            interfaces = []
+        block_len = struct.unpack_from(endian + 'I', mm, offset + 4)[0]
+        if block_len < 12:
+            break
+        if block_type == BLOCK_IDB:
+            interfaces.append(_parse_idb(mm, offset, block_len, endian))
+        offset += block_len
+    return endian, interfaces
+
+
+def iter_records(mm, file_format, start_offset=None, first_number=1):
+    """
+    统一的记录迭代器
+    yield (number, ts, record_offset, interface_id, linktype, orig_len, data_offset, cap_len)
+    """
+    if file_format == 'pcapng':
+        return _iter_pcapng(mm, start_offset, first_number)
+    return _iter_pcap(mm, start_offset, first_number)
+
+
+def _pcapng_preamble(mm, until_offset):
+    """
+    收集 until_offset 之前最后一个 Section 的 SHB 与 IDB 原始字节
+    SHB 中的 Section Length 改写为 -1 (未知)，因为切片后的长度已经变化
+    """
+    offset = 0
+    endian = '<'
+    shb = b''
+    idbs = []
+    while offset + 12 <= min(until_offset, len(mm)):
+        block_type = struct.unpack_from(endian + 'I', mm, offset)[0]
+        if block_type == PCAPNG_SHB:
+            bom = struct.unpack_from('<I', mm, offset + 8)[0]
+            endian = '<' if bom == PCAPNG_BYTE_ORDER_MAGIC else '>'
+        block_len = struct.unpack_from(endian + 'I', mm, offset + 4)[0]
+        if block_len < 12:
+            break
+        if block_type == PCAPNG_SHB:
+            raw = bytearray(mm[offset:offset + block_len])
+            raw[16:24] = b'\xff' * 8
+            shb = bytes(raw)
+            idbs = []
+        elif block_type == BLOCK_IDB:
+            idbs.append(mm[offset:offset + block_len])
+        offset += block_len
+    return shb + b''.join(idbs)
+
+
+def write_chunk_file(src_path, dst_path, start_offset, end_offset):
+    """
+    将源文件中 [start_offset, end_offset) 范围内的数据包记录/块复制为一个独立的抓包文件
+    (补上 pcap 文件头，或 pcapng 的 SHB/IDB)，供 tshark 单独解析
+    """
+    file_format = detect_format(src_path)
+    if file_format is None:
+        raise RuntimeError(f"原生读取后端不支持该文件格式: {src_path} (仅支持 pcap / pcapng)")
+
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        if file_format == 'pcap':
+            dst.write(src.read(24))
+        else:
+            mm = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                dst.write(_pcapng_preamble(mm, start_offset))
+            finally:
+                mm.close()
+
+        src.seek(start_offset)
+        remaining = end_offset - start_offset
+        while remaining > 0:
+            block = src.read(min(remaining, 1024 * 1024))
+            if not block:
+                break
+            dst.write(block)
+            remaining -= len(block)
+
+
+def scan_complete_records(file_path, start_offset=None, first_number=1):
+    """
+    只读取记录 / 块头部，定位 start_offset 之后最后一个完整记录的结束位置
+    用于增量读取仍在写入中的文件：末尾写了一半的记录不计入，下次从其起始处继续
+
+    Args:
+        file_path: 抓包文件路径 (pcap / pcapng)
+        start_offset: 起始记录 / 块的字节偏移，None 表示文件中第一个记录
+        first_number: start_offset 处数据包的帧序号
+
+    Returns:
+        tuple: (起始偏移, 完整记录的结束偏移, 最后一个完整数据包的帧序号)；
+               没有新的完整数据包时帧序号为 first_number - 1
+    """
+    file_format = detect_format(file_path)
+    if file_format is None:
+        raise RuntimeError(f"原生读取后端不支持该文件格式: {file_path} (仅支持 pcap / pcapng)")
+
+    with open(file_path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        size = len(mm)
+        number = first_number - 1
+        if file_format == 'pcap':
+            endian = '<' if struct.unpack_from('<I', mm, 0)[0] in (PCAP_MAGIC_US, PCAP_MAGIC_NS) else '>'
+            start = 24 if start_offset is None else start_offset
+            offset = start
+            while offset + 16 <= size:
+                incl_len = struct.unpack_from(endian + 'I', mm, offset + 8)[0]
+                if offset + 16 + incl_len > size:
+                    break
+                offset += 16 + incl_len
+                number += 1
+            return start, offset, number
+
+        start = 0 if start_offset is None else start_offset
+        endian = '<' if start_offset is None else read_pcapng_interfaces(mm, start_offset)[0]
+        offset = start
+        while offset + 12 <= size:
+            block_type = struct.unpack_from(endian + 'I', mm, offset)[0]
+            if block_type == PCAPNG_SHB:
+                bom = struct.unpack_from('<I', mm, offset + 8)[0]
+                endian = '<' if bom == PCAPNG_BYTE_ORDER_MAGIC else '>'
+            block_len = struct.unpack_from(endian + 'I', mm, offset + 4)[0]
+            if block_len < 12 or offset + block_len > size:
+                break
+            if block_type in (BLOCK_EPB, BLOCK_SPB, BLOCK_PB):
+                number += 1
+            offset += block_len
+        return start, offset, number
+    finally:
+        mm.close()
+
+
+def native_packet_generator(file_path, start_offset=None, first_number=1, packet_filter=None):
+    """
+    原生后端生成器：mmap 读取文件，逐帧产生 NativePacket
+
+    Args:
+        file_path: 抓包文件路径 (pcap / pcapng)
+        start_offset: 可选，从指定记录/块的字节偏移处开始读取 (需配合 first_number)
+        first_number: start_offset 处数据包的帧序号
+        packet_filter: 可选，predicate(pkt) -> bool，返回 False 的包被丢弃 (帧序号不受影响)
+    """
+    abs_file_path = os.path.abspath(file_path)
+    if not os.path.exists(abs_file_path):
+        raise FileNotFoundError(f"❌ 文件未找到: {abs_file_path}")
+
+    file_format = detect_format(abs_file_path)
+    if file_format is None:
+        raise RuntimeError(f"原生读取后端不支持该文件格式: {abs_file_path} (仅支持 pcap / pcapng)")
+
+    if os.path.getsize(abs_file_path) == 0:
+        return
+
+    with open(abs_file_path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    try:
+        for number, ts, rec_off, iface_id, linktype, orig_len, data_off, cap_len in \
+                iter_records(mm, file_format, start_offset, first_number):
+            pkt = NativePacket(number, ts, rec_off, iface_id, linktype, orig_len, cap_len)
+            decode_packet(pkt, view[data_off:data_off + cap_len])
+            if packet_filter is not None and not packet_filter(pkt):
+                continue
+            yield pkt
+    finally:
+        try:
+            view.release()
+            mm.close()
+        except BufferError:
+            # 调用方仍持有 payload memoryview，交由 GC 回收映射
+            pass
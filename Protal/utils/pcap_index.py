@@ -0,0 +1,362 @@
+# utils/pcap_index.py
+"""
+抓包文件的持久化帧索引 (sidecar)
+
+对每个抓包文件只完整扫描一次，记录 帧号 -> 文件偏移、时间戳、五元组、识别出的协议，
+以紧凑的定长数组保存到 <capture>.olidx (或缓存目录)。
+之后的分页、钻取、时间范围查询都可以直接 seek 到对应数据包，无需从头读取。
+
+文件格式 (小端序):
+    header   : magic(8s) version(H) reserved(H) count(Q) source_size(Q) source_mtime_ns(q) meta_len(I)
+    meta     : JSON (文件格式 / 地址字典 / 协议名列表 / 各协议帧数)
+    arrays   : offsets(Q) ts(d) src(I) dst(I) sport(H) dport(H) l4(B) proto(B)，每列连续存放
+"""
+import os
+import sys
+import json
+import struct
+import hashlib
+import logging
+import operator
+import tempfile
+import threading
+from array import array
+from itertools import islice
+from bisect import bisect_left, bisect_right
+
+from config.settings import config
+from utils.native_reader import detect_format, native_packet_generator
+
+logger = logging.getLogger(__name__)
+
+
+INDEX_MAGIC = b'OLPIDX\x00\x01'
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.olidx'
+_HEADER = struct.Struct('<8sHHQQqI')
+
+# (列名, array 类型码)
+COLUMNS = (
+    ('offsets', 'Q'),
+    ('ts', 'd'),
+    ('src', 'I'),
+    ('dst', 'I'),
+    ('sport', 'H'),
+    ('dport', 'H'),
+    ('l4', 'B'),
+    ('proto', 'B'),
+)
+
+L4_NONE, L4_TCP, L4_UDP = 0, 6, 17
+
+
+class PcapIndex:
+    """
+    帧索引：第 i 个元素对应帧号 i + 1
+    地址与协议名做字典编码，每帧固定占用 36 字节
+    """
+
+    def __init__(self, file_format='pcap', source_size=0, source_mtime_ns=0):
+        self.file_format = file_format
+        self.source_size = source_size
+        self.source_mtime_ns = source_mtime_ns
+        self.addresses = ['']
+        self.protocols = ['unknown']
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode))
+        self._address_ids = {'': 0}
+        self._ts_sorted = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # ---------- 构建 ----------
+    @classmethod
+    def build(cls, file_path):
+        """
+        完整扫描一次抓包文件并构建索引
+        """
+        # 延迟导入，避免 processors -> utils 的循环依赖
+        from processors import AVAILABLE_PROCESSORS
+
+        stat = os.stat(file_path)
+        index = cls(detect_format(file_path), stat.st_size, stat.st_mtime_ns)
+
+        # 端口 / 魔数 -> 协议编号 (编号 0 为未知)
+        port_map = {}
+        magics = []
+        for processor in AVAILABLE_PROCESSORS:
+            index.protocols.append(processor.PROTOCOL_ALIASES[0] if processor.PROTOCOL_ALIASES
+                                   else processor.protocol_id.lower())
+            proto_id = len(index.protocols) - 1
+            for port in processor.DEFAULT_PORTS:
+                port_map.setdefault(port, proto_id)
+            if processor.PAYLOAD_MAGIC:
+                magics.append((processor.PAYLOAD_MAGIC, proto_id))
+
+        for pkt in native_packet_generator(file_path):
+            index._append(pkt, port_map, magics)
+
+        logger.info(f"索引构建完成: {file_path} ({len(index)} 帧)")
+        return index
+
+    def _address_id(self, address):
+        addr_id = self._address_ids.get(address)
+        if addr_id is None:
+            addr_id = self._address_ids[address] = len(self.addresses)
+            self.addresses.append(address)
+        return addr_id
+
+    def _append(self, pkt, port_map, magics):
+        self.offsets.append(pkt.offset)
+        self.ts.append(pkt.ts)
+
+        ip = getattr(pkt, 'ip', None) or getattr(pkt, 'ipv6', None)
+        self.src.append(self._address_id(ip.src) if ip else 0)
+        self.dst.append(self._address_id(ip.dst) if ip else 0)
+
+        transport = pkt.transport
+        if transport is None:
+            self.sport.append(0)
+            self.dport.append(0)
+            self.l4.append(L4_NONE)
+            self.proto.append(0)
+            return
+
+        self.sport.append(transport.srcport)
+        self.dport.append(transport.dstport)
+        self.l4.append(L4_TCP if transport.layer_name == 'tcp' else L4_UDP)
+
+        proto_id = port_map.get(transport.dstport) or port_map.get(transport.srcport) or 0
+        if not proto_id:
+            for magic, magic_id in magics:
+                if pkt.payload[:len(magic)] == magic:
+                    proto_id = magic_id
+                    break
+        self.proto.append(proto_id)
+
+    # ---------- 序列化 ----------
+    def protocol_counts(self):
+        """{协议名: 帧数}"""
+        counts = {}
+        for proto_id in self.proto:
+            counts[proto_id] = counts.get(proto_id, 0) + 1
+        return {self.protocols[k]: v for k, v in sorted(counts.items())}
+
+    def save(self, index_path):
+        # 各协议帧数写入 meta，分页等只需要总数的场景读取文件头即可 (见 read_index_header)
+        meta = json.dumps({
+            "file_format": self.file_format,
+            "addresses": self.addresses,
+            "protocols": self.protocols,
+            "protocol_counts": self.protocol_counts(),
+        }, ensure_ascii=False).encode('utf-8')
+
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, len(self),
+                                 self.source_size, self.source_mtime_ns, len(meta)))
+            f.write(meta)
+            for name, _typecode in COLUMNS:
+                column = getattr(self, name)
+                if sys.byteorder == 'big':
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(f)
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, index_path):
+        with open(index_path, 'rb') as f:
+            magic, version, _reserved, count, size, mtime_ns, meta_len = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise ValueError(f"索引文件格式不匹配: {index_path}")
+            meta = json.loads(f.read(meta_len).decode('utf-8'))
+
+            index = cls(meta['file_format'], size, mtime_ns)
+            index.addresses = meta['addresses']
+            index.protocols = meta['protocols']
+            index._address_ids = {addr: i for i, addr in enumerate(index.addresses)}
+            for name, typecode in COLUMNS:
+                column = array(typecode)
+                column.fromfile(f, count)
+                if sys.byteorder == 'big':
+                    column.byteswap()
+                setattr(index, name, column)
+        return index
+
+    def matches_source(self, file_path):
+        """索引是否与源文件 (大小 + 修改时间) 一致"""
+        stat = os.stat(file_path)
+        return stat.st_size == self.source_size and stat.st_mtime_ns == self.source_mtime_ns
+
+    # ---------- 查询 ----------
+    def offset_of(self, frame):
+        """帧号 (从 1 开始) 对应的记录字节偏移"""
+        return self.offsets[frame - 1]
+
+    def end_offset_of(self, frame):
+        """帧号对应记录结束位置 (即下一帧的起始偏移，最后一帧为文件大小)"""
+        return self.offsets[frame] if frame < len(self) else self.source_size
+
+    def ts_sorted(self):
+        """时间戳是否单调不减 (首次调用时检查一遍并缓存)"""
+        if self._ts_sorted is None:
+            ts = self.ts
+            self._ts_sorted = all(map(operator.le, ts, islice(ts, 1, None)))
+        return self._ts_sorted
+
+    def frames_for_time(self, start_ts=None, end_ts=None):
+        """
+        时间窗口 -> (first_frame, last_frame)，无匹配时返回 None
+
+        时间戳单调时二分查找；乱序抓包 (多网卡合并、pcapng 的 SPB 帧时间戳为 0 等) 退回线性扫描，
+        返回第一个与最后一个落在窗口内的帧，两者之间窗口外的帧也包含在范围内
+        """
+        if self.ts_sorted():
+            lo = bisect_left(self.ts, start_ts) if start_ts is not None else 0
+            hi = bisect_right(self.ts, end_ts) if end_ts is not None else len(self)
+            if lo >= hi:
+                return None
+            return lo + 1, hi
+
+        first = last = None
+        for i, ts in enumerate(self.ts):
+            if (start_ts is None or ts >= start_ts) and (end_ts is None or ts <= end_ts):
+                if first is None:
+                    first = i
+                last = i
+        if first is None:
+            return None
+        return first + 1, last + 1
+
+    def summary(self):
+        """索引概要：帧数、时间范围、各协议帧数"""
+        return {
+            "total_frames": len(self),
+            "file_format": self.file_format,
+            "first_ts": self.ts[0] if len(self) else None,
+            "last_ts": self.ts[-1] if len(self) else None,
+            "protocols": self.protocol_counts(),
+        }
+
+
+# ==========================================
+# 索引文件定位与缓存
+# ==========================================
+def get_index_path(file_path):
+    """
+    索引文件路径：配置了 INDEX_DIR 时放在缓存目录，否则与抓包文件同目录
+    """
+    abs_path = os.path.abspath(file_path)
+    if config.INDEX_DIR:
+        digest = hashlib.sha1(abs_path.encode('utf-8')).hexdigest()
+        return os.path.join(config.INDEX_DIR, digest + INDEX_SUFFIX)
+    return abs_path + INDEX_SUFFIX
+
+
+def _fallback_index_path(file_path):
+    digest = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+    return os.path.join(tempfile.gettempdir(), 'openlist_index', digest + INDEX_SUFFIX)
+
+
+def load_index(file_path):
+    """
+    只读取已有且与源文件一致的索引，不触发构建
+
+    Returns:
+        PcapIndex: 不存在 / 已过期 / 损坏时返回 None
+    """
+    # 抓包目录只读时，旁边过期的索引无法覆盖，重建结果保存在临时目录：两个位置都要检查
+    for index_path in (get_index_path(file_path), _fallback_index_path(file_path)):
+        if not os.path.exists(index_path):
+            continue
+        try:
+            index = PcapIndex.load(index_path)
+            if index.matches_source(file_path):
+                return index
+            logger.info(f"源文件已变化，索引需要重建: {file_path}")
+        except (OSError, ValueError, EOFError) as e:
+            logger.warning(f"索引文件损坏，需要重建: {index_path} ({e})")
+    return None
+
+
+def read_index_header(file_path):
+    """
+    只读取已有索引的文件头与 meta (不加载各列，与帧数无关的常数开销)
+
+    Returns:
+        dict: {"total_frames", "protocol_counts"}，旧版索引没有 protocol_counts 时其值为 None；
+              索引不存在 / 已过期 / 损坏时返回 None
+    """
+    stat = os.stat(file_path)
+    for index_path in (get_index_path(file_path), _fallback_index_path(file_path)):
+        try:
+            with open(index_path, 'rb') as f:
+                magic, version, _reserved, count, size, mtime_ns, meta_len = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                    continue
+                if (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                    continue
+                meta = json.loads(f.read(meta_len).decode('utf-8'))
+        except (OSError, ValueError, struct.error):
+            continue
+        return {"total_frames": count, "protocol_counts": meta.get('protocol_counts')}
+    return None
+
+
+_building = set()
+_building_lock = threading.Lock()
+
+
+def build_index_async(file_path):
+    """
+    在后台线程中构建并保存索引 (同一文件同时只构建一次)，调用方不等待
+
+    Returns:
+        bool: 本次是否启动了构建
+    """
+    key = os.path.abspath(file_path)
+    with _building_lock:
+        if key in _building:
+            return False
+        _building.add(key)
+
+    def run():
+        try:
+            get_or_build_index(file_path)
+        except Exception as e:
+            logger.warning(f"后台构建索引失败: {file_path} ({e})")
+        finally:
+            with _building_lock:
+                _building.discard(key)
+
+    threading.Thread(target=run, name='index-build', daemon=True).start()
+    return True
+
+
+def get_or_build_index(file_path, rebuild=False):
+    """
+    读取已有索引 (与源文件不一致时自动重建)，不存在则构建并保存
+
+    Returns:
+        PcapIndex: 非 pcap/pcapng 文件返回 None
+    """
+    if detect_format(file_path) is None:
+        return None
+
+    if not rebuild:
+        index = load_index(file_path)
+        if index is not None:
+            return index
+
+    index = PcapIndex.build(file_path)
+    for index_path in (get_index_path(file_path), _fallback_index_path(file_path)):
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            index.save(index_path)
+            break
+        except OSError as e:
+            # 抓包目录可能只读，退回系统临时目录
+            logger.warning(f"无法写入索引文件 {index_path}: {e}")
+    return index
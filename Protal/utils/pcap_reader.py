@@ -3,17 +3,147 @@ import asyncio
 import logging
 import sys
 import os
+import tempfile
 import traceback
 
 logger = logging.getLogger(__name__)
 
 from config.settings import config
+from utils.native_reader import native_packet_generator, write_chunk_file
+from utils.tshark_fields import fields_generator
+from utils.pcap_index import get_or_build_index
 
 # 获取统一配置的 Tshark 路径
 tshark_path = config.get_tshark_path()
-def pcap_generator(file_path):
+
+
+def resolve_backend(backend=None):
+    """
+    校验并返回读取后端名称 (未指定时使用配置中的默认后端)
+    """
+    backend = (backend or config.READER_BACKEND).lower()
+    if backend not in config.READER_BACKENDS:
+        raise ValueError(f"不支持的读取后端: {backend} (可选: {', '.join(config.READER_BACKENDS)})")
+    return backend
+
+
+def pcap_generator(file_path, backend=None, fields=None, display_filter=None, packet_filter=None,
+                   on_process=None):
     """
     通用生成器：负责文件加载和数据包迭代
+
+    Args:
+        file_path: 抓包文件路径
+        backend: 读取后端 ('pyshark' / 'native' / 'fields')，默认取 config.READER_BACKEND
+        fields: fields 后端需要导出的字段列表，默认汇总所有已注册处理器的 TSHARK_FIELDS
+        display_filter: tshark 显示过滤器 (pyshark / fields 后端)
+        packet_filter: 原生后端的预过滤函数 predicate(pkt) -> bool
+        on_process: 启动 tshark 后的回调 on_process(proc)，用于外部取消 (proc 提供 poll() / kill())
+    """
+    backend = resolve_backend(backend)
+    if backend == 'native':
+        yield from native_packet_generator(file_path, packet_filter=packet_filter)
+        return
+
+    if backend == 'fields':
+        if fields is None:
+            from processors import collect_tshark_fields
+            fields = collect_tshark_fields()
+        yield from fields_generator(file_path, tshark_path, fields, display_filter=display_filter,
+                                    on_process=on_process)
+        return
+
+    yield from _pyshark_generator(file_path, display_filter=display_filter, on_process=on_process)
+
+
+def pcap_range_generator(file_path, first_frame=None, last_frame=None, start_time=None, end_time=None,
+                         backend=None, display_filter=None, packet_filter=None, index=None, on_process=None):
+    """
+    借助帧索引只读取指定帧范围 / 时间窗口内的数据包 (帧号与原文件一致)
+
+    Args:
+        first_frame / last_frame: 帧号范围 (含两端，从 1 开始)
+        start_time / end_time: 时间窗口 (epoch 秒)，与帧范围同时给出时取交集
+        index: 可选，已加载的 PcapIndex (默认自动读取或构建)
+        on_process: 同 pcap_generator
+    """
+    backend = resolve_backend(backend)
+    index = index or get_or_build_index(file_path)
+    if index is None:
+        raise RuntimeError(f"无法为该文件建立帧索引 (仅支持 pcap / pcapng): {file_path}")
+
+    first = max(int(first_frame or 1), 1)
+    last = min(int(last_frame or len(index)), len(index))
+    if start_time is not None or end_time is not None:
+        window = index.frames_for_time(start_time, end_time)
+        if window is None:
+            return
+        first, last = max(first, window[0]), min(last, window[1])
+    if first > last:
+        return
+
+    if backend == 'native':
+        packets = native_packet_generator(
+            file_path,
+            start_offset=index.offset_of(first),
+            first_number=first,
+            packet_filter=packet_filter,
+        )
+        for pkt in packets:
+            if pkt.number > last:
+                break
+            yield pkt
+        return
+
+    # tshark 类后端：把帧范围切成独立的小文件再解析，并把帧号还原为原文件中的帧号
+    suffix = '.pcapng' if index.file_format == 'pcapng' else '.pcap'
+    fd, slice_path = tempfile.mkstemp(prefix='slice_', suffix=suffix)
+    os.close(fd)
+    packets = None
+    try:
+        write_chunk_file(file_path, slice_path, index.offset_of(first), index.end_offset_of(last))
+        packets = pcap_generator(slice_path, backend=backend, display_filter=display_filter,
+                                 on_process=on_process)
+        for pkt in packets:
+            number = int(pkt.number) + first - 1
+            pkt.number = str(number) if isinstance(pkt.number, str) else number
+            yield pkt
+    finally:
+        # 先结束 tshark 进程再删除临时文件 (Windows 下文件被占用时无法删除)
+        if packets is not None:
+            packets.close()
+        try:
+            os.remove(slice_path)
+        except OSError:
+            pass
+
+
+class _PysharkProcesses:
+    """
+    pyshark 在自己的事件循环里创建 tshark 子进程，这里把 FileCapture 当前运行的子进程
+    包装成 poll() / kill() 接口交给 on_process，其它线程 (任务取消) 可以直接终止 tshark
+    """
+
+    def __init__(self, cap):
+        self._cap = cap
+        self._killed = False
+
+    def poll(self):
+        return 0 if self._killed else None
+
+    def kill(self):
+        self._killed = True
+        for proc in list(getattr(self._cap, '_running_processes', ())):
+            try:
+                proc.kill()
+            except (OSError, ProcessLookupError, RuntimeError):
+                # 进程已退出 / 事件循环已关闭
+                pass
+
+
+def _pyshark_generator(file_path, display_filter=None, on_process=None):
+    """
+    pyshark 后端：由 tshark 完成完整的协议树解析
     """
     loop = asyncio.new_event_loop()
 
@@ -31,9 +161,16 @@ def pcap_generator(file_path):
             abs_file_path,
             eventloop = loop,
             tshark_path=tshark_path,
+            display_filter=display_filter,
         )
+        handle = _PysharkProcesses(cap)
+        if on_process is not None:
+            on_process(handle)
 
         for pkt in cap:
+            if handle.poll() is not None:
+                # 已被外部取消：不再读取剩余输出
+                break
             yield pkt
 
     except Exception as e:
@@ -0,0 +1,134 @@
+# utils/profiling.py
+"""
+按请求开启的性能剖析 (profile=true)
+
+使用 cProfile (确定性剖析) 运行一次分析 / 转换调用，生成热点报告：
+    - top: 按累计耗时排序的函数 (函数、累计耗时、自身耗时、调用次数)
+    - by_module: 按模块汇总的自身耗时，processors 下每个处理器单独一项，便于定位慢的协议组合
+完整的 pstats 数据可保存到 PROFILE_DIR，之后用 snakeviz / pstats 查看。
+
+仅剖析当前线程：剖析时分析会强制串行 (不使用进程池)。
+"""
+import os
+import hmac
+import time
+import pstats
+import cProfile
+import logging
+
+from config.settings import config
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def check_admin_token(token):
+    """
+    剖析接口的管理员校验：未配置 ADMIN_TOKEN 时一律拒绝
+    """
+    if not config.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(str(token), config.ADMIN_TOKEN)
+
+
+def _module_of(filename):
+    """源文件路径 -> 模块名 (项目内为 'processors.modbus' 形式，第三方库取包名)"""
+    if filename.startswith('~') or filename.startswith('<'):
+        return 'builtins'
+    path = os.path.abspath(filename)
+    if path.startswith(_PROJECT_ROOT + os.sep):
+        rel = os.path.splitext(os.path.relpath(path, _PROJECT_ROOT))[0]
+        return rel.replace(os.sep, '.')
+    parts = path.replace('\\', '/').split('/')
+    if 'site-packages' in parts:
+        index = parts.index('site-packages')
+        if index + 1 < len(parts):
+            return os.path.splitext(parts[index + 1])[0]
+    return 'stdlib'
+
+
+def build_report(profiler, top=None):
+    """
+    将 cProfile 结果整理为可 JSON 序列化的报告
+
+    Args:
+        profiler: 已停止的 cProfile.Profile
+        top: 返回的热点函数数量，默认 config.PROFILE_TOP_N
+
+    Returns:
+        dict: {"total_seconds", "top": [...], "by_module": {...}}
+    """
+    top = top or config.PROFILE_TOP_N
+    stats = pstats.Stats(profiler)
+
+    functions = []
+    by_module = {}
+    for (filename, lineno, name), (_cc, ncalls, tottime, cumtime, _callers) in stats.stats.items():
+        module = _module_of(filename)
+        functions.append({
+            "function": f"{module}:{lineno}({name})" if lineno else f"{module}({name})",
+            "module": module,
+            "cumulative_seconds": round(cumtime, 6),
+            "self_seconds": round(tottime, 6),
+            "calls": ncalls,
+        })
+        by_module[module] = by_module.get(module, 0.0) + tottime
+
+    functions.sort(key=lambda f: f['cumulative_seconds'], reverse=True)
+    return {
+        "total_seconds": round(stats.total_tt, 6),
+        "top": functions[:top],
+        "by_module": {
+            module: round(seconds, 6)
+            for module, seconds in sorted(by_module.items(), key=lambda item: item[1], reverse=True)
+        },
+        "processors": {
+            module.split('.', 1)[1]: round(seconds, 6)
+            for module, seconds in by_module.items()
+            if module.startswith('processors.') and module != 'processors.__init__'
+        },
+    }
+
+
+def profile_call(label, func, *args, **kwargs):
+    """
+    在 cProfile 下执行 func(*args, **kwargs)
+
+    Args:
+        label: 报告名称 (用于保存文件名)
+
+    Returns:
+        tuple: (func 的返回值, 剖析报告)
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        profiler.disable()
+
+    report = build_report(profiler)
+    if config.PROFILE_DIR:
+        try:
+            os.makedirs(config.PROFILE_DIR, exist_ok=True)
+            path = os.path.join(config.PROFILE_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{label}.prof")
+            profiler.dump_stats(path)
+            report['saved_to'] = path
+        except OSError as e:
+            logger.warning(f"保存剖析结果失败: {e}")
+
+    logger.info(f"剖析完成 ({label}): 总耗时 {report['total_seconds']}s")
+    return result, report
+
+
+def maybe_profile(enabled, label, func, *args, **kwargs):
+    """
+    enabled 为真时在剖析器下执行，否则直接执行
+
+    Returns:
+        tuple: (func 的返回值, 剖析报告或 None)
+    """
+    if enabled:
+        return profile_call(label, func, *args, **kwargs)
+    return func(*args, **kwargs), None
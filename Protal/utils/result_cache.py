@@ -0,0 +1,274 @@
+# utils/result_cache.py
+"""
+分析结果磁盘缓存
+
+同一抓包文件在前端被反复打开时，直接返回上次的分析结果，而不是重新跑一遍 tshark。
+缓存键由以下内容组成，任一变化都会使缓存失效：
+    - 文件真实路径、大小、修改时间
+    - 文件首尾各 RESULT_CACHE_HASH_BLOCK 字节的 SHA-1 (防止内容被原地替换而时间戳未变)
+    - 处理器版本集合 (processors 中任一处理器 VERSION 递增即失效)
+    - 读取后端、协议类型、帧范围等查询条件
+
+缓存文件第一行为汇总信息 (total_scanned / packets_found)，其余部分为 data 数组的 JSON，
+命中时可以不解析 data 直接把原始字节拼进 HTTP 响应 (大结果也只需毫秒级)。
+列式汇总 (/api/analyze/aggregate) 的 ColumnarResults 以同一缓存键保存为旁边的 .olcol 文件，
+聚合 / 过滤 / 导出直接加载列式表而不必重新解码抓包。
+缓存目录总大小超过 RESULT_CACHE_MAX_BYTES 时按最近使用时间 (命中时刷新 mtime) 淘汰。
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+
+from config.settings import config
+
+logger = logging.getLogger(__name__)
+
+
+CACHE_SUFFIX = '.json'
+COLUMNAR_SUFFIX = '.olcol'
+_CACHE_SUFFIXES = (CACHE_SUFFIX, COLUMNAR_SUFFIX)
+CACHE_FORMAT_VERSION = 2
+
+
+def file_fingerprint(file_path, block_size=None):
+    """
+    抓包文件指纹：真实路径 + 大小 + 修改时间 + 首尾块内容哈希
+    """
+    block_size = block_size or config.RESULT_CACHE_HASH_BLOCK
+    real_path = os.path.realpath(file_path)
+    stat = os.stat(real_path)
+
+    digest = hashlib.sha1()
+    with open(real_path, 'rb') as f:
+        digest.update(f.read(block_size))
+        if stat.st_size > block_size:
+            f.seek(max(stat.st_size - block_size, block_size))
+            digest.update(f.read(block_size))
+
+    return {
+        "path": real_path,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "content_sha1": digest.hexdigest(),
+    }
+
+
+def build_cache_key(file_path, **query):
+    """
+    生成缓存键
+
+    Args:
+        file_path: 抓包文件路径
+        **query: 影响结果的查询条件 (backend / protocol_type / frame_range 等)
+
+    Returns:
+        str: SHA-256 十六进制字符串
+    """
+    # 延迟导入，避免 processors -> utils 的循环依赖
+    from processors import processor_versions
+
+    material = {
+        "format": CACHE_FORMAT_VERSION,
+        "file": file_fingerprint(file_path),
+        "processors": processor_versions(),
+        "query": query,
+    }
+    raw = json.dumps(material, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    以缓存键命名的 JSON 文件目录，带总大小上限与 LRU 淘汰
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or config.RESULT_CACHE_DIR or os.path.join(
+            tempfile.gettempdir(), 'openlist_result_cache')
+        self.max_bytes = config.RESULT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key, suffix=CACHE_SUFFIX):
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def get_raw(self, key):
+        """
+        读取缓存但不解析数据部分
+
+        Returns:
+            tuple: (汇总信息 dict, data 数组的 UTF-8 JSON 字节)；未命中 / 文件损坏时返回 None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline().decode('utf-8'))
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"结果缓存文件损坏，已忽略: {path} ({e})")
+            self._remove(path)
+            return None
+
+        # 刷新修改时间，作为 LRU 的最近使用时间
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return meta, data
+
+    def get(self, key):
+        """
+        读取缓存结果 (结构同 analyze_industrial_pcap 的返回值)，未命中时返回 None
+        """
+        raw = self.get_raw(key)
+        if raw is None:
+            return None
+        meta, data = raw
+        try:
+            return dict(meta, data=json.loads(data.decode('utf-8')))
+        except ValueError as e:
+            logger.warning(f"结果缓存文件损坏，已忽略: {key} ({e})")
+            self._remove(self._path(key))
+            return None
+
+    def get_columnar(self, key):
+        """
+        读取同一缓存键下的列式结果 (ColumnarResults)；没有列式文件时由 JSON 结果构建并补存，
+        两者都未命中时返回 None
+        """
+        # 延迟导入，避免 result_cache 与 columnar 互相依赖
+        from utils.columnar import ColumnarResults
+
+        path = self._path(key, COLUMNAR_SUFFIX)
+        try:
+            table = ColumnarResults.load(path)
+        except FileNotFoundError:
+            table = None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"列式缓存文件损坏，已忽略: {path} ({e})")
+            self._remove(path)
+            table = None
+        if table is not None:
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            return table
+
+        cached = self.get(key)
+        if cached is None:
+            return None
+        table = ColumnarResults.from_results(cached['data'])
+        table.info = {"total_scanned": cached['total_scanned']}
+        self.put_columnar(key, table)
+        return table
+
+    def put_columnar(self, key, table):
+        """写入列式结果 (ColumnarResults.save 先写临时文件再原子替换)，随后按大小上限淘汰"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key, COLUMNAR_SUFFIX)
+            table.save(path)
+            if os.path.getsize(path) > self.max_bytes:
+                logger.info(f"列式结果超过缓存上限，不写入缓存: {key}")
+                self._remove(path)
+                return False
+        except OSError as e:
+            logger.warning(f"写入列式缓存失败: {e}")
+            return False
+
+        self.evict()
+        return True
+
+    def put(self, key, result):
+        """
+        写入缓存 (先写临时文件再原子替换)，随后按大小上限淘汰旧条目
+        单个结果超过上限时不缓存
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            meta = {k: v for k, v in result.items() if k != 'data'}
+            with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+                f.write(json.dumps(meta, ensure_ascii=False, separators=(',', ':'), default=str) + '\n')
+                json.dump(result.get('data', []), f, ensure_ascii=False, separators=(',', ':'), default=str)
+            if os.path.getsize(tmp_path) > self.max_bytes:
+                logger.info(f"分析结果超过缓存上限，不写入缓存: {key}")
+                self._remove(tmp_path)
+                return False
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"写入结果缓存失败: {e}")
+            return False
+
+        self.evict()
+        return True
+
+    def evict(self):
+        """
+        目录总大小超过上限时，从最久未使用的条目开始删除
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            try:
+                with os.scandir(self.cache_dir) as it:
+                    for entry in it:
+                        if not entry.name.endswith(_CACHE_SUFFIXES):
+                            continue
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+            except OSError:
+                return
+
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for _mtime, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                if self._remove(path):
+                    total -= size
+                    logger.info(f"结果缓存超出上限，淘汰: {os.path.basename(path)}")
+
+    def clear(self):
+        with self._lock:
+            try:
+                names = os.listdir(self.cache_dir)
+            except OSError:
+                return
+            for name in names:
+                if name.endswith(_CACHE_SUFFIXES):
+                    self._remove(os.path.join(self.cache_dir, name))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+_cache = None
+
+
+def get_result_cache():
+    """全局结果缓存 (未启用时返回 None)"""
+    global _cache
+    if not config.RESULT_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ResultCache()
+    return _cache
+
@@ -0,0 +1,236 @@
+# utils/tail_follow.py
+"""
+持续写入中的抓包文件的增量分析 (tail-follow)
+
+抓包设备把滚动 pcap 直接写进 DATA_ROOT，分析人员在文件写完前就会反复刷新查看。
+这里按 (文件, 读取后端, 协议类型) 记住上次处理到的字节偏移与帧号，以及处理器的请求/响应关联状态：
+
+    - 每次请求只解码上次之后新追加的完整数据包 (末尾写了一半的记录留到下次)
+    - 每个文件的进度持有自己的处理器实例，关联表 (pending_transactions 等) 在两次请求之间原样保留，
+      跨批次的请求-响应仍能配对
+      (关联表的 TTL 按抓包时间计算，刷新间隔再长也不会让未完成的请求提前过期)
+    - 文件被替换 (inode 变化、开头内容变化) 或截断 (变小) 时自动从头开始
+
+刷新一个 4 GB 的增长中文件只需要读取新增部分 (pcapng 续读时还需遍历一次之前的块头以恢复接口表)。
+状态只保存在内存中，数量与空闲时间分别受 FOLLOW_MAX_FILES / FOLLOW_STATE_TTL 限制。
+"""
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+from config.settings import config
+from utils.analyzer import _scan_packets
+from processors import correlation
+from utils.pcap_reader import pcap_generator, resolve_backend
+from utils.native_reader import native_packet_generator, scan_complete_records, write_chunk_file, detect_format
+from processors import select_processors, build_display_filter, build_packet_filter
+
+logger = logging.getLogger(__name__)
+
+# 识别文件是否被替换时比较的开头字节数
+_HEAD_BYTES = 4096
+
+
+def _file_identity(file_path, head_len=None):
+    """
+    (设备号, inode, 开头 head_len 字节的 SHA-1)；Windows 上 inode 可能为 0，主要依靠内容判断
+    """
+    stat = os.stat(file_path)
+    head_len = min(stat.st_size, _HEAD_BYTES) if head_len is None else head_len
+    with open(file_path, 'rb') as f:
+        digest = hashlib.sha1(f.read(head_len)).hexdigest()
+    return stat.st_dev, stat.st_ino, head_len, digest
+
+
+class FollowState:
+    """
+    单个文件的增量分析进度
+
+    processors 是本进度专用的处理器实例 (关联状态随进度保存，不与其它分析共享)，
+    lock 保证同一文件的两次增量分析不会交错执行
+    """
+
+    def __init__(self, file_path, processors):
+        self.identity = _file_identity(file_path)
+        self.processors = processors
+        self.lock = threading.Lock()
+        self.offset = None          # 下一个未处理记录 / 块的字节偏移 (None 表示尚未读取)
+        self.next_frame = 1         # 下一个未处理数据包的帧号
+        self.size_seen = 0          # 上次处理时的文件大小
+        self.total_scanned = 0
+        self.packets_found = 0
+        self.refreshes = 0
+        self.last_access = time.time()
+
+    def matches(self, file_path):
+        """文件仍是同一个且没有被截断"""
+        dev, ino, head_len, digest = self.identity
+        stat = os.stat(file_path)
+        if stat.st_size < self.size_seen:
+            return False
+        if ino and (stat.st_dev, stat.st_ino) != (dev, ino):
+            return False
+        return _file_identity(file_path, head_len)[3] == digest
+
+    def to_dict(self):
+        return {
+            "offset": self.offset,
+            "next_frame": self.next_frame,
+            "size_seen": self.size_seen,
+            "total_scanned": self.total_scanned,
+            "packets_found": self.packets_found,
+            "refreshes": self.refreshes,
+        }
+
+
+class FollowTracker:
+    """
+    增量分析状态表 (LRU)
+
+    表本身由 _lock 保护；关联状态在各自 FollowState 的处理器实例中，
+    不同文件的增量分析可以并发，同一文件的增量分析由 FollowState.lock 串行
+    """
+
+    def __init__(self, max_files=None, ttl=None):
+        self.max_files = max(int(max_files or config.FOLLOW_MAX_FILES), 1)
+        self.ttl = config.FOLLOW_STATE_TTL if ttl is None else ttl
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_state(self, key, file_path, reset, processors):
+        now = time.time()
+        for stale in [k for k, s in self._states.items() if now - s.last_access > self.ttl]:
+            del self._states[stale]
+
+        state = None if reset else self._states.get(key)
+        if state is not None and not state.matches(file_path):
+            logger.info(f"文件已被替换或截断，增量分析从头开始: {file_path}")
+            state = None
+        if state is None:
+            state = FollowState(file_path, processors)
+            self._states[key] = state
+            while len(self._states) > self.max_files:
+                self._states.popitem(last=False)
+        self._states.move_to_end(key)
+        state.last_access = now
+        return state
+
+    def forget(self, file_path):
+        """清除某个文件的全部增量状态"""
+        real_path = os.path.realpath(file_path)
+        with self._lock:
+            for key in [k for k in self._states if k[0] == real_path]:
+                del self._states[key]
+
+    def analyze(self, file_path, backend=None, protocol_type='auto', reset=False):
+        """
+        增量分析：只解码上次之后新追加的数据包
+
+        Args:
+            file_path: 抓包文件路径 (pcap / pcapng)
+            backend: 读取后端，默认取配置
+            protocol_type: 协议类型
+            reset: True 时丢弃已有进度，从头分析
+
+        Returns:
+            dict: 结构同 analyze_industrial_pcap (data / correlation 只含本次新增的结果)，
+                  另含 "follow": {offset, next_frame, first_frame, last_frame, new_bytes, reset, ...}
+        """
+        backend = resolve_backend(backend)
+        processors = select_processors(protocol_type)
+        if detect_format(file_path) is None:
+            raise ValueError(f"增量分析仅支持 pcap / pcapng 文件: {file_path}")
+
+        key = (os.path.realpath(file_path), backend, protocol_type)
+        with self._lock:
+            state = self._get_state(key, file_path, reset, processors)
+        with state.lock:
+            processors = state.processors
+            started_fresh = state.offset is None
+
+            start, end, last_frame = scan_complete_records(file_path, state.offset, state.next_frame)
+            first_frame = state.next_frame
+            packet_count, results = 0, []
+            pairing = correlation.CorrelationStats()
+
+            if last_frame >= first_frame:
+                packets = self._delta_packets(file_path, backend, processors, start, end,
+                                              first_frame, last_frame)
+                with correlation.collect() as pairing:
+                    packet_count, results = _scan_packets(packets, processors, backend=backend)
+
+            state.offset = end
+            state.next_frame = last_frame + 1
+            state.size_seen = os.path.getsize(file_path)
+            state.total_scanned += packet_count
+            state.packets_found += len(results)
+            state.refreshes += 1
+
+            follow = dict(state.to_dict(), first_frame=first_frame, last_frame=last_frame,
+                          new_bytes=end - start, reset=started_fresh)
+
+        logger.info(f"增量分析: {file_path} 帧 {first_frame}-{last_frame} ({follow['new_bytes']} 字节)")
+        return {
+            "success": True,
+            "total_scanned": packet_count,
+            "packets_found": len(results),
+            "data": results,
+            "correlation": pairing.summary(),
+            "follow": follow,
+        }
+
+    @staticmethod
+    def _delta_packets(file_path, backend, processors, start, end, first_frame, last_frame):
+        """
+        新增部分 [start, end) 的数据包生成器 (帧号与原文件一致)
+        """
+        if backend == 'native':
+            packets = native_packet_generator(file_path, start_offset=start, first_number=first_frame,
+                                              packet_filter=build_packet_filter(processors))
+            for pkt in packets:
+                if pkt.number > last_frame:
+                    break
+                yield pkt
+            return
+
+        # tshark 类后端：把新增部分切成独立的小文件再解析
+        suffix = '.pcapng' if detect_format(file_path) == 'pcapng' else '.pcap'
+        fd, slice_path = tempfile.mkstemp(prefix='follow_', suffix=suffix)
+        os.close(fd)
+        packets = None
+        try:
+            write_chunk_file(file_path, slice_path, start, end)
+            packets = pcap_generator(slice_path, backend=backend, display_filter=build_display_filter(processors))
+            for pkt in packets:
+                number = int(pkt.number) + first_frame - 1
+                pkt.number = str(number) if isinstance(pkt.number, str) else number
+                yield pkt
+        finally:
+            if packets is not None:
+                packets.close()
+            try:
+                os.remove(slice_path)
+            except OSError:
+                pass
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_follow_tracker():
+    """全局增量分析状态表"""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = FollowTracker()
+        return _tracker
+
+
+def follow_analysis(file_path, backend=None, protocol_type='auto', reset=False):
+    """便捷入口，见 FollowTracker.analyze"""
+    return get_follow_tracker().analyze(file_path, backend=backend, protocol_type=protocol_type, reset=reset)
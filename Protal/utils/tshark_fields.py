@@ -0,0 +1,352 @@
+# utils/tshark_fields.py
+"""
+tshark 单次字段提取后端 (-T ek)
+
+只启动一个 tshark 子进程，并通过 -e 仅导出已注册处理器需要的字段，
+逐行读取 NDJSON 输出并转换为扁平字典，避免 pyshark 构建完整的 PDML/XML 解析树。
+
+为了让现有处理器无需改动即可复用，这里提供与 pyshark 属性访问方式兼容的轻量适配对象：
+    pkt.modbus.func_code / layer.get_field('regval_uint16').all_fields / 'modbus' in pkt
+"""
+import os
+import json
+import logging
+import tempfile
+import subprocess
+from datetime import datetime
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+
+# 所有模式下都必须导出的基础字段 (帧号、时间戳、协议栈、IP 地址)
+BASE_FIELDS = (
+    'frame.number',
+    'frame.time_epoch',
+    'frame.protocols',
+    'frame.len',
+    'ip.src',
+    'ip.dst',
+    # 请求/响应关联按连接 (IP + 端口) 区分
+    'tcp.srcport',
+    'tcp.dstport',
+    'udp.srcport',
+    'udp.dstport',
+)
+
+
+@lru_cache(maxsize=4)
+def get_supported_fields(tshark_path):
+    """
+    查询当前 tshark 版本支持的全部字段名 (tshark -G fields)，结果按 tshark 路径缓存
+    不同 Wireshark 版本的字段命名存在差异，传入无效字段会导致 tshark 直接退出
+    """
+    try:
+        result = subprocess.run(
+            [tshark_path, '-G', 'fields'],
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            timeout=60
+        )
+    except Exception as e:
+        logger.warning(f"查询 tshark 字段列表失败，将不做字段校验: {e}")
+        return None
+
+    fields = set()
+    for line in result.stdout.splitlines():
+        parts = line.split('\t')
+        if len(parts) > 2 and parts[0] == 'F':
+            fields.add(parts[2])
+    return frozenset(fields) if fields else None
+
+
+def filter_supported_fields(tshark_path, fields):
+    """
+    剔除当前 tshark 不认识的字段，保持原有顺序并去重
+    """
+    supported = get_supported_fields(tshark_path)
+    result = []
+    dropped = []
+    for name in fields:
+        if name in result:
+            continue
+        if supported is not None and name not in supported:
+            dropped.append(name)
+            continue
+        result.append(name)
+    if dropped:
+        logger.info(f"当前 tshark 版本不支持以下字段，已忽略: {', '.join(dropped)}")
+    return result
+
+
+# ==========================================
+# pyshark 兼容适配对象
+# ==========================================
+class FieldValue(str):
+    """
+    单个字段值 (str 子类)，模拟 pyshark 的 LayerFieldsContainer
+    多次出现的字段可通过 all_fields 遍历
+    """
+
+    def __new__(cls, values):
+        obj = super().__new__(cls, values[0] if values else '')
+        obj._values = values
+        return obj
+
+    @property
+    def show(self):
+        return str(self)
+
+    @property
+    def showname_value(self):
+        return str(self)
+
+    @property
+    def showname(self):
+        return str(self)
+
+    @property
+    def all_fields(self):
+        return [FieldValue([v]) for v in self._values]
+
+
+class FieldsLayer:
+    """
+    由扁平字段字典构成的协议层，属性名与 pyshark 一致 (去掉协议前缀，'.' 替换为 '_')
+    """
+    __slots__ = ('layer_name', '_fields')
+
+    def __init__(self, layer_name):
+        self.layer_name = layer_name
+        self._fields = {}
+
+    def __getattr__(self, name):
+        try:
+            return FieldValue(self._fields[name])
+        except KeyError:
+            raise AttributeError(name)
+
+    def get_field(self, name):
+        values = self._fields.get(name)
+        return FieldValue(values) if values is not None else None
+
+    @property
+    def field_names(self):
+        return list(self._fields)
+
+
+class _ProtocolStub:
+    """frame.protocols 中出现但没有导出字段的协议层"""
+    __slots__ = ('layer_name',)
+
+    def __init__(self, layer_name):
+        self.layer_name = layer_name
+
+
+class FieldsPacket:
+    """
+    字段提取模式生成的数据包对象
+    """
+    __slots__ = ('number', 'ts', 'protocols', 'record', '_layers')
+
+    def __init__(self, record, layers):
+        self.record = record
+        self._layers = layers
+        self.number = int(_first(record.get('frame.number'), '0'))
+        self.ts = float(_first(record.get('frame.time_epoch'), '0') or 0)
+        self.protocols = _first(record.get('frame.protocols'), '').split(':')
+
+    def __getattr__(self, name):
+        try:
+            return self._layers[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __contains__(self, item):
+        name = str(item).lower()
+        return name in self.protocols or name in self._layers
+
+    @property
+    def sniff_time(self):
+        return datetime.fromtimestamp(self.ts)
+
+    @property
+    def sniff_timestamp(self):
+        return str(self.ts)
+
+    @property
+    def layers(self):
+        return [self._layers.get(name) or _ProtocolStub(name) for name in self.protocols if name]
+
+    @property
+    def layer_names(self):
+        return self.protocols
+
+    @property
+    def length(self):
+        return int(_first(self.record.get('frame.len'), '0') or 0)
+
+    @property
+    def endpoints(self):
+        """(源 IP, 源端口, 目的 IP, 目的端口)，直接读取字段字典，供请求/响应关联使用"""
+        record = self.record
+        transport = 'tcp' if 'tcp.srcport' in record else 'udp'
+        return (
+            _first(record.get('ip.src'), ''),
+            _first(record.get(f'{transport}.srcport'), ''),
+            _first(record.get('ip.dst'), ''),
+            _first(record.get(f'{transport}.dstport'), ''),
+        )
+
+    def __repr__(self):
+        return f"<FieldsPacket #{self.number} {':'.join(self.protocols)}>"
+
+
+def _first(values, default):
+    return values[0] if values else default
+
+
+def build_packet(record):
+    """
+    将扁平字段字典 {'modbus.func_code': ['3'], ...} 组装为 FieldsPacket
+    """
+    layers = {}
+    for name, values in record.items():
+        layer_name, _, attr = name.partition('.')
+        if not attr or layer_name == 'frame':
+            continue
+        layer = layers.get(layer_name)
+        if layer is None:
+            layer = layers[layer_name] = FieldsLayer(layer_name)
+        layer._fields[attr.replace('.', '_')] = values
+    return FieldsPacket(record, layers)
+
+
+# ==========================================
+# tshark 子进程与 NDJSON 解析
+# ==========================================
+def _normalize_values(value):
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return [str(value)]
+
+
+def parse_ek_line(line, key_map):
+    """
+    解析一行 -T ek 输出，返回扁平字典；索引行 / 空行返回 None
+
+    Args:
+        line: tshark 输出的一行 JSON
+        key_map: ek 键名 (如 'modbus_func_code') -> 字段名 ('modbus.func_code')
+    """
+    if not line or line.startswith('{"index"'):
+        return None
+    try:
+        obj = json.loads(line)
+    except ValueError:
+        return None
+    layers = obj.get('layers')
+    if not layers:
+        return None
+    record = {}
+    for key, value in layers.items():
+        record[key_map.get(key, key)] = _normalize_values(value)
+    return record
+
+
+def fields_generator(file_path, tshark_path, fields, display_filter=None, on_process=None):
+    """
+    单次 tshark 字段提取生成器，逐包 yield FieldsPacket
+
+    Args:
+        file_path: 抓包文件路径
+        tshark_path: tshark 可执行文件路径
+        fields: 需要导出的字段列表 (会自动合并 BASE_FIELDS 并校验有效性)
+        display_filter: 可选 tshark 显示过滤器
+        on_process: 可选回调 on_process(proc)，tshark 启动后调用 (供后台任务取消时直接终止进程)
+    """
+    if not tshark_path:
+        raise RuntimeError("未找到 tshark，请确保已安装 Wireshark")
+
+    abs_file_path = os.path.abspath(file_path)
+    if not os.path.exists(abs_file_path):
+        raise FileNotFoundError(f"❌ 文件未找到: {abs_file_path}")
+
+    field_list = filter_supported_fields(tshark_path, list(BASE_FIELDS) + list(fields or ()))
+    cmd = [tshark_path, '-r', abs_file_path, '-n', '-T', 'ek']
+    if display_filter:
+        cmd += ['-Y', display_filter]
+
+    logger.info(f"tshark 字段提取模式: 导出 {len(field_list)} 个字段")
+    yield from _run_ek(cmd, field_list, on_process)
+
+
+def live_fields_generator(interface, tshark_path, fields, capture_filter=None, display_filter=None,
+                          on_process=None, session_reset=None):
+    """
+    实时抓包的字段提取生成器：tshark -i 抓取网卡流量，逐包 yield FieldsPacket (直到进程结束或被终止)
+
+    Args:
+        interface: 网卡名称或 tshark -D 中的序号 (如 'lo' / 'eth0' / '1')
+        tshark_path: tshark 可执行文件路径
+        fields: 需要导出的字段列表
+        capture_filter: 可选 BPF 抓包过滤器 (内核中过滤，不匹配的帧不会到达 tshark)
+        display_filter: 可选 tshark 显示过滤器
+        on_process: 可选回调 on_process(proc)，tshark 启动后调用 (停止抓包时直接终止进程)
+        session_reset: 可选，每抓取多少个包重置一次 tshark 解析状态 (-M)，防止长时间运行内存增长
+    """
+    if not tshark_path:
+        raise RuntimeError("未找到 tshark，请确保已安装 Wireshark")
+
+    field_list = filter_supported_fields(tshark_path, list(BASE_FIELDS) + list(fields or ()))
+    # -l: 每个包输出后立即刷新，否则 stdout 被块缓冲，低流量时记录会延迟数秒
+    cmd = [tshark_path, '-i', str(interface), '-l', '-n', '-T', 'ek']
+    if capture_filter:
+        cmd += ['-f', capture_filter]
+    if display_filter:
+        cmd += ['-Y', display_filter]
+    if session_reset:
+        cmd += ['-M', str(int(session_reset))]
+
+    logger.info(f"tshark 实时抓包: 网卡 {interface}, BPF: {capture_filter or '无'}")
+    yield from _run_ek(cmd, field_list, on_process)
+
+
+def _run_ek(cmd, field_list, on_process=None):
+    """
+    启动 tshark (-T ek) 并逐行转换为 FieldsPacket
+    """
+    key_map = {name.replace('.', '_'): name for name in field_list}
+    for name in field_list:
+        cmd += ['-e', name]
+
+    stderr_file = tempfile.TemporaryFile()
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=stderr_file,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+    )
+    if on_process is not None:
+        on_process(proc)
+    try:
+        for line in proc.stdout:
+            record = parse_ek_line(line.strip(), key_map)
+            if record is not None:
+                yield build_packet(record)
+
+        returncode = proc.wait()
+        if returncode != 0:
+            stderr_file.seek(0)
+            error_msg = stderr_file.read().decode('utf-8', errors='replace').strip()
+            raise RuntimeError(f"tshark 执行失败 (code {returncode}): {error_msg or '未知错误'}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        stderr_file.close()